@@ -0,0 +1,178 @@
+# benchmarks/common.py
+"""
+ベンチマーク・負荷試験スクリプトの共通ヘルパー（標準ライブラリのみ）
+
+- http_request: 1 リクエストを送ってステータス・本文・所要時間を返す
+- run_load: 指定並列数でリクエストを投げ続け、レイテンシを集める
+- summarize: p50 / p95 / p99 / スループットを計算する
+- setup_django: リポジトリ直下から Django を初期化する（シードやトークン発行用）
+- server_timing_queries: Server-Timing ヘッダから DB クエリ数を取り出す
+- git_revision: 結果 JSON に残すコミット情報
+- sample_signature: 手書き風の署名（PNG のデータ URL。これだけ Pillow を使う）
+"""
+import base64
+import io
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+    django.setup()
+
+
+def http_request(method, url, body=None, headers=None, timeout=30):
+    """(status, 本文 bytes, レスポンスヘッダ, 秒) を返す。接続失敗時は status=0"""
+    data = None
+    headers = dict(headers or {})
+    if body is not None:
+        data = json.dumps(body).encode()
+        headers.setdefault("Content-Type", "application/json")
+
+    req = urllib.request.Request(url, data=data, method=method, headers=headers)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as res:
+            payload = res.read()
+            return res.status, payload, dict(res.headers), time.perf_counter() - started
+    except urllib.error.HTTPError as e:
+        return e.code, e.read(), dict(e.headers or {}), time.perf_counter() - started
+    except (urllib.error.URLError, OSError):
+        return 0, b"", {}, time.perf_counter() - started
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(latencies, errors, elapsed, extra=None):
+    """秒単位のレイテンシ一覧から集計値（ms）を返す"""
+    ms = [v * 1000 for v in latencies]
+    result = {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "mean_ms": round(statistics.fmean(ms), 2) if ms else None,
+        "p50_ms": _round(percentile(ms, 50)),
+        "p95_ms": _round(percentile(ms, 95)),
+        "p99_ms": _round(percentile(ms, 99)),
+        "max_ms": _round(max(ms) if ms else None),
+    }
+    if extra:
+        result.update(extra)
+    return result
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+def run_load(make_request, concurrency, total, ok_statuses=(200, 201)):
+    """
+    make_request(i) -> (status, body, headers, seconds) を total 回、concurrency 並列で実行する。
+    戻り値: (成功レイテンシ一覧, エラー数, 経過秒, レスポンス一覧[(status, headers)])
+    """
+    latencies = []
+    responses = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        nonlocal errors
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            status, _, headers, seconds = make_request(i)
+            with lock:
+                responses.append((status, headers))
+                if status in ok_statuses:
+                    latencies.append(seconds)
+                else:
+                    errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed, responses
+
+
+def write_json(path, data):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+
+
+_DB_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def server_timing_queries(headers):
+    """RequestTimingMiddleware の Server-Timing ヘッダから DB クエリ数を返す（無ければ None）"""
+    for key, value in (headers or {}).items():
+        if key.lower() == "server-timing":
+            match = _DB_QUERIES.search(value)
+            return int(match.group(1)) if match else None
+    return None
+
+
+def git_revision():
+    """{"commit": ..., "dirty": bool}。git が使えなければ None"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {"commit": commit, "dirty": bool(dirty)}
+
+
+def sample_signature(width=600, height=200):
+    """
+    手書き風の線を引いた PNG のデータ URL。
+    API（eform_api.signatures）は画像として読めない署名を 400 にするので、本物の画像を送る
+    """
+    from PIL import Image, ImageDraw
+
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    step = max(width // 120, 1)
+    amplitude = height // 5
+    points = [
+        (width // 15 + x * step, height // 2 + int(amplitude * ((x % 24) - 12) / 12) * (-1) ** (x // 24))
+        for x in range(100)
+    ]
+    draw.line(points, fill=0, width=3)
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
@@ -0,0 +1,397 @@
+# benchmarks/dashboard_suite.py
+"""
+QR 同意フロー + ダッシュボード API の負荷試験スイート（コミット間の比較用）
+
+1) 規模を指定してテストデータを作る（settings の DB に書き込む）
+     python benchmarks/dashboard_suite.py seed \\
+         --artists 20 --customers-per-artist 500 --consents-per-customer 3 \\
+         --fixture bench_output/suite_fixture.json
+   - ユーザー名は <prefix>-0001 ... 。同じ prefix の既存データは作り直す
+   - 作成した彫師・トークン・顧客・同意書のサンプルを fixture JSON に書き出す
+
+2) サーバーを起動
+     gunicorn config.wsgi -w 4 -b 127.0.0.1:8001
+
+3) シナリオごとに負荷をかけて JSON に保存
+     python benchmarks/dashboard_suite.py run --base-url http://127.0.0.1:8001 \\
+         --fixture bench_output/suite_fixture.json --concurrency 20 --requests 500 \\
+         --output bench_output/suite_$(git rev-parse --short HEAD).json
+
+4) 2 つの結果を比較
+     python benchmarks/dashboard_suite.py compare bench_output/suite_old.json bench_output/suite_new.json
+
+scenario（--scenario で複数指定可。省略時は全部）:
+  token_status    … GET  /api/consent/public/token/<token>/
+  lookup          … GET  /api/consent/public/lookup-by-phone/
+  entry           … POST /api/consent/public/entry/（毎回別の電話番号で新規顧客）
+  renew           … POST /api/consent/public/renew/
+  customer_list   … GET  /api/customers/                       （JWT）
+  consent_history … GET  /api/consent/history/?customer=<uuid> （JWT）
+  stats           … GET  /api/artists/<uuid>/stats/
+  timeseries      … GET  /api/artists/<uuid>/stats/timeseries/ （JWT）
+  pdf             … GET  /api/consent/pdf/<uuid>/              （JWT）
+
+クエリ数は RequestTimingMiddleware の Server-Timing ヘッダ（PERF_SERVER_TIMING=True）から取る。
+SQLite では entry / renew を複数ワーカーで並列に投げると "database is locked" で 500 が混ざる。
+書き込み系の数字は PostgreSQL に向けて取ること。
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import urllib.parse
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import (  # noqa: E402
+    git_revision,
+    http_request,
+    run_load,
+    sample_signature,
+    server_timing_queries,
+    setup_django,
+    summarize,
+    write_json,
+)
+
+SCENARIOS = [
+    "token_status", "lookup", "entry", "renew",
+    "customer_list", "consent_history", "stats", "timeseries", "pdf",
+]
+AUTH_SCENARIOS = {"customer_list", "consent_history", "timeseries", "pdf"}
+SAMPLE_SIZE = 50
+LAST_NAMES = ["佐藤", "鈴木", "高橋", "田中", "伊藤", "渡辺", "山本", "中村", "小林", "加藤"]
+FIRST_NAMES = ["太郎", "花子", "大輔", "美咲", "翔太", "陽菜", "健", "結衣", "蓮", "葵"]
+PREFECTURES = ["東京都", "大阪府", "神奈川県", "愛知県", "福岡県"]
+
+
+# ------------------------------
+# 1. シード
+# ------------------------------
+def seed(args):
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+    from django.utils import timezone
+
+    from eform_api.models import ConsentEntryToken, Customer, CustomerConsent, TattooArtist
+    from eform_api.rollups import rebuild_consent_rollups
+    from eform_api.utils import normalize_phone_number, parse_birth_date
+
+    User = get_user_model()
+    rng = random.Random(args.seed)
+    # PDF のシナリオで実際に描画されるので、読める PNG を入れる
+    signature = sample_signature(args.signature_width, args.signature_width // 3)
+    # パスワードのハッシュ化は 1 回だけ（全員同じパスワード）
+    password_hash = make_password(args.password)
+    now = timezone.now()
+    started = time.perf_counter()
+
+    deleted, _ = User.objects.filter(username__startswith=f"{args.prefix}-").delete()
+    if deleted:
+        print(f"既存の {args.prefix}-* データを削除しました（{deleted} 行）")
+
+    fixture = {
+        "prefix": args.prefix,
+        "password": args.password,
+        "scale": {
+            "artists": args.artists,
+            "customers_per_artist": args.customers_per_artist,
+            "consents_per_customer": args.consents_per_customer,
+            "signature_width": args.signature_width,
+        },
+        "artists": [],
+    }
+
+    for a in range(args.artists):
+        username = f"{args.prefix}-{a + 1:04d}"
+        with transaction.atomic():
+            user = User.objects.create(
+                username=username, email=f"{username}@example.com", password=password_hash,
+            )
+            artist = TattooArtist.objects.create(
+                user=user, artist_name=username, email=user.email, studio_name="bench studio",
+            )
+            token = ConsentEntryToken.objects.create(artist=artist, label="bench")
+
+            # save() を通さないので、電話番号の正規化・birth_date_value は自前で埋める
+            customers = []
+            for c in range(args.customers_per_artist):
+                birth = date(1960, 1, 1) + timedelta(days=rng.randrange(365 * 45))
+                birth_str = birth.isoformat()
+                customers.append(Customer(
+                    user=user,
+                    full_name=rng.choice(LAST_NAMES) + " " + rng.choice(FIRST_NAMES),
+                    gender=rng.choice(["male", "female", "other", "none"]),
+                    birth_date=birth_str,
+                    birth_date_value=parse_birth_date(birth_str),
+                    prefecture=rng.choice(PREFECTURES),
+                    city="渋谷区",
+                    phone_number=normalize_phone_number(f"090-{a:04d}-{c:04d}"),
+                    tattooist=artist.artist_name,
+                ))
+            Customer.objects.bulk_create(customers, batch_size=args.batch_size)
+
+            # 同じくスナップショットも自前で埋める（ロールアップは最後にまとめて作り直す）
+            consents = []
+            for customer in customers:
+                for _ in range(args.consents_per_customer):
+                    signed_at = now - timedelta(minutes=rng.randrange(60 * 24 * 365))
+                    consents.append(CustomerConsent(
+                        customer=customer,
+                        customer_uuid_snapshot=customer.uuid,
+                        customer_name_snapshot=customer.full_name,
+                        customer_birth_date_snapshot=customer.birth_date,
+                        customer_birth_date_value_snapshot=customer.birth_date_value,
+                        customer_phone_snapshot=customer.phone_number,
+                        consent_version="bench",
+                        signed_at=signed_at,
+                        signature=signature,
+                        privacy_agreement_version="bench",
+                        privacy_agreement_agreed_at=signed_at,
+                    ))
+            CustomerConsent.objects.bulk_create(consents, batch_size=args.batch_size)
+
+        sample = rng.sample(customers, min(SAMPLE_SIZE, len(customers)))
+        fixture["artists"].append({
+            "username": username,
+            "artist_uuid": str(artist.uuid),
+            "token": str(token.uuid),
+            "customers": [
+                {"uuid": str(c.uuid), "phone": c.phone_number, "birth_date": c.birth_date}
+                for c in sample
+            ],
+            "consents": [
+                str(c.uuid) for c in rng.sample(consents, min(SAMPLE_SIZE, len(consents)))
+            ],
+        })
+        print(f"{username}: customers={len(customers)} consents={len(consents)}")
+
+    user_ids = list(
+        User.objects.filter(username__startswith=f"{args.prefix}-").values_list("id", flat=True)
+    )
+    rollups = rebuild_consent_rollups(user_ids=user_ids)
+
+    elapsed = time.perf_counter() - started
+    fixture["seeded_at"] = datetime.now().isoformat(timespec="seconds")
+    fixture["seed_seconds"] = round(elapsed, 2)
+    write_json(args.fixture, fixture)
+    print(f"rollups={rollups} elapsed={elapsed:.1f}s → {args.fixture}")
+
+
+# ------------------------------
+# 2. 計測
+# ------------------------------
+def login(base_url, username, password):
+    status, body, _, _ = http_request(
+        "POST", f"{base_url}/api/auth/token/",
+        body={"username": username, "password": password},
+    )
+    if status != 200:
+        sys.exit(f"{username} のログインに失敗しました（status={status}）")
+    return json.loads(body)["access"]
+
+
+def make_request_factory(base_url, fixture, scenario, access_tokens, nonce):
+    artists = fixture["artists"]
+    public = f"{base_url}/api/consent/public"
+    # 画像として読めない署名は 400 になるので本物の PNG を送る（古いフィクスチャには幅が無い）
+    width = fixture["scale"].get("signature_width", 600)
+    signature = sample_signature(width, width // 3)
+    today = date.today()
+
+    def request(i):
+        rng = random.Random(i)
+        artist = artists[i % len(artists)]
+        customer = rng.choice(artist["customers"])
+        auth = {"Authorization": f"Bearer {access_tokens[artist['username']]}"} if access_tokens else {}
+
+        if scenario == "token_status":
+            return http_request("GET", f"{public}/token/{artist['token']}/")
+        if scenario == "lookup":
+            query = urllib.parse.urlencode({
+                "entry_token": artist["token"],
+                "phone": customer["phone"],
+                "birth_date": customer["birth_date"],
+            })
+            return http_request("GET", f"{public}/lookup-by-phone/?{query}")
+        if scenario == "entry":
+            return http_request("POST", f"{public}/entry/", body={
+                "entry_token": artist["token"],
+                "full_name": "負荷試験 花子",
+                "gender": "female",
+                "birth_date": "1990-01-01",
+                "prefecture": "東京都",
+                "city": "渋谷区",
+                "phone_number": f"070{(nonce + i) % 10 ** 8:08d}",
+                "consent_version": "bench",
+                "privacy_agreement_version": "bench",
+                "signature": signature,
+            })
+        if scenario == "renew":
+            return http_request("POST", f"{public}/renew/", body={
+                "entry_token": artist["token"],
+                "customer_uuid": customer["uuid"],
+                "consent_version": "bench",
+                "privacy_agreement_version": "bench",
+                "signature": signature,
+            })
+        if scenario == "customer_list":
+            return http_request("GET", f"{base_url}/api/customers/", headers=auth)
+        if scenario == "consent_history":
+            return http_request(
+                "GET", f"{base_url}/api/consent/history/?customer={customer['uuid']}", headers=auth,
+            )
+        if scenario == "stats":
+            return http_request("GET", f"{base_url}/api/artists/{artist['artist_uuid']}/stats/")
+        if scenario == "timeseries":
+            query = urllib.parse.urlencode({
+                "start": (today - timedelta(days=364)).isoformat(),
+                "end": today.isoformat(),
+                "granularity": "week",
+            })
+            return http_request(
+                "GET", f"{base_url}/api/artists/{artist['artist_uuid']}/stats/timeseries/?{query}",
+                headers=auth,
+            )
+        consent_uuid = rng.choice(artist["consents"])
+        return http_request("GET", f"{base_url}/api/consent/pdf/{consent_uuid}/", headers=auth)
+
+    return request
+
+
+def query_stats(responses, ok_statuses=(200, 201)):
+    counts = [
+        q for status, headers in responses
+        if status in ok_statuses and (q := server_timing_queries(headers)) is not None
+    ]
+    if not counts:
+        return {"queries_mean": None, "queries_max": None}
+    return {
+        "queries_mean": round(statistics.fmean(counts), 2),
+        "queries_max": max(counts),
+    }
+
+
+def run(args):
+    with open(args.fixture, encoding="utf-8") as f:
+        fixture = json.load(f)
+
+    base_url = args.base_url.rstrip("/")
+    scenarios = args.scenario or SCENARIOS
+    access_tokens = {}
+    if AUTH_SCENARIOS & set(scenarios):
+        for artist in fixture["artists"]:
+            access_tokens[artist["username"]] = login(base_url, artist["username"], fixture["password"])
+
+    # entry の電話番号が前回の実行と被らないように
+    nonce = int(time.time() * 1000) % 10 ** 8
+    results = {}
+    for scenario in scenarios:
+        factory = make_request_factory(base_url, fixture, scenario, access_tokens, nonce)
+        # ウォームアップ（接続・import・初回クエリのコストを除外）
+        run_load(factory, min(args.concurrency, 4), args.warmup)
+        nonce += args.warmup
+        latencies, errors, elapsed, responses = run_load(factory, args.concurrency, args.requests)
+        nonce += args.requests
+
+        summary = summarize(latencies, errors, elapsed, extra=query_stats(responses))
+        results[scenario] = summary
+        print(
+            f"{scenario:16s} {summary['throughput_rps']} req/s "
+            f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms "
+            f"queries={summary['queries_mean']} errors={errors}"
+        )
+
+    report = {
+        "benchmark": "dashboard_suite",
+        "git": git_revision(),
+        "run_at": datetime.now().isoformat(timespec="seconds"),
+        "base_url": base_url,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "scale": fixture["scale"],
+        "results": results,
+    }
+    if args.output:
+        write_json(args.output, report)
+
+
+# ------------------------------
+# 3. 比較
+# ------------------------------
+def _ratio(new, old):
+    if new is None or not old:
+        return "-"
+    return f"x{new / old:.2f}"
+
+
+def compare(args):
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    def label(report):
+        git = report.get("git") or {}
+        commit = (git.get("commit") or "?")[:10]
+        return commit + ("+dirty" if git.get("dirty") else "")
+
+    print(f"old={label(old)} new={label(new)}")
+    if old.get("scale") != new.get("scale"):
+        print(f"注意: シード規模が異なります old={old.get('scale')} new={new.get('scale')}")
+
+    print(f"{'scenario':16s} {'rps':>18s} {'p50 ms':>20s} {'p95 ms':>20s} {'p99 ms':>20s} {'queries':>12s}")
+    for scenario, n in new["results"].items():
+        o = old["results"].get(scenario)
+        if o is None:
+            continue
+        cells = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            cells.append(f"{o[key]}→{n[key]} {_ratio(n[key], o[key])}")
+        queries = f"{o.get('queries_mean')}→{n.get('queries_mean')}"
+        print(f"{scenario:16s} {cells[0]:>18s} {cells[1]:>20s} {cells[2]:>20s} {cells[3]:>20s} {queries:>12s}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_seed = sub.add_parser("seed", help="指定規模のテストデータを作成")
+    p_seed.add_argument("--prefix", default="bench")
+    p_seed.add_argument("--artists", type=int, default=5)
+    p_seed.add_argument("--customers-per-artist", type=int, default=200)
+    p_seed.add_argument("--consents-per-customer", type=int, default=2)
+    p_seed.add_argument("--signature-width", type=int, default=600, help="署名 PNG の幅（px。高さは 1/3）")
+    p_seed.add_argument("--password", default="bench-password")
+    p_seed.add_argument("--batch-size", type=int, default=1000)
+    p_seed.add_argument("--seed", type=int, default=1)
+    p_seed.add_argument("--fixture", default="bench_output/suite_fixture.json")
+    p_seed.set_defaults(func=seed)
+
+    p_run = sub.add_parser("run", help="シナリオごとに負荷をかけて計測")
+    p_run.add_argument("--base-url", required=True)
+    p_run.add_argument("--fixture", default="bench_output/suite_fixture.json")
+    p_run.add_argument("--scenario", action="append", choices=SCENARIOS)
+    p_run.add_argument("--concurrency", type=int, default=10)
+    p_run.add_argument("--requests", type=int, default=300)
+    p_run.add_argument("--warmup", type=int, default=20)
+    p_run.add_argument("--output")
+    p_run.set_defaults(func=run)
+
+    p_cmp = sub.add_parser("compare", help="2 つの run 結果を比較")
+    p_cmp.add_argument("old")
+    p_cmp.add_argument("new")
+    p_cmp.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
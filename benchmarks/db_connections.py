@@ -0,0 +1,122 @@
+# benchmarks/db_connections.py
+"""
+DB 接続の持ち方ごとのレイテンシ比較（PostgreSQL 環境で実行）
+
+モードごとに gunicorn を起動し、DB に触る小さいエンドポイント（/api/health/）を叩く。
+  none        … DB_CONN_MAX_AGE=0（毎リクエスト接続し直す）
+  persistent  … DB_CONN_MAX_AGE=60（スレッドごとの持続接続）
+  pooled      … DB_POOL=true（eform_api.db.pool のプール）
+
+    DJANGO_ENV=production DB_HOST=... DB_NAME=... DB_USER=... DB_PASSWORD=... \\
+        python benchmarks/db_connections.py --requests 500 --output bench_output/db_connections.json
+
+DB_HOST がリモート（RDS など）だと、接続し直しのコスト（TCP + TLS + 認証）の差が大きく出る。
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import (  # noqa: E402
+    REPO_ROOT, git_revision, http_request, run_load, summarize, write_json,
+)
+
+MODES = {
+    "none": {"DB_CONN_MAX_AGE": "0", "DB_POOL": "false"},
+    "persistent": {"DB_CONN_MAX_AGE": "60", "DB_POOL": "false"},
+    "pooled": {"DB_POOL": "true"},
+}
+
+
+def start_server(mode, port, workers, threads):
+    pidfile = Path(tempfile.gettempdir()) / f"inkbase-bench-db-{mode}.pid"
+    pidfile.unlink(missing_ok=True)
+    env = {**os.environ, **MODES[mode], "GUNICORN_WARMUP": "false"}
+    subprocess.run(
+        [
+            sys.executable, "-m", "gunicorn", "config.wsgi",
+            "-b", f"127.0.0.1:{port}", "-w", str(workers), "--threads", str(threads),
+            "-p", str(pidfile), "-D",
+        ],
+        cwd=REPO_ROOT, env=env, check=True,
+    )
+    return pidfile
+
+
+def stop_server(pidfile):
+    try:
+        pid = int(pidfile.read_text().strip())
+    except (OSError, ValueError):
+        return
+    os.kill(pid, signal.SIGTERM)
+    for _ in range(100):
+        if not pidfile.exists():
+            return
+        time.sleep(0.1)
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status, *_ = http_request("GET", url, timeout=2)
+        if status == 200:
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", action="append", choices=list(MODES),
+                        help="計測するモード（複数可。省略時は全部）")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=1, help="1 なら順番に 1 本ずつ")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--path", default="/api/health/")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}{args.path}"
+    results = []
+    for mode in args.mode or list(MODES):
+        pidfile = start_server(mode, args.port, args.workers, args.threads)
+        try:
+            if not wait_ready(url):
+                sys.exit(f"{mode}: サーバーが起動しません（{url}）")
+
+            def request(i):
+                return http_request("GET", url)
+
+            run_load(request, 1, args.warmup)
+            latencies, errors, elapsed, _ = run_load(request, args.concurrency, args.requests)
+        finally:
+            stop_server(pidfile)
+
+        summary = summarize(latencies, errors, elapsed, extra={"mode": mode, "concurrency": args.concurrency})
+        results.append(summary)
+        print(
+            f"{mode:>10}: p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms "
+            f"p99={summary['p99_ms']}ms {summary['throughput_rps']} req/s errors={errors}"
+        )
+
+    if args.output:
+        write_json(args.output, {
+            "benchmark": "db_connections",
+            "revision": git_revision(),
+            "workers": args.workers,
+            "threads": args.threads,
+            "results": results,
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# benchmarks/import_time.py
+"""
+ワーカー起動コストの計測
+
+1) モジュールごとの import 時間（python -X importtime を別プロセスで実行して集計）
+2) プロセス起動から最初のリクエスト完了までの時間
+   - cold:   何も先読みしない（ウォームアップ無しの gunicorn ワーカー相当）
+   - warmed: eform_api.warmup.warm_up() 済みの状態から計測（master で先読みして fork した場合）
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --top 30 --path /api/health/ --runs 5 --output bench_output/import_time.json
+"""
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import REPO_ROOT, write_json  # noqa: E402
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+_LOAD_APP = """
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+"""
+
+_FIRST_REQUEST = """
+import json, os, sys, time
+started = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+if {warm!r}:
+    from eform_api.warmup import warm_up
+    warm_up()
+    started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+from django.test import RequestFactory
+app = get_wsgi_application()
+environ = RequestFactory().get({path!r}, SERVER_NAME="localhost").environ
+status = []
+body = b"".join(app(environ, lambda s, h, *a: status.append(s)))
+print(json.dumps({{"seconds": time.perf_counter() - started, "status": status[0]}}))
+"""
+
+
+def _python(code, *flags):
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_times(top):
+    """(モジュール名, 自身 ms, 累積 ms) を累積時間の大きい順に返す"""
+    proc = _python(_LOAD_APP, "-X", "importtime")
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            rows.append((name, int(self_us) / 1000, int(cumulative_us) / 1000))
+
+    total_ms = sum(r[1] for r in rows)
+    project = {}
+    for row in rows:
+        if row[0].split(".")[0] in ("eform_api", "config"):
+            project[row[0]] = max(row, project.get(row[0], row), key=lambda r: r[2])
+    project = list(project.values())
+    heaviest = sorted(rows, key=lambda r: r[2], reverse=True)[:top]
+    return total_ms, heaviest, sorted(project, key=lambda r: r[2], reverse=True)
+
+
+def first_request(path, warm, runs):
+    samples = []
+    status = None
+    for _ in range(runs):
+        proc = _python(_FIRST_REQUEST.format(warm=warm, path=path))
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        samples.append(result["seconds"] * 1000)
+        status = result["status"]
+    return {
+        "median_ms": round(statistics.median(samples), 1),
+        "min_ms": round(min(samples), 1),
+        "max_ms": round(max(samples), 1),
+        "status": status,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=20, help="表示する重いモジュールの数")
+    parser.add_argument("--path", default="/api/health/", help="最初のリクエストの URL")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    total_ms, heaviest, project = import_times(args.top)
+    print(f"import 合計（自身時間の和）: {total_ms:.1f}ms")
+    print(f"\n累積 import 時間の上位 {args.top}:")
+    for name, self_ms, cumulative_ms in heaviest:
+        print(f"  {cumulative_ms:8.1f}ms  (self {self_ms:6.1f}ms)  {name}")
+    print("\nプロジェクト内モジュール:")
+    for name, self_ms, cumulative_ms in project:
+        print(f"  {cumulative_ms:8.1f}ms  (self {self_ms:6.1f}ms)  {name}")
+
+    cold = first_request(args.path, warm=False, runs=args.runs)
+    warmed = first_request(args.path, warm=True, runs=args.runs)
+    print(f"\n最初のリクエストまで ({args.path}, {args.runs} 回の中央値)")
+    print(f"  cold  : {cold['median_ms']}ms (status {cold['status']})")
+    print(f"  warmed: {warmed['median_ms']}ms (status {warmed['status']})")
+
+    if args.output:
+        write_json(args.output, {
+            "benchmark": "import_time",
+            "import_total_ms": round(total_ms, 1),
+            "heaviest": [
+                {"module": n, "self_ms": s, "cumulative_ms": c} for n, s, c in heaviest
+            ],
+            "project": [
+                {"module": n, "self_ms": s, "cumulative_ms": c} for n, s, c in project
+            ],
+            "first_request": {"path": args.path, "cold": cold, "warmed": warmed},
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# benchmarks/latency_app.py
+"""
+負荷試験用: DB クエリごとに人工的な待ち時間を入れたアプリケーション
+
+ローカルの SQLite はネットワーク往復が無いため、RDS(PostgreSQL) 相当の
+「DB 待ち」が再現できない。BENCH_DB_LATENCY_MS（既定 2ms）だけ各クエリの前に
+sleep して、同期ワーカーと ASGI ワーカーの差を手元で比較できるようにする。
+
+    BENCH_DB_LATENCY_MS=2 gunicorn benchmarks.latency_app:wsgi_application -w 1 -b 127.0.0.1:8001
+    BENCH_DB_LATENCY_MS=2 PUBLIC_CONSENT_ASYNC=true \\
+        gunicorn benchmarks.latency_app:asgi_application -w 1 -k uvicorn.workers.UvicornWorker -b 127.0.0.1:8002
+
+本番や通常の開発サーバーでは使わないこと。
+"""
+import os
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+from django.core.asgi import get_asgi_application  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+
+LATENCY = float(os.getenv("BENCH_DB_LATENCY_MS", "2")) / 1000
+
+
+def _delay(execute, sql, params, many, context):
+    time.sleep(LATENCY)
+    return execute(sql, params, many, context)
+
+
+def _install_delay(sender, connection, **kwargs):
+    if _delay not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_delay)
+
+
+connection_created.connect(_install_delay)
+
+wsgi_application = get_wsgi_application()
+asgi_application = get_asgi_application()
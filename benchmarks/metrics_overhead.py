@@ -0,0 +1,88 @@
+# benchmarks/metrics_overhead.py
+"""
+メトリクス記録のオーバーヘッド計測（マイクロベンチマーク）
+
+- observe_request 1 回あたりの時間
+- RequestTimingMiddleware を通した 1 リクエストあたりの時間（メトリクス記録あり / なし）
+
+    python benchmarks/metrics_overhead.py                  # プロセス内レジストリ
+    python benchmarks/metrics_overhead.py --multiprocess   # gunicorn と同じファイル（mmap）モード
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def per_call_us(func, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--multiprocess", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.multiprocess:
+        tmpdir = tempfile.mkdtemp(prefix="inkbase-prom-bench-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tmpdir
+
+    from benchmarks.common import setup_django, write_json
+    setup_django()
+
+    from django.conf import settings
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from django.urls import resolve
+
+    from eform_api import metrics, middleware
+    from eform_api.middleware import RequestTimingMiddleware
+
+    settings.PERF_LOG_SAMPLE_RATE = 0.0
+
+    n = args.iterations
+    observe_us = per_call_us(lambda: metrics.observe_request("public-consent-entry", "POST", 201, 0.012), n)
+
+    request = RequestFactory().get("/api/health/")
+    request.resolver_match = resolve("/api/health/")
+    mw = RequestTimingMiddleware(lambda req: HttpResponse("ok"))
+
+    with_metrics_us = per_call_us(lambda: mw(request), n)
+    original = middleware.observe_request
+    middleware.observe_request = lambda *a: None
+    try:
+        without_metrics_us = per_call_us(lambda: mw(request), n)
+    finally:
+        middleware.observe_request = original
+
+    result = {
+        "benchmark": "metrics_overhead",
+        "mode": "multiprocess" if args.multiprocess else "in-process",
+        "iterations": n,
+        "observe_request_us": round(observe_us, 3),
+        "middleware_with_metrics_us": round(with_metrics_us, 3),
+        "middleware_without_metrics_us": round(without_metrics_us, 3),
+        "metrics_overhead_us": round(with_metrics_us - without_metrics_us, 3),
+    }
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+    if args.output:
+        write_json(args.output, result)
+    if tmpdir:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/pdf_render.py
+"""
+同意書 PDF（eform_api.pdf_renderer）の生成スループット（renders/sec）
+
+DB は使わない（保存しない Customer / CustomerConsent に署名画像を付けて描画する）。
+  inline  … PDF_RENDER_PROCESSES=0（呼び出したスレッドで生成。従来のビューと同じ形）
+  pool    … --processes 個の子プロセスに投げる（ビューと同じ経路）
+
+どちらも最初の --warmup 回（フォント・CSS の読み込み）を除いて計測する。
+
+    python benchmarks/pdf_render.py
+    python benchmarks/pdf_render.py --renders 200 --concurrency 4 --processes 2 4 \\
+        --output bench_output/pdf_render.json
+"""
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import (  # noqa: E402
+    git_revision, run_load, sample_signature, setup_django, summarize, write_json,
+)
+
+
+def sample_consent():
+    from django.utils import timezone
+
+    from eform_api.models import Customer, CustomerConsent
+
+    customer = Customer(full_name="山田 花子", birth_date=date(1990, 4, 1))
+    return CustomerConsent(
+        customer=customer,
+        consent_version="1.0",
+        signed_at=timezone.now(),
+        signature=sample_signature(),
+    )
+
+
+def measure(label, consent, html_body, renders, concurrency, warmup):
+    from eform_api.pdf_renderer import render_consent_pdf
+
+    sizes = []
+
+    def render(i):
+        started = time.perf_counter()
+        try:
+            pdf = render_consent_pdf(consent, html_body=html_body)
+        except Exception as e:  # noqa: BLE001 - ベンチマークではエラー数として数える
+            print(f"{label}: {e}", file=sys.stderr)
+            return 0, b"", {}, time.perf_counter() - started
+        sizes.append(len(pdf))
+        return 200, b"", {}, time.perf_counter() - started
+
+    run_load(render, 1, warmup)
+    latencies, errors, elapsed, _ = run_load(render, concurrency, renders)
+    summary = summarize(latencies, errors, elapsed, extra={
+        "mode": label,
+        "concurrency": concurrency,
+        "renders_per_sec": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "pdf_bytes": sizes[-1] if sizes else None,
+    })
+    print(
+        f"{label:>10}: {summary['renders_per_sec']} renders/s p50={summary['p50_ms']}ms "
+        f"p95={summary['p95_ms']}ms errors={errors}"
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=2, help="同時に PDF を頼むスレッド数")
+    parser.add_argument("--processes", type=int, nargs="+", default=[2], help="pool モードの子プロセス数（複数可）")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--skip-inline", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    from eform_api import pdf_renderer
+
+    consent = sample_consent()
+    html_body = "<p>" + "施術内容・注意事項を確認し、同意します。" * 40 + "</p>"
+    # 待ち行列で 503 にならないように、同時に頼む数まで受け付ける
+    settings.PDF_RENDER_MAX_PENDING = max(settings.PDF_RENDER_MAX_PENDING, args.concurrency)
+
+    results = []
+    if not args.skip_inline:
+        settings.PDF_RENDER_PROCESSES = 0
+        results.append(measure("inline", consent, html_body, args.renders, args.concurrency, args.warmup))
+    for processes in args.processes:
+        settings.PDF_RENDER_PROCESSES = processes
+        try:
+            # 子プロセスごとにフォントを読むので、warmup は子プロセスの数だけ増やす
+            results.append(measure(
+                f"pool x{processes}", consent, html_body, args.renders, args.concurrency,
+                args.warmup * processes,
+            ))
+        finally:
+            pdf_renderer.shutdown_pool()
+
+    if args.output:
+        write_json(args.output, {
+            "benchmark": "pdf_render",
+            "revision": git_revision(),
+            "results": results,
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# benchmarks/public_consent_load.py
+"""
+QR 同意フロー（public API）の負荷試験: 同期ワーカー vs ASGI ワーカーの比較用
+
+1) テスト用の彫師・トークン・顧客を作る（settings の DB に書き込む）
+     python benchmarks/public_consent_load.py seed
+   → 出力された token / phone / birth_date を控える
+
+2) サーバーを起動（ワーカー数は揃える）
+     # 同期（現行構成）
+     gunicorn config.wsgi -w 1 -b 127.0.0.1:8001
+     # 非同期（QR フローを async ビューに差し替え）
+     PUBLIC_CONSENT_ASYNC=true gunicorn config.asgi -w 1 -k uvicorn.workers.UvicornWorker -b 127.0.0.1:8002
+
+3) 同じ条件で負荷をかけて比較
+     python benchmarks/public_consent_load.py run \\
+         --base-url http://127.0.0.1:8001 --base-url http://127.0.0.1:8002 \\
+         --token <token> --concurrency 50 --requests 2000 --scenario mixed \\
+         --output bench_output/public_consent.json
+
+scenario:
+  status  … GET  /api/consent/public/token/<token>/
+  lookup  … GET  /api/consent/public/lookup-by-phone/
+  entry   … POST /api/consent/public/entry/（毎回別の電話番号で新規顧客）
+  renew   … POST /api/consent/public/renew/
+  mixed   … QR 読み取り直後の実際の比率に近い status:lookup:entry:renew = 4:3:2:1
+"""
+import argparse
+import sys
+import urllib.parse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import (  # noqa: E402
+    http_request, run_load, sample_signature, setup_django, summarize, write_json,
+)
+
+MIXED = ["status"] * 4 + ["lookup"] * 3 + ["entry"] * 2 + ["renew"]
+
+
+def seed(args):
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from eform_api.models import TattooArtist, Customer, ConsentEntryToken
+
+    User = get_user_model()
+    user, _ = User.objects.get_or_create(
+        username=args.username, defaults={"email": f"{args.username}@example.com"}
+    )
+    artist, _ = TattooArtist.objects.get_or_create(
+        user=user, defaults={"artist_name": args.username, "email": user.email}
+    )
+    token = ConsentEntryToken.objects.filter(artist=artist, is_active=True).first()
+    if token is None:
+        token = ConsentEntryToken.objects.create(artist=artist, label="loadtest")
+    customer, _ = Customer.objects.get_or_create(
+        user=user,
+        phone_number=args.phone,
+        defaults={"full_name": "負荷試験 太郎", "birth_date": args.birth_date},
+    )
+    print(f"token={token.uuid}")
+    print(f"customer={customer.uuid}")
+    print(f"phone={customer.phone_number} birth_date={customer.birth_date}")
+
+
+def make_request_factory(base_url, args):
+    base = base_url.rstrip("/") + "/api/consent/public"
+    scenario = args.scenario
+    # 画像として読めない署名は 400 になるので本物の PNG（600x200）を送る
+    signature = sample_signature()
+
+    def request(i):
+        kind = MIXED[i % len(MIXED)] if scenario == "mixed" else scenario
+        if kind == "status":
+            return http_request("GET", f"{base}/token/{args.token}/")
+        if kind == "lookup":
+            query = urllib.parse.urlencode({
+                "entry_token": args.token, "phone": args.phone, "birth_date": args.birth_date,
+            })
+            return http_request("GET", f"{base}/lookup-by-phone/?{query}")
+        if kind == "entry":
+            return http_request("POST", f"{base}/entry/", body={
+                "entry_token": args.token,
+                "full_name": "負荷試験 花子",
+                "gender": "female",
+                "birth_date": args.birth_date,
+                "prefecture": "東京都",
+                "city": "渋谷区",
+                "phone_number": f"080{i:08d}"[-11:],
+                "consent_version": "bench",
+                "privacy_agreement_version": "bench",
+                "signature": signature,
+            })
+        return http_request("POST", f"{base}/renew/", body={
+            "entry_token": args.token,
+            "customer_uuid": args.customer,
+            "consent_version": "bench",
+            "privacy_agreement_version": "bench",
+            "signature": signature,
+        })
+
+    return request
+
+
+def run(args):
+    if args.scenario in ("renew", "mixed") and not args.customer:
+        sys.exit("--customer が必要です（seed の出力を指定）")
+
+    results = []
+    for base_url in args.base_url:
+        factory = make_request_factory(base_url, args)
+        # ウォームアップ（接続・import・初回クエリのコストを除外）
+        run_load(factory, min(args.concurrency, 4), args.warmup)
+        latencies, errors, elapsed, _ = run_load(factory, args.concurrency, args.requests)
+        summary = summarize(latencies, errors, elapsed, extra={
+            "base_url": base_url,
+            "scenario": args.scenario,
+            "concurrency": args.concurrency,
+        })
+        results.append(summary)
+        print(
+            f"{base_url}: {summary['throughput_rps']} req/s "
+            f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms "
+            f"errors={errors}"
+        )
+
+    if len(results) > 1 and results[0]["throughput_rps"]:
+        for r in results[1:]:
+            ratio = (r["throughput_rps"] or 0) / results[0]["throughput_rps"]
+            print(f"{r['base_url']} / {results[0]['base_url']}: x{ratio:.2f}")
+
+    if args.output:
+        write_json(args.output, {"benchmark": "public_consent_load", "results": results})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_seed = sub.add_parser("seed", help="負荷試験用の彫師・トークン・顧客を作成")
+    p_seed.add_argument("--username", default="loadtest")
+    p_seed.add_argument("--phone", default="09000000000")
+    p_seed.add_argument("--birth-date", default="1990-01-01")
+    p_seed.set_defaults(func=seed)
+
+    p_run = sub.add_parser("run", help="負荷をかけて計測")
+    p_run.add_argument("--base-url", action="append", required=True)
+    p_run.add_argument("--token", required=True)
+    p_run.add_argument("--customer", help="renew 用の顧客 UUID")
+    p_run.add_argument("--phone", default="09000000000")
+    p_run.add_argument("--birth-date", default="1990-01-01")
+    p_run.add_argument("--scenario", choices=["status", "lookup", "entry", "renew", "mixed"], default="status")
+    p_run.add_argument("--concurrency", type=int, default=20)
+    p_run.add_argument("--requests", type=int, default=1000)
+    p_run.add_argument("--warmup", type=int, default=50)
+    p_run.add_argument("--output")
+    p_run.set_defaults(func=run)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
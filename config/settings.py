@@ -66,12 +66,16 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # 読み取りレプリカへの振り分け（レプリカ未設定なら何もしない）
+    "eform_api.middleware.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # リクエスト計測（Server-Timing / 構造化ログ）
+    "eform_api.middleware.RequestTimingMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -93,6 +97,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "config.wsgi.application"
+ASGI_APPLICATION = "config.asgi.application"
+
+# QR 同意フロー（public API）を async 版のビューで配信するか
+# ASGI（gunicorn -k uvicorn.workers.UvicornWorker 等）で動かすときに true にする
+PUBLIC_CONSENT_ASYNC = os.getenv("PUBLIC_CONSENT_ASYNC", "False").lower() == "true"
 
 # ====== DB（本番: RDS PostgreSQL）======
 if ENV_NAME == "local":
@@ -103,6 +112,14 @@ if ENV_NAME == "local":
             "NAME": BASE_DIR / "db.sqlite3",
         }
     }
+    # 読み取りレプリカの動作確認用: DB_REPLICA_NAME=db_replica.sqlite3 で 2 つ目の SQLite を
+    # レプリカに見立てる（中身は db.sqlite3 をコピーしておく）
+    if os.getenv("DB_REPLICA_NAME"):
+        DATABASES["replica"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / os.getenv("DB_REPLICA_NAME"),
+            "TEST": {"MIRROR": "default"},
+        }
 else:
     # 本番など → RDS(PostgreSQL)
     DATABASES = {
@@ -113,13 +130,80 @@ else:
             "PASSWORD": os.getenv("DB_PASSWORD"),
             "HOST": os.getenv("DB_HOST"),
             "PORT": os.getenv("DB_PORT", "5432"),
+            # 接続をリクエストをまたいで使い回す秒数（0 = 毎リクエスト接続し直す）
+            "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+            # 使い回す前に接続が生きているか確かめる（RDS のフェイルオーバー・アイドル切断対策）
+            "CONN_HEALTH_CHECKS": True,
+        }
+    }
+
+    # DB_POOL=true: プロセス内の接続プール（eform_api.db.pool）を使う。
+    # スレッド・ASGI ワーカーでスレッド数より少ない接続を使い回したいとき用。
+    # リクエストの終わりごとにプールへ返すので CONN_MAX_AGE は 0 にする
+    if os.getenv("DB_POOL", "False").lower() == "true":
+        DATABASES["default"].update({
+            "ENGINE": "eform_api.db.pooled",
+            "CONN_MAX_AGE": 0,
+            "CONN_HEALTH_CHECKS": False,
+            "POOL": {
+                "MIN_SIZE": int(os.getenv("DB_POOL_MIN_SIZE", "0")),
+                "MAX_SIZE": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                "TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+                "MAX_IDLE": float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+                "MAX_LIFETIME": float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+            },
+        })
+
+    # 読み取りレプリカ（RDS リードレプリカ）: DB_REPLICA_HOST か DB_REPLICA_NAME を設定すると
+    # "replica" を追加し、GET などの読み取りをそちらへ振り分ける（eform_api.db.routers）
+    if os.getenv("DB_REPLICA_HOST") or os.getenv("DB_REPLICA_NAME"):
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "NAME": os.getenv("DB_REPLICA_NAME", DATABASES["default"]["NAME"]),
+            "USER": os.getenv("DB_REPLICA_USER", DATABASES["default"]["USER"]),
+            "PASSWORD": os.getenv("DB_REPLICA_PASSWORD", DATABASES["default"]["PASSWORD"]),
+            "HOST": os.getenv("DB_REPLICA_HOST", DATABASES["default"]["HOST"]),
+            "PORT": os.getenv("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+            "TEST": {"MIRROR": "default"},
+        }
+
+DATABASE_ROUTERS = ["eform_api.db.routers.ReplicaRouter"]
+DB_REPLICA_ALIAS = "replica"
+# 書き込みをしたクライアントの読み取りを default に寄せておく秒数（レプリカの遅延より長く）
+DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", "10"))
+# ログインユーザーの pin を置くキャッシュ（CACHES の alias）。
+# ワーカー間で共有されるもの（REDIS_URL）でないと manage.py check がエラーにし、起動もしない
+DB_REPLICA_PIN_CACHE_ALIAS = os.getenv("DB_REPLICA_PIN_CACHE_ALIAS", "default")
+
+# ====== キャッシュ ======
+# JWT のユーザーキャッシュ・レプリカの pin は gunicorn のワーカー間で共有されていないと働かない
+# （ユーザーの無効化や書き込み直後の pin が、処理したワーカーにしか伝わらない）。
+# REDIS_URL があれば Redis（ElastiCache など）、無ければプロセスごとのメモリ。
+# プロセスごとのメモリのままだと、JWT のユーザーキャッシュは使わず（毎回 DB を引く）、
+# レプリカを設定していれば manage.py check がエラーにする（eform_api.checks）
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         }
     }
+# プロセスごとのキャッシュ（LocMemCache）を共有キャッシュとみなしてよいか。
+# runserver・テストなど 1 プロセスで動かすときだけ True（DJANGO_ENV=local の既定）
+LOCAL_CACHE_IS_SHARED = os.getenv("LOCAL_CACHE_IS_SHARED", str(ENV_NAME == "local")).lower() == "true"
 
 # ====== 認証 / REST ======
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # simplejwt の JWTAuthentication + ユーザーのキャッシュ
+        "eform_api.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
 }
@@ -130,8 +214,60 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# JWT 認証で引いた User をキャッシュする秒数と、使うキャッシュ（CACHES の alias）。
+# ワーカー間で共有されないキャッシュ（LOCAL_CACHE_IS_SHARED=False の LocMemCache）なら使わない
+JWT_USER_CACHE_SECONDS = int(os.getenv("JWT_USER_CACHE_SECONDS", "60"))
+JWT_USER_CACHE_ALIAS = os.getenv("JWT_USER_CACHE_ALIAS", "default")
+# True: 読み取りリクエストはキャッシュに無くても DB を引かず、トークンの user_id を信用する
+JWT_TRUST_CLAIMS = os.getenv("JWT_TRUST_CLAIMS", "False").lower() == "true"
+
+# 顧客詳細に載せる同意履歴の件数（続きは /api/customers/<uuid>/consents/ で読む）
+CUSTOMER_CONSENT_PAGE_SIZE = int(os.getenv("CUSTOMER_CONSENT_PAGE_SIZE", "10"))
+
+# 管理画面の一覧の件数表示。絞り込みの無い一覧は、PostgreSQL の統計の推定件数がこれ以上なら
+# COUNT(*) をせず推定件数を使う
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv("ADMIN_ESTIMATED_COUNT_THRESHOLD", "10000"))
+# 検索・絞り込み時の件数はここで打ち切る（それ以上のページは検索条件を足して辿る）
+ADMIN_COUNT_LIMIT = int(os.getenv("ADMIN_COUNT_LIMIT", "10000"))
+
 AUTHENTICATION_BACKENDS = ["django.contrib.auth.backends.ModelBackend"]
 
+# ====== パフォーマンス計測 ======
+# Server-Timing ヘッダを付けるか（ブラウザの開発者ツールで内訳が見える）
+PERF_SERVER_TIMING = os.getenv("PERF_SERVER_TIMING", "True").lower() == "true"
+# 構造化ログ（eform_api.perf）を出すリクエストの割合 0.0〜1.0
+PERF_LOG_SAMPLE_RATE = float(os.getenv("PERF_LOG_SAMPLE_RATE", "0.05"))
+
+# /metrics（Prometheus）の閲覧。スタッフユーザーは常に可。それ以外は明示的に設定したときだけ許可する
+# - METRICS_BEARER_TOKEN: Authorization: Bearer <token>（Prometheus の authorization.credentials）
+# - METRICS_ALLOWED_IPS: REMOTE_ADDR で許可する IP（カンマ区切り, CIDR 可）。既定は空。
+#   同じホストのリバースプロキシ経由だと外からのリクエストも 127.0.0.1 に見えるので、その構成では使わない
+METRICS_BEARER_TOKEN = os.getenv("METRICS_BEARER_TOKEN", "")
+METRICS_ALLOWED_IPS = [
+    ip.strip() for ip in os.getenv("METRICS_ALLOWED_IPS", "").split(",") if ip.strip()
+]
+
+# ====== ログ ======
+LOG_LEVEL = os.getenv("DJANGO_LOG_LEVEL", "INFO")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "default": {"format": "[{asctime}] {levelname} {name}: {message}", "style": "{"},
+        # eform_api.perf は JSON 1 行をそのまま出す（ログ基盤でパースする）
+        "raw": {"format": "{message}", "style": "{"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "default"},
+        "perf": {"class": "logging.StreamHandler", "formatter": "raw"},
+    },
+    "root": {"handlers": ["console"], "level": LOG_LEVEL},
+    "loggers": {
+        "eform_api.perf": {"handlers": ["perf"], "level": "INFO", "propagate": False},
+    },
+}
+
 # ====== 国際化 ======
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "Asia/Tokyo"
@@ -159,7 +295,10 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_HEADERS = list(default_headers) + [
     "authorization",
+    "idempotency-key",  # public 同意送信の二重送信対策（eform_api.idempotency）
 ]
+# 再送に保存済みの応答を返したことをフロントから見られるようにする
+CORS_EXPOSE_HEADERS = ["Idempotent-Replayed", "Retry-After"]
 
 # ====== セキュアCookie / プロキシ ======
 SESSION_COOKIE_SAMESITE = "Lax"
@@ -174,11 +313,87 @@ CSRF_COOKIE_DOMAIN = "api.inkbase.jp"
 SESSION_COOKIE_DOMAIN = "api.inkbase.jp"
 
 
+# ====== public API の二重送信対策（eform_api.idempotency）======
+# 最初の応答を残しておく秒数（prune_idempotency_keys で消す）
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# 「処理中」のまま残った行（ワーカーが落ちた）を、同じキーの再送が引き継ぐまでの秒数
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+# ====== 同意書 PDF（eform_api.pdf_renderer）======
+# HTML → PDF を行う子プロセスの数（gunicorn ワーカーごと）。0 ならリクエストのプロセスで生成
+PDF_RENDER_PROCESSES = int(os.getenv("PDF_RENDER_PROCESSES", "1"))
+# 同時に受け付ける PDF の数と、空きを待つ秒数（超えたら 503）
+PDF_RENDER_MAX_PENDING = int(os.getenv("PDF_RENDER_MAX_PENDING", "4"))
+PDF_RENDER_QUEUE_TIMEOUT = float(os.getenv("PDF_RENDER_QUEUE_TIMEOUT", "5"))
+PDF_RENDER_TIMEOUT = float(os.getenv("PDF_RENDER_TIMEOUT", "30"))
+PDF_RENDER_START_METHOD = os.getenv("PDF_RENDER_START_METHOD", "forkserver")
+# 日本語フォント（TTF / OTF）のパス。未設定ならシステムの CJK フォント（Noto Sans CJK JP 等）
+PDF_FONT_PATH = os.getenv("PDF_FONT_PATH", "")
+
+# 登録されていない同意書の版（eform_api.consent_documents）を「無い」と覚えておく秒数
+CONSENT_DOCUMENT_MISS_SECONDS = int(os.getenv("CONSENT_DOCUMENT_MISS_SECONDS", "60"))
+
+# 署名時に PDF を作って S3 に置いておく（eform_api.consent_pdfs / render_consent_pdfs ワーカー）
+CONSENT_PDF_PRECOMPUTE = os.getenv("CONSENT_PDF_PRECOMPUTE", "true").lower() == "true"
+CONSENT_PDF_BUCKET = os.getenv("CONSENT_PDF_BUCKET", "")  # 空なら AWS_S3_BUCKET_NAME
+CONSENT_PDF_PREFIX = os.getenv("CONSENT_PDF_PREFIX", "consent_pdfs/")
+# 保存済み PDF の返し方: "stream"（Django が S3 から読んで返す）/ "redirect"（署名付き URL へ 302）
+CONSENT_PDF_DELIVERY = os.getenv("CONSENT_PDF_DELIVERY", "stream")
+CONSENT_PDF_URL_SECONDS = int(os.getenv("CONSENT_PDF_URL_SECONDS", "60"))
+CONSENT_PDF_MAX_ATTEMPTS = int(os.getenv("CONSENT_PDF_MAX_ATTEMPTS", "5"))
+CONSENT_PDF_BACKOFF_SECONDS = int(os.getenv("CONSENT_PDF_BACKOFF_SECONDS", "60"))
+CONSENT_PDF_BACKOFF_MAX_SECONDS = int(os.getenv("CONSENT_PDF_BACKOFF_MAX_SECONDS", "3600"))
+# rendering のまま止まった行（ワーカーが落ちた）を拾い直すまでの秒数
+CONSENT_PDF_LOCK_SECONDS = int(os.getenv("CONSENT_PDF_LOCK_SECONDS", "300"))
+
+
+# ====== 署名（eform_api.signatures）======
+# 画像の署名を詰め直す形式（"webp" = 可逆 WebP / "png"）
+SIGNATURE_IMAGE_FORMAT = os.getenv("SIGNATURE_IMAGE_FORMAT", "webp")
+SIGNATURE_MAX_UPLOAD_BYTES = int(os.getenv("SIGNATURE_MAX_UPLOAD_BYTES", str(2 * 1024 * 1024)))
+SIGNATURE_MAX_PIXELS = int(os.getenv("SIGNATURE_MAX_PIXELS", str(4000 * 4000)))
+SIGNATURE_MAX_POINTS = int(os.getenv("SIGNATURE_MAX_POINTS", "20000"))
+# 筆跡を間引くときに許すずれ（px）。0 で間引かない
+SIGNATURE_STROKE_TOLERANCE = float(os.getenv("SIGNATURE_STROKE_TOLERANCE", "0.75"))
+
+
 # ====== メール（暫定: ファイル）======
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = BASE_DIR / "sent_emails"
 DEFAULT_FROM_EMAIL = "noreply@inkbase.app"
 
+# 送信キュー（EmailOutbox）: manage.py send_queued_emails が送信する
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "30"))
+EMAIL_OUTBOX_BACKOFF_MAX_SECONDS = int(os.getenv("EMAIL_OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+# sending のまま残った行（ワーカー停止など）を取り直すまでの秒数
+EMAIL_OUTBOX_LOCK_SECONDS = int(os.getenv("EMAIL_OUTBOX_LOCK_SECONDS", "300"))
+# 送信済み・送信失敗の行を残す日数（本文にパスワード再設定リンク等を含むので prune_email_outbox で消す）
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", "7"))
+
+# ====== ヘルスチェック（/api/health/live/, /api/health/ready/, 内訳は /api/health/ready/detail/）======
+# 依存先の確認結果をプロセスごとに何秒使い回すか（LB が高頻度で叩いても依存先に負荷をかけない）
+HEALTH_CHECK_CACHE_SECONDS = float(os.getenv("HEALTH_CHECK_CACHE_SECONDS", "5"))
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "2"))
+# 失敗したら readiness を 503 にする確認（それ以外は degraded として 200 のまま返す）
+HEALTH_READINESS_REQUIRED = [
+    name.strip() for name in os.getenv("HEALTH_READINESS_REQUIRED", "database").split(",") if name.strip()
+]
+
+# ====== 顧客 CSV 取り込み ======
+# これより大きいファイルは CustomerImportJob に積んで manage.py run_customer_imports で取り込む
+CUSTOMER_IMPORT_SYNC_MAX_BYTES = int(os.getenv("CUSTOMER_IMPORT_SYNC_MAX_BYTES", str(1024 * 1024)))
+# running のまま進捗が止まったジョブ（ワーカー停止など）を取り直すまでの秒数
+CUSTOMER_IMPORT_LOCK_SECONDS = int(os.getenv("CUSTOMER_IMPORT_LOCK_SECONDS", "600"))
+# 取り直しても終わらないジョブは、この回数で failed にする
+CUSTOMER_IMPORT_MAX_ATTEMPTS = int(os.getenv("CUSTOMER_IMPORT_MAX_ATTEMPTS", "3"))
+
+# ====== アクセスログの保持期間（manage.py prune_access_logs）======
+# 今月を含めて何か月分の生ログを残すか。日次ロールアップは消さない
+ACCESS_LOG_RETENTION_MONTHS = int(os.getenv("ACCESS_LOG_RETENTION_MONTHS", "13"))
+# PostgreSQL のパーティションを何か月先まで作っておくか
+ACCESS_LOG_PARTITION_MONTHS_AHEAD = int(os.getenv("ACCESS_LOG_PARTITION_MONTHS_AHEAD", "3"))
+
 # ====== フロントURL（通知等に使用）======
 FRONTEND_URL = os.getenv(
     "FRONTEND_URL", "https://main.d2c780cwbqb4nq.amplifyapp.com")
@@ -3,12 +3,14 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from eform_api.views.metrics_views import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),                # 管理画面（/admin/）
     path('auth/', include('djoser.urls')),          # Djoser のAPI（/auth/）
     path('auth/', include('djoser.urls.jwt')),      # Djoser のJWT認証（/auth/jwt/）
     path('api/', include('eform_api.urls')),        # eform_api アプリのAPI（/api/...）
+    path('metrics', MetricsView.as_view(), name='metrics'),  # Prometheus（/metrics）
 ]
 
 # MEDIAファイルの配信設定（DEBUG=True の時だけ）
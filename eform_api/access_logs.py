@@ -0,0 +1,321 @@
+# eform_api/access_logs.py
+"""
+公開同意フォームのアクセスログ（ConsentAccessLog）の記録・集計・保持期間管理
+
+- record_access: ログ 1 行 + トークン×IP×日のロールアップ加算 + トークンの最終利用日時
+- rebuild_access_rollups: 生ログからロールアップを作り直す（生ログの削除前・バックフィル用）
+- PostgreSQL ではログ表は created_at の月ごとのレンジパーティション（migration 0013）。
+  ensure_partitions で先の月を作り、drop_month で古い月をパーティションごと削除する。
+  SQLite 等のパーティション無しの DB では、同じ関数が 1 本の DELETE で月単位に削除する
+- 月の区切りは TIME_ZONE（Asia/Tokyo）
+"""
+import csv
+import gzip
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Max, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ConsentAccessDailyRollup, ConsentAccessLog
+from .rollups import local_date
+
+TABLE = ConsentAccessLog._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+# ------------------------------
+# 1. 記録
+# ------------------------------
+def record_access(token, ip_address, user_agent="", customer_phone="", now=None):
+    """アクセスログを 1 行記録し、日次ロールアップとトークンの最終利用日時を更新する"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        log = ConsentAccessLog.objects.create(
+            token=token,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            customer_phone=customer_phone,
+        )
+        bump_access_rollup(token.pk, ip_address, log.created_at)
+
+    token.last_used_at = now
+    token.save(update_fields=["last_used_at"])
+    return log
+
+
+def bump_access_rollup(token_id, ip_address, at):
+    """(token, ip, 日) のロールアップを 1 件加算する。通常は UPDATE 1 本"""
+    day = local_date(at)
+    rollups = ConsentAccessDailyRollup.objects.filter(token_id=token_id, ip_address=ip_address, date=day)
+    if rollups.update(access_count=F("access_count") + 1, last_at=at):
+        return
+    try:
+        # その日の最初のアクセス（同時に来た別リクエストと競合したら加算に回る）
+        with transaction.atomic():
+            ConsentAccessDailyRollup.objects.create(
+                token_id=token_id, ip_address=ip_address, date=day,
+                access_count=1, first_at=at, last_at=at,
+            )
+    except IntegrityError:
+        rollups.update(access_count=F("access_count") + 1, last_at=at)
+
+
+# ------------------------------
+# 2. ロールアップの作り直し
+# ------------------------------
+def rebuild_access_rollups(user_ids=None, since=None, until=None, batch_size=5000):
+    """
+    [since, until]（日付, 両端含む）のロールアップを生ログから作り直し、作成行数を返す。
+    user_ids を渡すとその彫師のトークン分だけ。
+    生ログが残っていない日（保持期間切れ）のロールアップは消さない。
+    """
+    logs = ConsentAccessLog.objects.all()
+    stale = ConsentAccessDailyRollup.objects.all()
+    if user_ids is not None:
+        logs = logs.filter(token__artist__user_id__in=user_ids)
+        stale = stale.filter(token__artist__user_id__in=user_ids)
+
+    oldest = ConsentAccessLog.objects.aggregate(oldest=Min("created_at"))["oldest"]
+    if oldest is None:
+        return 0
+    since = max(since, local_date(oldest)) if since else local_date(oldest)
+    if until is not None and until < since:
+        return 0
+
+    logs = logs.filter(created_at__gte=_day_start(since))
+    stale = stale.filter(date__gte=since)
+    if until is not None:
+        logs = logs.filter(created_at__lt=_day_start(until + timedelta(days=1)))
+        stale = stale.filter(date__lte=until)
+
+    rows = (
+        logs.annotate(day=TruncDate("created_at"))
+        .values("token_id", "ip_address", "day")
+        .annotate(access_count=Count("pk"), first_at=Min("created_at"), last_at=Max("created_at"))
+        .order_by()
+    )
+
+    created = 0
+    with transaction.atomic():
+        stale.delete()
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(ConsentAccessDailyRollup(
+                token_id=row["token_id"],
+                ip_address=row["ip_address"],
+                date=row["day"],
+                access_count=row["access_count"],
+                first_at=row["first_at"],
+                last_at=row["last_at"],
+            ))
+            if len(batch) >= batch_size:
+                ConsentAccessDailyRollup.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        ConsentAccessDailyRollup.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+# ------------------------------
+# 3. 月の計算
+# ------------------------------
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_current_timezone())
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+def month_range(month):
+    """その月を [start, end) の aware datetime（TIME_ZONE）で返す"""
+    return _day_start(month), _day_start(add_months(month, 1))
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+# ------------------------------
+# 4. パーティション管理（PostgreSQL）
+# ------------------------------
+def is_partitioned():
+    """ログ表が PostgreSQL のパーティションテーブルか"""
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND c.relnamespace = to_regnamespace(current_schema())",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partition_months():
+    """月パーティションの月（1 日の date）を古い順に返す。DEFAULT パーティションは含めない"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND p.relnamespace = to_regnamespace(current_schema())",
+            [TABLE],
+        )
+        names = [name for (name,) in cursor.fetchall()]
+
+    prefix = f"{TABLE}_p"
+    months = []
+    for name in names:
+        if name.startswith(prefix):
+            months.append(datetime.strptime(name[len(prefix):], "%Y%m").date())
+    return sorted(months)
+
+
+def create_partition(month):
+    """
+    month のパーティションを作る。DEFAULT パーティションにその月の行が入っていたら
+    新しいパーティションへ移してから ATTACH する（そのままだと CREATE が失敗する）。
+    """
+    name = partition_name(month)
+    start, end = month_range(month)
+    quote = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {quote(DEFAULT_PARTITION)} "
+            f"WHERE created_at >= %s AND created_at < %s)",
+            [start, end],
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f"CREATE TABLE {quote(name)} PARTITION OF {quote(TABLE)} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+            return
+
+        cursor.execute(
+            f"CREATE TABLE {quote(name)} (LIKE {quote(TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {quote(DEFAULT_PARTITION)} "
+            f"WHERE created_at >= %s AND created_at < %s RETURNING *) "
+            f"INSERT INTO {quote(name)} SELECT * FROM moved",
+            [start, end],
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(TABLE)} ATTACH PARTITION {quote(name)} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+def ensure_partitions(months_ahead=3, since=None, today=None):
+    """
+    since の月（省略時は今月）から今月の months_ahead か月先までのパーティションを作り、
+    作った月を返す。過去日付のデータを流し込む前は since を渡しておく。
+    """
+    current = month_start(today or timezone.localdate())
+    month = month_start(since) if since else current
+    last = add_months(current, months_ahead)
+    existing = set(list_partition_months())
+    created = []
+    while month <= last:
+        if month not in existing:
+            create_partition(month)
+            created.append(month)
+        month = add_months(month, 1)
+    return created
+
+
+# ------------------------------
+# 5. 保持期間（月単位の削除・アーカイブ）
+# ------------------------------
+def months_with_logs(before):
+    """before（月初の date）より前にログが残っている月を古い順に返す"""
+    if is_partitioned():
+        months = [m for m in list_partition_months() if m < before]
+        # DEFAULT パーティションに紛れ込んだ古い行も対象にする
+        months += _default_partition_months(before)
+        return sorted(set(months))
+
+    oldest = ConsentAccessLog.objects.aggregate(oldest=Min("created_at"))["oldest"]
+    if oldest is None:
+        return []
+    months = []
+    month = month_start(local_date(oldest))
+    while month < before:
+        start, end = month_range(month)
+        if ConsentAccessLog.objects.filter(created_at__gte=start, created_at__lt=end).exists():
+            months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def _default_partition_months(before):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE %s)::date "
+            f"FROM {connection.ops.quote_name(DEFAULT_PARTITION)} WHERE created_at < %s",
+            [timezone.get_current_timezone_name(), _day_start(before)],
+        )
+        return [month for (month,) in cursor.fetchall()]
+
+
+def archive_month(month, archive_dir):
+    """その月のログを <archive_dir>/consent_access_log_YYYYMM.csv.gz に書き出し、行数を返す"""
+    start, end = month_range(month)
+    path = Path(archive_dir) / f"consent_access_log_{month:%Y%m}.csv.gz"
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    columns = [f.column for f in ConsentAccessLog._meta.concrete_fields]
+    rows = (
+        ConsentAccessLog.objects.filter(created_at__gte=start, created_at__lt=end)
+        .order_by("created_at")
+        .values_list(*[f.attname for f in ConsentAccessLog._meta.concrete_fields])
+    )
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows.iterator(chunk_size=10000):
+            writer.writerow(row)
+            count += 1
+    return path, count
+
+
+def drop_month(month):
+    """
+    その月のログを削除して行数を返す。
+    - パーティションがあれば DETACH して DROP（行ごとの削除をしない）
+    - パーティション無し（SQLite 等）・DEFAULT に紛れた行は範囲指定の DELETE 1 本
+    """
+    start, end = month_range(month)
+    quote = connection.ops.quote_name
+    removed = 0
+
+    if is_partitioned():
+        name = partition_name(month)
+        if month in list_partition_months():
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"SELECT count(*) FROM {quote(name)}")
+                removed += cursor.fetchone()[0]
+                cursor.execute(f"ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(name)}")
+                cursor.execute(f"DROP TABLE {quote(name)}")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {quote(DEFAULT_PARTITION)} WHERE created_at >= %s AND created_at < %s",
+                [start, end],
+            )
+            removed += cursor.rowcount
+        return removed
+
+    # ConsentAccessLog を参照するモデルもシグナルも無いので QuerySet.delete() は DELETE 1 本になる
+    deleted, _ = ConsentAccessLog.objects.filter(created_at__gte=start, created_at__lt=end).delete()
+    return deleted
@@ -1,11 +1,92 @@
+import re
+import uuid
+
 from django.contrib import admin
-from .models import Customer, TattooArtist, CustomerConsent, UserAgreement
+from django.db.models import Q
+
+from .models import ConsentDocumentVersion, Customer, TattooArtist, CustomerConsent, UserAgreement
+from .pagination import EstimatedCountPaginator
+from .rollups import refreshing_customer_rollups
+from .utils import normalize_phone_number
+
+# =========================================
+# 大きな表の一覧・検索
+# =========================================
+# 顧客・同意履歴は数百万行になるので、一覧は
+# - 件数: EstimatedCountPaginator（COUNT(*) で表全体を読まない）。「全 N 件」の 2 回目の COUNT もしない
+# - 検索: 既定の icontains（'%xxx%' で全件走査）の代わりに、入力の形を見て索引の効く照合に振り分ける
+#   （uuid → 完全一致 / 電話番号 → 正規化して前方一致 / それ以外 → 名前の前方一致）
+# - 外部キー: list_select_related で 1 クエリにまとめ、編集画面は raw_id_fields（全件の <select> を作らない）
+_PHONE = re.compile(r"^[\d０-９+＋()（）\-ー－\s]+$")
+
+
+def _as_uuid(term):
+    try:
+        return uuid.UUID(term)
+    except ValueError:
+        return None
+
+
+def _as_phone(term):
+    """電話番号らしい入力なら正規化した番号（数字 4 桁以上）、そうでなければ None"""
+    if not _PHONE.match(term):
+        return None
+    phone = normalize_phone_number(term)
+    return phone if len(phone) >= 4 else None
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # サブクラスで search_q(term) → Q（1 語分の検索条件）を定義すると、検索はそれだけで行う。
+    # 定義しなければ Django の既定（search_fields）のまま
+    def get_search_results(self, request, queryset, search_term):
+        if not hasattr(self, 'search_q'):
+            return super().get_search_results(request, queryset, search_term)
+        terms = search_term.split()
+        if not terms:
+            return queryset, False
+        for term in terms:
+            queryset = queryset.filter(self.search_q(term))
+        return queryset, False
+
+
+class DocumentVersionFilter(admin.SimpleListFilter):
+    """
+    版での絞り込み。選択肢は登録済みの版（ConsentDocumentVersion）から作る
+    （既定の list_filter は選択肢のために同意履歴の表全体へ SELECT DISTINCT を投げる）。
+    登録していない古い版も ?<parameter_name>=<版> なら絞り込める
+    """
+    kind = None
+
+    def lookups(self, request, model_admin):
+        versions = ConsentDocumentVersion.objects.filter(kind=self.kind).values_list("version", flat=True)
+        return [(version, version) for version in versions]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+
+class ConsentVersionFilter(DocumentVersionFilter):
+    title = "同意書のバージョン"
+    parameter_name = "consent_version"
+    kind = ConsentDocumentVersion.KIND_CONSENT
+
+
+class PrivacyVersionFilter(DocumentVersionFilter):
+    title = "プライバシーポリシーのバージョン"
+    parameter_name = "privacy_agreement_version"
+    kind = ConsentDocumentVersion.KIND_PRIVACY
+
 
 # =========================================
 # 顧客モデル（Customer）の管理画面設定
 # =========================================
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(LargeTableAdmin):
     # 管理画面の一覧に表示するフィールド
     list_display = (
         'id',               # 顧客の内部ID
@@ -25,21 +106,46 @@ class CustomerAdmin(admin.ModelAdmin):
         'created_at',          # 登録日で絞り込み
     )
 
-    # 検索窓で対象とするフィールド
+    # 検索窓（実際の条件は search_q。uuid / 電話番号 / Instagram ID / 名前の前方一致）
     search_fields = (
-        'full_name',           # 表示名
-        'last_name',           # 姓
-        'first_name',          # 名
-        'phone_number',        # 電話番号
-        'instagram_id',        # Instagram ID
+        '=uuid',               # 顧客 uuid
+        '^phone_number',       # 電話番号（正規化して前方一致）
+        '=instagram_id',       # Instagram ID（@ 付きで入力）
+        '^full_name',          # 表示名（前方一致）
+        '^last_name',          # 姓（前方一致）
+        '^first_name',         # 名（前方一致）
     )
 
+    search_help_text = '顧客 uuid・電話番号・@Instagram ID・表示名/姓/名（前方一致）'
+    list_select_related = ('user',)
+    raw_id_fields = ('user', 'merged_into')
+
+    def search_q(self, term):
+        value = _as_uuid(term)
+        if value is not None:
+            return Q(uuid=value)
+        phone = _as_phone(term)
+        if phone is not None:
+            return Q(phone_number__startswith=phone)
+        if term.startswith('@') and len(term) > 1:
+            return Q(instagram_id=term[1:]) | Q(instagram_id=term)
+        return Q(full_name__startswith=term) | Q(last_name__startswith=term) | Q(first_name__startswith=term)
+
+    # 物理削除は同意書も連鎖で消える（CustomerConsent.delete を通らない）のでロールアップを直す
+    def delete_model(self, request, obj):
+        with refreshing_customer_rollups([obj.pk]):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with refreshing_customer_rollups(list(queryset.values_list('pk', flat=True))):
+            super().delete_queryset(request, queryset)
+
 
 # =========================================
 # 彫師モデル（TattooArtist）の管理画面設定
 # =========================================
 @admin.register(TattooArtist)
-class TattooArtistAdmin(admin.ModelAdmin):
+class TattooArtistAdmin(LargeTableAdmin):
     # 一覧表示されるフィールド
     list_display = (
         'artist_name',        # 彫師名（表示名）
@@ -51,13 +157,24 @@ class TattooArtistAdmin(admin.ModelAdmin):
         'is_active',
     )
 
-    # 検索可能なフィールド
+    # 検索可能なフィールド（実際の条件は search_q。メールは完全一致・名前は前方一致）
     search_fields = (
-        'artist_name',        # 彫師名
-        'email',              # メールアドレス
-        'studio_name',        # スタジオ名
+        '=email',             # メールアドレス
+        '^artist_name',       # 彫師名
+        '^studio_name',       # スタジオ名
     )
 
+    search_help_text = 'uuid・メールアドレス（完全一致）・彫師名/スタジオ名（前方一致）'
+    raw_id_fields = ('user',)
+
+    def search_q(self, term):
+        value = _as_uuid(term)
+        if value is not None:
+            return Q(uuid=value)
+        if '@' in term:
+            return Q(email=term) | Q(email=term.lower())
+        return Q(artist_name__startswith=term) | Q(studio_name__startswith=term)
+
     # フィルタリング可能なフィールド
     list_filter = (
         'is_public',          # 公開・非公開
@@ -70,7 +187,7 @@ class TattooArtistAdmin(admin.ModelAdmin):
 # 同意履歴モデル（CustomerConsent）の管理画面設定
 # =========================================
 @admin.register(CustomerConsent)
-class CustomerConsentAdmin(admin.ModelAdmin):
+class CustomerConsentAdmin(LargeTableAdmin):
     # 一覧に表示する項目
     list_display = (
         'customer',                # 紐付けられた顧客
@@ -80,19 +197,23 @@ class CustomerConsentAdmin(admin.ModelAdmin):
         'is_active',
     )
 
-    # 検索対象フィールド（外部キーの中のフィールドも指定可能）
+    # 検索対象フィールド（実際の条件は search_q。uuid は同意・顧客のどちらでも可）
     search_fields = (
-        'customer__full_name',       # 顧客の名前
-        'consent_version',           # 同意書のバージョン
-        'privacy_agreement_version',    # プライバシーポリシーのバージョン
+        '=uuid',                     # 同意の uuid
+        '=customer__uuid',           # 顧客の uuid
+        '^customer__full_name',      # 顧客の名前（前方一致）
     )
 
-    # フィルターに使用する項目
+    # フィルターに使用する項目（選択肢は登録済みの版から作る）
     list_filter = (
-        'consent_version',           # 同意書バージョンごとに絞り込み
-        'privacy_agreement_version',    # プライバシーポリシーバージョンごとに絞り込み
+        ConsentVersionFilter,        # 同意書バージョンごとに絞り込み
+        PrivacyVersionFilter,        # プライバシーポリシーバージョンごとに絞り込み
     )
 
+    search_help_text = '同意・顧客の uuid・顧客の名前（前方一致）'
+    list_select_related = ('customer',)
+    raw_id_fields = ('customer',)
+
     # 誤編集を防ぐために読み取り専用にするフィールド
     readonly_fields = (
         'signed_at',                 # 同意日時は変更不可
@@ -100,6 +221,24 @@ class CustomerConsentAdmin(admin.ModelAdmin):
         'updated_at',                # 最終更新日時
     )
 
+    def get_queryset(self, request):
+        # 署名（data URL, 数十 KB）は一覧では使わない。編集画面では開いたときに読む
+        return super().get_queryset(request).defer('signature')
+
+    def search_q(self, term):
+        value = _as_uuid(term)
+        if value is not None:
+            # 顧客は先に引いておく（JOIN をまたいだ OR にすると索引が使えない）
+            customer_ids = list(Customer.objects.filter(uuid=value).values_list('pk', flat=True))
+            return Q(uuid=value) | Q(customer_id__in=customer_ids)
+        return Q(customer__full_name__startswith=term)
+
+    def delete_queryset(self, request, queryset):
+        # 一括削除は QuerySet.delete（CustomerConsent.delete を通らない）なのでロールアップを直す
+        customer_ids = set(queryset.values_list('customer_id', flat=True))
+        with refreshing_customer_rollups(customer_ids):
+            super().delete_queryset(request, queryset)
+
 # =========================================
 # User用の利用規約・プライバシーポリシー同意履歴モデル（UserAgreement）の管理画面設定
 # =========================================
@@ -115,5 +254,6 @@ class UserAgreementAdmin(admin.ModelAdmin):
     )
     list_filter = ('terms_version', 'privacy_version', 'created_at')
     search_fields = ('user__username', 'user__email')
+    list_select_related = ('user',)
     readonly_fields = ('user', 'terms_agreed_at', 'privacy_agreed_at', 'created_at')
     ordering = ('-created_at',)
@@ -4,3 +4,22 @@ from django.apps import AppConfig
 class EformApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "eform_api"
+
+    def ready(self):
+        # 設定の確認（manage.py check）
+        from . import checks  # noqa: F401
+
+        # リクエスト計測（DB クエリ・シリアライザ時間）のフックを入れる
+        from .instrumentation import install
+
+        install()
+
+        # User の変更で JWT 認証のユーザーキャッシュを消す
+        from .authentication import connect_signals
+
+        connect_signals()
+
+        # 同意書の削除で S3 に置いた PDF も消す
+        from .consent_pdfs import connect_signals as connect_consent_pdf_signals
+
+        connect_consent_pdf_signals()
@@ -0,0 +1,156 @@
+# eform_api/authentication.py
+"""
+JWT 認証（simplejwt の JWTAuthentication）のユーザー取得をキャッシュする
+
+- トークンの user_id → User の行（password 以外のフィールド）を Django のキャッシュに
+  JWT_USER_CACHE_SECONDS 秒置き、認証済みリクエストごとの User クエリを省く
+- キャッシュから作った User は password が遅延読み込み（deferred）になっている。
+  save() しても読み込んだフィールドしか更新されないので、password を消すことはない
+- User の save / delete（is_active の変更を含む）でキャッシュを消す（apps.ready で接続）。
+  他のワーカーのキャッシュも消えるよう、共有キャッシュ（Redis など）のときだけ使う。
+  プロセスごとのキャッシュ（LocMemCache）なら毎回 DB を引く（utils.is_shared_cache）
+- JWT_TRUST_CLAIMS=True のとき、GET などの読み取りリクエストはキャッシュに無くても
+  DB を引かず、署名済みトークンの user_id だけで User を作る（id 以外は遅延読み込み）。
+  無効化したユーザーもトークンの期限までは読み取りができてしまうので既定は False
+
+トークンには彫師・同意状況のクレーム（user_claims）も載せる（ArtistRefreshToken）。
+フロントは起動時に /artists/me や同意状況 API を呼ばずにこれを使える。
+同意・プロフィール作成の直後は token/refresh/ で取り直すと新しい値になる。
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .metrics import record_cache_lookup
+from .utils import is_shared_cache
+
+CACHE_KEY = "jwt-user:{}"
+
+
+def _cache():
+    """使うキャッシュ。ワーカー間で共有されない・JWT_USER_CACHE_SECONDS が 0 なら None"""
+    if settings.JWT_USER_CACHE_SECONDS <= 0 or not is_shared_cache(settings.JWT_USER_CACHE_ALIAS):
+        return None
+    return caches[settings.JWT_USER_CACHE_ALIAS]
+
+
+def _cached_fields(user_model):
+    return [f.attname for f in user_model._meta.concrete_fields if f.attname != "password"]
+
+
+def evict_cached_user(user_id):
+    cache = _cache()
+    if cache is not None:
+        cache.delete(CACHE_KEY.format(user_id))
+
+
+def evict_user_on_change(sender, instance, **kwargs):
+    """post_save / post_delete のレシーバ"""
+    evict_cached_user(getattr(instance, api_settings.USER_ID_FIELD))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        # DRF は認証クラスをリクエストごとに作るので、インスタンスに持たせてよい
+        self.trust_claims = settings.JWT_TRUST_CLAIMS and request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        fields = _cached_fields(self.user_model)
+        key = CACHE_KEY.format(user_id)
+        cache = _cache()
+        cached = None
+        if cache is not None:
+            cached = cache.get(key)
+            record_cache_lookup("jwt_user", cached is not None)
+
+        if cached is not None:
+            values, password_hash = cached
+            user = self.user_model.from_db("default", fields, values)
+        elif getattr(self, "trust_claims", False):
+            return self.user_model.from_db("default", [api_settings.USER_ID_FIELD], [user_id])
+        else:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            password_hash = get_md5_hash_password(user.password) if api_settings.CHECK_REVOKE_TOKEN else None
+            if cache is not None:
+                values = [getattr(user, name) for name in fields]
+                cache.set(key, (values, password_hash), settings.JWT_USER_CACHE_SECONDS)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+
+# ------------------------------
+# トークンに載せるクレーム
+# ------------------------------
+def user_claims(user_id):
+    """
+    彫師 uuid・同意済みの規約/プライバシーポリシーの版・プロフィールの有無。
+    TattooArtist と UserAgreement を LEFT JOIN して 1 クエリで読む
+    """
+    row = (
+        get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+        .values_list("tattooartist__uuid", "agreement__terms_version", "agreement__privacy_version")
+        .first()
+    )
+    artist_uuid, terms_version, privacy_version = row or (None, None, None)
+    return {
+        "artist_uuid": str(artist_uuid) if artist_uuid else None,
+        "has_profile": artist_uuid is not None,
+        "agreed": terms_version is not None,
+        "terms_version": terms_version,
+        "privacy_version": privacy_version,
+    }
+
+
+class ArtistRefreshToken(RefreshToken):
+    """
+    user_claims を載せたリフレッシュトークン。
+    ログイン時（for_user）に読み、リフレッシュ時（access_token を作るとき）に読み直す
+    """
+    _claims_loaded = False
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.payload.update(user_claims(getattr(user, api_settings.USER_ID_FIELD)))
+        token._claims_loaded = True
+        return token
+
+    @property
+    def access_token(self):
+        if not self._claims_loaded:
+            self.payload.update(user_claims(self.payload.get(api_settings.USER_ID_CLAIM)))
+            self._claims_loaded = True
+        return super().access_token
+
+
+def connect_signals():
+    from django.db.models.signals import post_delete, post_save
+
+    user_model = get_user_model()
+    post_save.connect(evict_user_on_change, sender=user_model, dispatch_uid="eform_api.jwt_user_cache.save")
+    post_delete.connect(evict_user_on_change, sender=user_model, dispatch_uid="eform_api.jwt_user_cache.delete")
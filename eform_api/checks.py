@@ -0,0 +1,39 @@
+# eform_api/checks.py
+"""
+manage.py check（と runserver / migrate の起動時）で見る設定の確認（apps.ready で登録）
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from .db.routers import pin_cache_problem
+from .utils import is_shared_cache
+
+
+@register(Tags.caches)
+def check_jwt_user_cache(app_configs, **kwargs):
+    """JWT のユーザーキャッシュが共有キャッシュでなければ、キャッシュしない（毎回 DB を引く）ことを知らせる"""
+    if settings.JWT_USER_CACHE_SECONDS <= 0 or is_shared_cache(settings.JWT_USER_CACHE_ALIAS):
+        return []
+    return [
+        Warning(
+            f"JWT のユーザーキャッシュ（CACHES['{settings.JWT_USER_CACHE_ALIAS}']）が"
+            "ワーカー間で共有されないため、認証のたびに User を DB から読みます。",
+            hint="REDIS_URL を設定してください（1 プロセスで動かすなら LOCAL_CACHE_IS_SHARED=true）。",
+            id="eform_api.W001",
+        )
+    ]
+
+
+@register(Tags.caches, Tags.database)
+def check_replica_pin_cache(app_configs, **kwargs):
+    """レプリカの read-your-writes の pin は共有キャッシュでないと働かない"""
+    problem = pin_cache_problem()
+    if problem is None:
+        return []
+    return [
+        Error(
+            problem,
+            hint="REDIS_URL を設定するか、DB_REPLICA_PIN_CACHE_ALIAS に共有キャッシュを指定してください。",
+            id="eform_api.E001",
+        )
+    ]
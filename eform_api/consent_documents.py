@@ -0,0 +1,166 @@
+# eform_api/consent_documents.py
+"""
+同意書・プライバシーポリシーの本文の登録と描画
+
+- 本文は ConsentDocumentBody に sha256 ごとに 1 行だけ置き、版（ConsentDocumentVersion）から参照する。
+  本文の同じ版が複数あっても 1 行で済む。版は登録後に変えない
+- 本文は Django テンプレートの HTML。{{ customer.full_name }} / {{ consent.signed_at }} などが使える
+  （customer は署名した時点の値。pdf_renderer.signed_customer）
+- プロセスごとのキャッシュ
+    * 版 → 本文: 版は変わらないので一度読んだら使い回す（登録されていない版は
+      CONSENT_DOCUMENT_MISS_SECONDS 秒だけ「無い」ことを覚える）
+    * 本文（sha256）→ コンパイル済みのテンプレート。変数もタグも無い本文は HTML を 1 回だけ作って使い回す
+  PDF の事前生成などで同じ版の同意書を大量に作っても、テンプレートの解析は 1 回で済む
+- 同意書の版を登録すると、その版の同意書の PDF（ConsentPdf）を作り直しの対象に戻す。
+  事前生成は本文が登録されるまで PDF を完成扱いにしない（consent_pdfs.render_batch）
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.template import Context, Template, TemplateSyntaxError
+from django.template.base import TextNode
+
+from .models import ConsentDocumentBody, ConsentDocumentVersion
+from .pdf_renderer import signed_customer
+
+KIND_CONSENT = ConsentDocumentVersion.KIND_CONSENT
+KIND_PRIVACY = ConsentDocumentVersion.KIND_PRIVACY
+
+_lock = threading.Lock()
+_versions = {}  # (kind, version) → CompiledDocument
+_missing = {}   # (kind, version) → 「無い」を覚えておく期限（time.monotonic）
+_compiled = {}  # sha256 → (Template, 変数の無い本文なら描画済みの HTML / それ以外は None)
+
+
+class ConsentDocumentError(Exception):
+    """本文を登録できない（テンプレートの構文エラー・版の本文が既存と違う）"""
+
+
+class ConsentDocumentMissing(Exception):
+    """版の本文が登録されていない（PDF の事前生成では再試行の対象にする）"""
+
+
+class CompiledDocument:
+    """1 つの版の本文（コンパイル済み）"""
+    __slots__ = ("kind", "version", "title", "sha256", "template", "static_html")
+
+    def __init__(self, kind, version, title, sha256, template, static_html):
+        self.kind = kind
+        self.version = version
+        self.title = title
+        self.sha256 = sha256
+        self.template = template
+        self.static_html = static_html
+
+    def render(self, customer=None, consent=None):
+        if self.static_html is not None:
+            return self.static_html
+        return self.template.render(Context({"customer": customer, "consent": consent}))
+
+
+# ------------------------------
+# 1. 登録
+# ------------------------------
+def normalize_body(text):
+    """改行を \\n にそろえ、前後の空白を落とす（同じ本文が同じ sha256 になるように）"""
+    return text.replace("\r\n", "\n").replace("\r", "\n").strip() + "\n"
+
+
+def body_sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def register_document(kind, version, body, title=""):
+    """
+    版を登録して (ConsentDocumentVersion, 新規か) を返す。
+    同じ本文は既存の ConsentDocumentBody を使う。同じ版が同じ本文で登録済みなら何もしない
+    """
+    text = normalize_body(body)
+    try:
+        Template(text)
+    except TemplateSyntaxError as e:
+        raise ConsentDocumentError(f"本文のテンプレートを読めません: {e}")
+    digest = body_sha256(text)
+
+    with transaction.atomic():
+        stored, _ = ConsentDocumentBody.objects.get_or_create(sha256=digest, defaults={"body": text})
+        document, created = ConsentDocumentVersion.objects.get_or_create(
+            kind=kind, version=version, defaults={"body": stored, "title": title},
+        )
+        if not created and document.body_id != stored.pk:
+            # 版は変えない。ここで例外にして、作ったばかりの本文もロールバックする
+            raise ConsentDocumentError(f"{kind} {version} は別の本文で登録済みです。新しい版として登録してください")
+
+    _missing.pop((kind, version), None)
+    if created and kind == KIND_CONSENT:
+        # 登録前に作った PDF（本文が空）・本文待ちで失敗した PDF を作り直す
+        from .consent_pdfs import requeue_consent_pdfs
+
+        requeue_consent_pdfs(version)
+    return document, created
+
+
+# ------------------------------
+# 2. 取得（プロセスごとのキャッシュ）
+# ------------------------------
+def _compile(sha256, text):
+    entry = _compiled.get(sha256)
+    if entry is None:
+        template = Template(text)
+        static_html = None
+        if all(isinstance(node, TextNode) for node in template.nodelist):
+            static_html = template.render(Context())
+        entry = _compiled[sha256] = (template, static_html)
+    return entry
+
+
+def get_document(kind, version):
+    """版の本文（CompiledDocument）。登録されていなければ None"""
+    key = (kind, version)
+    document = _versions.get(key)
+    if document is not None:
+        return document
+    if _missing.get(key, 0) > time.monotonic():
+        return None
+
+    row = (
+        ConsentDocumentVersion.objects.filter(kind=kind, version=version)
+        .values_list("title", "body__sha256", "body__body")
+        .first()
+    )
+    if row is None:
+        _missing[key] = time.monotonic() + settings.CONSENT_DOCUMENT_MISS_SECONDS
+        return None
+
+    title, sha256, text = row
+    with _lock:
+        template, static_html = _compile(sha256, text)
+        document = _versions[key] = CompiledDocument(kind, version, title, sha256, template, static_html)
+    return document
+
+
+def require_document(kind, version):
+    """get_document と同じ。登録されていなければ ConsentDocumentMissing"""
+    document = get_document(kind, version)
+    if document is None:
+        raise ConsentDocumentMissing(f"{kind} {version} の本文が登録されていません")
+    return document
+
+
+def consent_document_html(consent):
+    """(題名, 本文の HTML) 。consent_version の同意書が登録されていなければ (None, "")"""
+    document = get_document(KIND_CONSENT, consent.consent_version)
+    if document is None:
+        return None, ""
+    return document.title or None, document.render(customer=signed_customer(consent), consent=consent)
+
+
+def clear_cache():
+    """プロセスのキャッシュを捨てる（テスト・シェルから本文を直した後など）"""
+    with _lock:
+        _versions.clear()
+        _missing.clear()
+        _compiled.clear()
@@ -0,0 +1,206 @@
+# eform_api/consent_pdfs.py
+"""
+同意書 PDF の事前生成（ConsentPdf）
+
+- queue_consent_pdf: 署名（同意書の作成）時に呼ぶ。pending の行を INSERT するだけで PDF は作らない
+- requeue_consent_pdfs: 同意書の本文（版）を登録したときに、その版の PDF を作り直しの対象に戻す
+- render_batch: render_consent_pdfs コマンドから呼ぶ。期限の来た行を確保して PDF を作り
+  （eform_api.pdf_renderer）、S3 の CONSENT_PDF_BUCKET / CONSENT_PDF_PREFIX に置いて結果を書き戻す。
+  版の本文が未登録の同意書は失敗として再試行に回す（空の本文の PDF を完成扱いにしない）
+- ConsentPdfView は保存済みならそれを返し（stream / redirect）、まだ無ければその場で作る
+- 同意書（または顧客）を消すと、post_delete で S3 の PDF も消す（apps.ready で接続）
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .consent_documents import KIND_CONSENT, require_document
+from .instrumentation import timed
+from .models import ConsentPdf
+from .pdf_renderer import render_consent_pdf
+from .storage import get_s3_client
+
+logger = logging.getLogger(__name__)
+
+
+def bucket_name():
+    return settings.CONSENT_PDF_BUCKET or settings.AWS_S3_BUCKET_NAME
+
+
+def object_key_for(consent):
+    return f"{settings.CONSENT_PDF_PREFIX}{consent.uuid}.pdf"
+
+
+def queue_consent_pdf(consent, refresh=False):
+    """
+    同意書の PDF を生成キューに積む（生成は render_consent_pdfs ワーカーが行う）。
+    既に行があれば何もしない。refresh=True なら（署名の差し替えなど）作り直しの対象に戻す
+    """
+    if not settings.CONSENT_PDF_PRECOMPUTE:
+        return
+    if refresh and ConsentPdf.objects.filter(consent=consent).update(
+        status=ConsentPdf.STATUS_PENDING,
+        attempts=0,
+        next_attempt_at=timezone.now(),
+        locked_at=None,
+        last_error="",
+    ):
+        return
+    ConsentPdf.objects.bulk_create([ConsentPdf(consent=consent)], ignore_conflicts=True)
+
+
+def requeue_consent_pdfs(consent_version):
+    """consent_version の同意書の PDF をまとめて作り直しの対象に戻す（本文の登録時）。戻した件数を返す"""
+    if not settings.CONSENT_PDF_PRECOMPUTE:
+        return 0
+    return ConsentPdf.objects.filter(consent__consent_version=consent_version).update(
+        status=ConsentPdf.STATUS_PENDING,
+        attempts=0,
+        next_attempt_at=timezone.now(),
+        locked_at=None,
+        last_error="",
+    )
+
+
+def backoff_delay(attempts):
+    """attempts 回失敗した後の再試行までの待ち時間（指数バックオフ, 上限あり）"""
+    base = settings.CONSENT_PDF_BACKOFF_SECONDS
+    return timedelta(seconds=min(base * (2 ** max(attempts - 1, 0)), settings.CONSENT_PDF_BACKOFF_MAX_SECONDS))
+
+
+# ------------------------------
+# 1. ワーカー
+# ------------------------------
+def claim_batch(batch_size):
+    """
+    期限の来た pending（と、ワーカー停止で取り残された rendering）を確保して返す。
+    PostgreSQL では SKIP LOCKED で複数ワーカーが同じ行を取り合わない。
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.CONSENT_PDF_LOCK_SECONDS)
+
+    with transaction.atomic():
+        pks = list(
+            ConsentPdf.objects.select_for_update(skip_locked=True)
+            .filter(status__in=[ConsentPdf.STATUS_PENDING, ConsentPdf.STATUS_RENDERING])
+            .filter(next_attempt_at__lte=now)
+            .exclude(status=ConsentPdf.STATUS_RENDERING, locked_at__gt=stale_before)
+            .order_by("next_attempt_at", "pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if pks:
+            ConsentPdf.objects.filter(pk__in=pks).update(status=ConsentPdf.STATUS_RENDERING, locked_at=now)
+    # 同意書・顧客は確保した後にまとめて読む（ロックは ConsentPdf の行だけにする）
+    return list(
+        ConsentPdf.objects.filter(pk__in=pks).select_related("consent__customer").order_by("next_attempt_at", "pk")
+    )
+
+
+def store_pdf(consent, pdf):
+    """PDF を S3 に置いてキーを返す"""
+    key = object_key_for(consent)
+    with timed("s3"):
+        get_s3_client().put_object(
+            Bucket=bucket_name(),
+            Key=key,
+            Body=pdf,
+            ContentType="application/pdf",
+            ContentDisposition=f'inline; filename="consent_{consent.uuid}.pdf"',
+        )
+    return key
+
+
+def render_batch(batch_size=20):
+    """
+    1 バッチ分の PDF を作って S3 に置く。
+    戻り値: (成功数, 失敗数)
+    """
+    rows = claim_batch(batch_size)
+    done = failed = 0
+
+    for row in rows:
+        row.attempts += 1
+        try:
+            # 本文の無い版で作ると本文が空の PDF が完成扱いで残るので、登録されるまで再試行に回す
+            require_document(KIND_CONSENT, row.consent.consent_version)
+            pdf = render_consent_pdf(row.consent)
+            key = store_pdf(row.consent, pdf)
+        except Exception as e:  # PDF 生成・S3 の例外はまとめて再試行の対象にする
+            failed += 1
+            row.last_error = f"{type(e).__name__}: {e}"[:2000]
+            row.locked_at = None
+            if row.attempts >= settings.CONSENT_PDF_MAX_ATTEMPTS:
+                row.status = ConsentPdf.STATUS_FAILED
+                logger.error("consent pdf: 生成を断念しました consent=%s %s", row.consent.uuid, row.last_error)
+            else:
+                row.status = ConsentPdf.STATUS_PENDING
+                row.next_attempt_at = timezone.now() + backoff_delay(row.attempts)
+                logger.warning("consent pdf: 生成失敗（再試行予定） consent=%s %s", row.consent.uuid, row.last_error)
+            row.save(update_fields=["attempts", "status", "next_attempt_at", "locked_at", "last_error"])
+            continue
+
+        done += 1
+        row.status = ConsentPdf.STATUS_DONE
+        row.object_key = key
+        row.size = len(pdf)
+        row.rendered_at = timezone.now()
+        row.locked_at = None
+        row.last_error = ""
+        row.save(update_fields=["attempts", "status", "object_key", "size", "rendered_at", "locked_at", "last_error"])
+
+    return done, failed
+
+
+# ------------------------------
+# 2. 保存済み PDF の取り出し
+# ------------------------------
+def stored_pdf(consent):
+    """生成済みの ConsentPdf（無ければ None）。consent は select_related("pdf") 済みだとクエリを使わない"""
+    try:
+        row = consent.pdf
+    except ConsentPdf.DoesNotExist:
+        return None
+    return row if row.status == ConsentPdf.STATUS_DONE and row.object_key else None
+
+
+def presigned_url(row):
+    with timed("s3"):
+        return get_s3_client().generate_presigned_url(
+            ClientMethod="get_object",
+            Params={"Bucket": bucket_name(), "Key": row.object_key, "ResponseContentType": "application/pdf"},
+            ExpiresIn=settings.CONSENT_PDF_URL_SECONDS,
+        )
+
+
+def open_stored_pdf(row):
+    """(本文のストリーム, バイト数) を返す"""
+    with timed("s3"):
+        obj = get_s3_client().get_object(Bucket=bucket_name(), Key=row.object_key)
+    return obj["Body"], obj.get("ContentLength")
+
+
+# ------------------------------
+# 3. 削除
+# ------------------------------
+def _delete_object(key):
+    try:
+        with timed("s3"):
+            get_s3_client().delete_object(Bucket=bucket_name(), Key=key)
+    except Exception:
+        logger.exception("consent pdf: S3 の PDF を消せませんでした key=%s", key)
+
+
+def delete_stored_pdf(sender, instance, **kwargs):
+    """post_delete のレシーバ。コミットされたら S3 に置いた PDF を消す（失敗してもログだけ）"""
+    if instance.object_key:
+        key = instance.object_key
+        transaction.on_commit(lambda: _delete_object(key))
+
+
+def connect_signals():
+    from django.db.models.signals import post_delete
+
+    post_delete.connect(delete_stored_pdf, sender=ConsentPdf, dispatch_uid="eform_api.consent_pdf.delete")
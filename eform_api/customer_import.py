@@ -0,0 +1,364 @@
+# eform_api/customer_import.py
+"""
+顧客 CSV の一括取り込み
+
+- ファイルは 1 行ずつデコードして読む（全体をメモリに載せない）
+- chunk_size 行ごとに:
+    電話番号をまとめて正規化 → (user, phone_number) で既存顧客を 1 クエリで照合
+    → 新規は bulk_create、既存は bulk_update（空欄のセルは既存の値を消さない）
+- 不正な行は取り込まずに行番号とエラー内容を返す（他の行は取り込む）
+- 大きいファイルは CustomerImportJob に積み、run_customer_imports ワーカーが処理する
+"""
+import codecs
+import csv
+import logging
+from dataclasses import dataclass, field
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Customer, CustomerImportJob
+from .utils import normalize_phone_numbers, parse_birth_date
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+# 取り込める列（Customer のフィールド名）と、表計算ソフトでよく使われる見出し
+IMPORT_FIELDS = (
+    "full_name", "last_name", "first_name", "last_name_kana", "first_name_kana",
+    "gender", "birth_date", "prefecture", "city", "phone_number", "instagram_id",
+    "notes", "skin_type", "tattoo_experience", "occupation", "referrer", "mbti", "tattooist",
+)
+COLUMN_ALIASES = {
+    "氏名": "full_name", "名前": "full_name", "お名前": "full_name",
+    "姓": "last_name", "名": "first_name",
+    "セイ": "last_name_kana", "メイ": "first_name_kana",
+    "性別": "gender", "生年月日": "birth_date",
+    "都道府県": "prefecture", "市区町村": "city",
+    "電話番号": "phone_number", "電話": "phone_number", "tel": "phone_number", "phone": "phone_number",
+    "instagram": "instagram_id", "インスタグラム": "instagram_id",
+    "メモ": "notes", "備考": "notes",
+    "肌質": "skin_type", "タトゥー経験": "tattoo_experience",
+    "職業": "occupation", "紹介者": "referrer", "担当": "tattooist",
+}
+GENDER_ALIASES = {
+    "男性": "male", "男": "male", "女性": "female", "女": "female",
+    "その他": "other", "無回答": "none",
+}
+TRUE_VALUES = {"1", "true", "yes", "y", "はい", "有", "あり", "○"}
+FALSE_VALUES = {"0", "false", "no", "n", "いいえ", "無", "なし", "×"}
+
+
+class CustomerImportError(Exception):
+    """ファイル全体を取り込めない（見出しが無い・文字コードが違う など）"""
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, messages):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": line, "errors": messages})
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+# ------------------------------
+# 1. CSV の読み込み
+# ------------------------------
+def _resolve_column(header):
+    name = header.strip().lstrip("\ufeff")
+    if name in IMPORT_FIELDS:
+        return name
+    return COLUMN_ALIASES.get(name) or COLUMN_ALIASES.get(name.lower())
+
+
+def read_csv_rows(stream, encoding="utf-8-sig"):
+    """
+    バイナリのファイルオブジェクトを 1 行ずつデコードして (行番号, {フィールド名: 値}) を返す。
+    見出しの無い列・空行は読み飛ばす。
+    """
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        raise CustomerImportError(f"文字コード {encoding} は使えません")
+
+    reader = csv.reader(codecs.iterdecode(stream, encoding))
+    try:
+        header = next(reader, None)
+        if header is None:
+            raise CustomerImportError("CSV が空です")
+        columns = [_resolve_column(h) for h in header]
+        if not any(columns):
+            raise CustomerImportError("取り込める列がありません（full_name / phone_number など）")
+
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            yield reader.line_num, {
+                column: cell.strip() for column, cell in zip(columns, row) if column
+            }
+    except UnicodeDecodeError:
+        raise CustomerImportError(
+            f"{reader.line_num + 1} 行目付近を {encoding} として読めません（encoding を指定してください）"
+        )
+
+
+# ------------------------------
+# 2. 行の検証
+# ------------------------------
+def _max_lengths():
+    return {
+        name: Customer._meta.get_field(name).max_length
+        for name in IMPORT_FIELDS
+        if Customer._meta.get_field(name).max_length
+    }
+
+
+def clean_row(values, max_lengths):
+    """CSV の 1 行を Customer に入れる値にする。空欄は含めない。(値, エラー一覧) を返す"""
+    data = {}
+    errors = []
+    for name, value in values.items():
+        if not value:
+            continue
+
+        if name == "gender":
+            value = GENDER_ALIASES.get(value, value.lower())
+            if value not in dict(Customer.GENDER_CHOICES):
+                errors.append(f"gender: {values[name]} は使えません（male / female / other / none）")
+                continue
+        elif name == "birth_date":
+            parsed = parse_birth_date(value)
+            if parsed is None:
+                errors.append(f"birth_date: {value} を日付として解釈できません")
+                continue
+            value = parsed.isoformat()
+        elif name == "tattoo_experience":
+            lowered = value.lower()
+            if lowered not in TRUE_VALUES | FALSE_VALUES:
+                errors.append(f"tattoo_experience: {value} は真偽値として解釈できません")
+                continue
+            value = lowered in TRUE_VALUES
+
+        # 電話番号の桁数は正規化した後で見る
+        limit = max_lengths.get(name) if name != "phone_number" else None
+        if limit and isinstance(value, str) and len(value) > limit:
+            errors.append(f"{name}: {limit} 文字以内で入力してください")
+            continue
+        data[name] = value
+
+    if not errors and not (data.get("full_name") or data.get("last_name") or data.get("first_name")):
+        errors.append("full_name（または last_name / first_name）は必須です")
+
+    if not data.get("full_name") and (data.get("last_name") or data.get("first_name")):
+        data["full_name"] = " ".join(filter(None, [data.get("last_name"), data.get("first_name")]))
+    return data, errors
+
+
+# ------------------------------
+# 3. 取り込み
+# ------------------------------
+def import_customers(
+    user, stream, encoding="utf-8-sig", chunk_size=DEFAULT_CHUNK_SIZE, progress=None, resume=None,
+):
+    """
+    CSV を取り込んで ImportResult を返す。チャンクごとに 1 トランザクション。
+    progress を渡すとチャンクごとに、そのチャンクと同じトランザクションの中で progress(result) を呼ぶ
+    （ジョブの進捗更新用。取り込んだ行と進捗は必ず一緒にコミットされる）。
+    resume に途中までの ImportResult を渡すと、その rows 行を読み飛ばして続きから取り込む。
+    """
+    result = resume or ImportResult()
+    rows = read_csv_rows(stream, encoding)
+    if result.rows:
+        for _ in islice(rows, result.rows):
+            pass
+    max_lengths = _max_lengths()
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        _import_chunk(user, chunk, result, max_lengths, progress)
+    return result
+
+
+def _import_chunk(user, chunk, result, max_lengths, progress=None):
+    phones = normalize_phone_numbers([values.get("phone_number", "") for _, values in chunk])
+
+    cleaned = []
+    for (line, values), phone in zip(chunk, phones):
+        result.rows += 1
+        data, errors = clean_row(values, max_lengths)
+        if "phone_number" in data:
+            if not phone:
+                errors.append(f"phone_number: {values['phone_number']} に数字がありません")
+            elif len(phone) > max_lengths["phone_number"]:
+                errors.append(f"phone_number: {max_lengths['phone_number']} 桁以内で入力してください")
+            data["phone_number"] = phone
+        if errors:
+            result.add_error(line, errors)
+            continue
+        cleaned.append(data)
+
+    # --- 既存顧客の照合（チャンクごとに 1 クエリ。同じ番号が複数あれば最近更新された方）---
+    matched = {}
+    wanted = {data["phone_number"] for data in cleaned if data.get("phone_number")}
+    if wanted:
+        existing = (
+            Customer.objects.filter(user=user, is_active=True, phone_number__in=wanted)
+            .order_by("phone_number", "-updated_at", "-pk")
+        )
+        for customer in existing:
+            matched.setdefault(customer.phone_number, customer)
+
+    now = timezone.now()
+    to_create = []
+    to_update = {}
+    update_fields = set()
+    for data in cleaned:
+        phone = data.get("phone_number")
+        customer = matched.get(phone) if phone else None
+        if customer is None:
+            customer = Customer(user=user, **data)
+            customer.birth_date_value = parse_birth_date(customer.birth_date)
+            to_create.append(customer)
+            if phone:
+                # 同じファイル内で同じ番号が続いたら 1 人の顧客にまとめる
+                matched[phone] = customer
+            continue
+
+        for name, value in data.items():
+            setattr(customer, name, value)
+        update_fields.update(data)
+        if "birth_date" in data:
+            customer.birth_date_value = parse_birth_date(customer.birth_date)
+            update_fields.add("birth_date_value")
+        customer.updated_at = now
+        if customer.pk is not None:
+            to_update[customer.pk] = customer
+
+    with transaction.atomic():
+        Customer.objects.bulk_create(to_create)
+        if to_update:
+            Customer.objects.bulk_update(list(to_update.values()), [*sorted(update_fields), "updated_at"])
+        result.created += len(to_create)
+        result.updated += len(to_update)
+        if progress is not None:
+            progress(result)
+
+
+# ------------------------------
+# 4. バックグラウンドジョブ
+# ------------------------------
+def claim_next_job():
+    """
+    pending のジョブ（と、ワーカー停止で running のまま止まったジョブ）を 1 件確保して
+    running にする（無ければ None）。
+    止まったジョブは、最後にコミットしたチャンクの続きから取り込む（run_job）。
+    CUSTOMER_IMPORT_MAX_ATTEMPTS 回目でも止まっていたら failed にする
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.CUSTOMER_IMPORT_LOCK_SECONDS)
+
+    with transaction.atomic():
+        while True:
+            job = (
+                CustomerImportJob.objects.select_for_update(skip_locked=True)
+                .filter(status__in=[CustomerImportJob.STATUS_PENDING, CustomerImportJob.STATUS_RUNNING])
+                .exclude(status=CustomerImportJob.STATUS_RUNNING, locked_at__gt=stale_before)
+                .order_by("created_at", "pk")
+                .first()
+            )
+            if job is None:
+                return None
+            if job.attempts < settings.CUSTOMER_IMPORT_MAX_ATTEMPTS:
+                break
+            logger.error("customer import job %s abandoned after %s attempts", job.uuid, job.attempts)
+            job.status = CustomerImportJob.STATUS_FAILED
+            job.last_error = "取り込みが途中で止まったため中止しました"
+            job.finished_at = now
+            job.save(update_fields=["status", "last_error", "finished_at"])
+
+        if job.status == CustomerImportJob.STATUS_RUNNING:
+            logger.warning("customer import job %s reclaimed (locked_at=%s)", job.uuid, job.locked_at)
+        job.status = CustomerImportJob.STATUS_RUNNING
+        job.attempts += 1
+        job.started_at = now
+        job.locked_at = now
+        job.save(update_fields=["status", "attempts", "started_at", "locked_at"])
+    return job
+
+
+def run_job(job, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    ジョブのファイルを取り込み、結果をジョブに書き戻す。
+    進捗（rows など）はチャンクと同じトランザクションで保存するので、取り直したジョブは
+    job.rows 行を読み飛ばして続きから取り込む（コミット済みの行を二重に作らない）
+    """
+    def save_progress(result):
+        CustomerImportJob.objects.filter(pk=job.pk).update(
+            rows=result.rows,
+            created_count=result.created,
+            updated_count=result.updated,
+            error_count=result.error_count,
+            errors=result.errors,
+            locked_at=timezone.now(),
+        )
+
+    resume = None
+    if job.rows:
+        logger.info("customer import job %s resumes after row %s", job.uuid, job.rows)
+        resume = ImportResult(
+            rows=job.rows,
+            created=job.created_count,
+            updated=job.updated_count,
+            error_count=job.error_count,
+            errors=list(job.errors),
+        )
+
+    try:
+        with job.file.open("rb") as stream:
+            result = import_customers(
+                job.user, stream, encoding=job.encoding, chunk_size=chunk_size,
+                progress=save_progress, resume=resume,
+            )
+    except Exception as e:
+        if not isinstance(e, CustomerImportError):
+            logger.exception("customer import job %s failed", job.uuid)
+        job.status = CustomerImportJob.STATUS_FAILED
+        job.last_error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "last_error", "finished_at"])
+        return job
+
+    job.status = CustomerImportJob.STATUS_DONE
+    job.rows = result.rows
+    job.created_count = result.created
+    job.updated_count = result.updated
+    job.error_count = result.error_count
+    job.errors = result.errors
+    job.finished_at = timezone.now()
+    job.save(update_fields=[
+        "status", "rows", "created_count", "updated_count", "error_count", "errors", "finished_at",
+    ])
+    # 取り込み済みのファイル（個人情報）は残さない
+    job.file.delete(save=True)
+    return job
@@ -0,0 +1,2 @@
+# eform_api/db/__init__.py
+"""データベース接続まわり（接続プールと、それを使う DB バックエンド）"""
@@ -0,0 +1,247 @@
+# eform_api/db/pool.py
+"""
+PostgreSQL 接続のプロセス内プール（DB_POOL=true のときの ENGINE eform_api.db.pooled が使う）
+
+- Django（4.2）は接続を「スレッドごとに 1 本」持つので、スレッド・ASGI ワーカーでは
+  スレッドの数だけ接続ができる。プールは物理接続の数を MAX_SIZE に抑えて使い回す
+- 空きが無いときは TIMEOUT 秒まで待ち、それでも空かなければ PoolTimeout
+- 一定時間使っていない接続は貸し出す前に SELECT 1 で生きているか確かめる
+- fork 安全: プールは pid ごとに作る（storage.py のクライアントと同じ）。
+  fork 後の子プロセスは親の接続に触らず、新しく繋ぎ直す
+  （親側は gunicorn.conf.py の pre_fork で close_all_pools() して持ち越さない）
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+from .. import metrics
+
+DEFAULT_POOL_OPTIONS = {
+    "MIN_SIZE": 0,          # MAX_IDLE を過ぎても閉じずに残す接続数
+    "MAX_SIZE": 10,         # プロセスごとの最大接続数
+    "TIMEOUT": 10.0,        # 空き待ちの上限（秒）
+    "MAX_IDLE": 300.0,      # これより長く使われていない接続は閉じる（秒）
+    "MAX_LIFETIME": 3600.0,  # これより古い接続は返却時に閉じる（秒）
+    "CHECK_AFTER": 30.0,    # これより長く使われていない接続は貸し出す前に SELECT 1（秒）
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    """TIMEOUT 秒待っても接続が空かなかった"""
+
+
+class ConnectionPool:
+    def __init__(self, alias, options=None):
+        options = {**DEFAULT_POOL_OPTIONS, **(options or {})}
+        self.alias = alias
+        self.max_size = int(options["MAX_SIZE"])
+        self.min_size = int(options["MIN_SIZE"])
+        self.timeout = float(options["TIMEOUT"])
+        self.max_idle = float(options["MAX_IDLE"])
+        self.max_lifetime = float(options["MAX_LIFETIME"])
+        self.check_after = float(options["CHECK_AFTER"])
+
+        self._cond = threading.Condition()
+        self._idle = deque()        # (接続, 返却された時刻)
+        self._born = {}             # id(接続) → 作成時刻
+        self._in_use = 0            # 貸し出し中 + 作成中
+        self._last_prune = time.monotonic()
+
+        self._stats = {
+            "acquired": 0,
+            "created": 0,
+            "closed": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+        }
+
+    # ------------------------------
+    # 貸し出し・返却
+    # ------------------------------
+    def acquire(self, connect):
+        """接続を 1 本借りる。空きも作る余地も無ければ待つ。新しく繋ぐときは connect() を呼ぶ"""
+        started = time.monotonic()
+        waited = False
+        while True:
+            with self._cond:
+                while True:
+                    item = self._pop_idle()
+                    if item is not None or self._in_use < self.max_size:
+                        self._in_use += 1
+                        break
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        metrics.record_db_pool_timeout(self.alias)
+                        raise PoolTimeout(
+                            f"データベース接続プールが埋まっています（max_size={self.max_size}, "
+                            f"{self.timeout:.1f} 秒待機）"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if item is None:
+                conn = self._create(connect)
+                break
+            # しばらく使っていなかった接続は、貸す前に生きているか確かめる（ロックの外で）
+            conn, idle = item
+            if idle <= self.check_after or self._ping(conn):
+                break
+            with self._cond:
+                self._in_use -= 1
+                self._discard(conn)
+
+        wait = time.monotonic() - started
+        with self._cond:
+            self._stats["acquired"] += 1
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_seconds_total"] += wait
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+
+        metrics.record_db_pool_wait(self.alias, wait)
+        self._publish()
+        return conn
+
+    def release(self, conn):
+        """接続を返す。トランザクション中ならロールバック、壊れていれば捨てる"""
+        now = time.monotonic()
+        reusable = self._reset(conn) and now - self._born.get(id(conn), now) < self.max_lifetime
+        with self._cond:
+            self._in_use -= 1
+            if reusable:
+                self._idle.append((conn, now))
+            else:
+                self._discard(conn)
+            if now - self._last_prune > self.check_after:
+                self._prune(now)
+            self._cond.notify()
+        self._publish()
+
+    def _pop_idle(self):
+        """（ロック内）空き接続を 1 本取り出して (接続, 空いていた秒) を返す。無ければ None"""
+        now = time.monotonic()
+        while self._idle:
+            # 直近に返された（温まっている）接続から使う
+            conn, returned_at = self._idle.pop()
+            if conn.closed or now - returned_at > self.max_idle:
+                self._discard(conn)
+                continue
+            return conn, now - returned_at
+        return None
+
+    def _prune(self, now):
+        """（ロック内）MAX_IDLE を過ぎた空き接続を古い方から閉じる（合計 MIN_SIZE 本は残す）"""
+        self._last_prune = now
+        while self._idle and now - self._idle[0][1] > self.max_idle:
+            if len(self._idle) + self._in_use <= self.min_size:
+                break
+            conn, _ = self._idle.popleft()
+            self._discard(conn)
+
+    def _create(self, connect):
+        try:
+            conn = connect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._born[id(conn)] = time.monotonic()
+            self._stats["created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        """（ロック内）接続を閉じて数から外す"""
+        self._born.pop(id(conn), None)
+        self._stats["closed"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _ping(conn):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not conn.autocommit:
+                conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset(conn):
+        import psycopg2.extensions as ext
+
+        if conn.closed:
+            return False
+        status = conn.info.transaction_status
+        if status == ext.TRANSACTION_STATUS_IDLE:
+            return True
+        if status == ext.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        try:
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    # ------------------------------
+    # 後始末・統計
+    # ------------------------------
+    def close(self):
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+        self._publish()
+
+    def _publish(self):
+        metrics.record_db_pool_state(self.alias, self._in_use, len(self._idle))
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                **{k: round(v, 4) if isinstance(v, float) else v for k, v in self._stats.items()},
+            }
+
+
+def get_pool(alias, options=None):
+    """alias のプールを返す（このプロセスに無ければ作る）"""
+    key = (alias, os.getpid())
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(alias, options)
+    return pool
+
+
+def pool_stats():
+    """このプロセスのプールの統計 {alias: {...}}"""
+    pid = os.getpid()
+    return {alias: pool.stats() for (alias, owner), pool in list(_pools.items()) if owner == pid}
+
+
+def close_all_pools():
+    """このプロセスのプールの空き接続をすべて閉じる（fork 前・終了時）"""
+    pid = os.getpid()
+    for (alias, owner), pool in list(_pools.items()):
+        if owner == pid:
+            pool.close()
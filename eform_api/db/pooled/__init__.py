@@ -0,0 +1,6 @@
+# eform_api/db/pooled/__init__.py
+"""
+接続プール付きの PostgreSQL バックエンド（settings の DB_POOL=true で ENGINE に使う）
+  "ENGINE": "eform_api.db.pooled",
+  "POOL": {"MAX_SIZE": 10, "TIMEOUT": 10, ...},   # eform_api.db.pool.DEFAULT_POOL_OPTIONS
+"""
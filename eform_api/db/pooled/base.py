@@ -0,0 +1,28 @@
+# eform_api/db/pooled/base.py
+"""
+django.db.backends.postgresql に接続プールを挟んだだけのバックエンド
+
+- 接続を開く   → プールから借りる（無ければプールが新しく繋ぐ）
+- 接続を閉じる → プールに返す（トランザクションが残っていればロールバック）
+CONN_MAX_AGE=0 にしておくと、リクエストの終わりごとに接続をプールへ返すので、
+スレッドの数より少ない物理接続を使い回せる。
+"""
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from ..pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        # 借りた接続では親の get_new_connection が走らないので、ここで同じ値を入れておく
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get("isolation_level", IsolationLevel.READ_COMMITTED)
+        )
+        pool = get_pool(self.alias, self.settings_dict.get("POOL"))
+        return pool.acquire(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+
+    def _close(self):
+        if self.connection is None:
+            return
+        get_pool(self.alias, self.settings_dict.get("POOL")).release(self.connection)
@@ -0,0 +1,210 @@
+# eform_api/db/routers.py
+"""
+読み取りレプリカへの振り分け（settings.DATABASE_ROUTERS）
+
+- DATABASES に DB_REPLICA_ALIAS（"replica"）があるときだけ働く。無ければ全部 default
+- レプリカに行くのは「ReplicaRoutingMiddleware を通った、安全なメソッド（GET/HEAD/OPTIONS）の
+  リクエスト」の読み取りだけ。管理コマンド・ワーカー・書き込みリクエストは default
+- 次の場合はそのリクエストの残りの読み取りも default に寄せる
+    * そのリクエストの中で書き込みがあった（GET で ConsentAccessLog を書く public API など）
+    * default のトランザクション（atomic）の中
+- read-your-writes: 書き込みのあったリクエストの後 DB_REPLICA_STICKY_SECONDS 秒は、
+  そのクライアントの読み取りを default に寄せる
+    * ログインユーザー: user id ごとの pin をキャッシュ（DB_REPLICA_PIN_CACHE_ALIAS）に置く。
+      フロント（別サイト）からの XHR にはクッキーが付かないので、こちらが本命。
+      キャッシュがプロセスごと（LocMemCache）だと同じワーカーにしか効かないので、
+      共有キャッシュでなければ manage.py check がエラーにし、ミドルウェアも起動しない
+    * それ以外: pin クッキー（HTTPS では SameSite=None; Secure）
+- ビューごとの上書き: @read_from_primary / @read_from_replica（関数ビュー）、
+  クラスビューは read_database = "primary" / "replica"
+"""
+import contextvars
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+from ..utils import is_shared_cache
+
+PRIMARY = "primary"
+REPLICA = "replica"
+PIN_COOKIE = "eform_db_pin"
+PIN_CACHE_KEY = "db-pin:{}"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_state = contextvars.ContextVar("eform_api_db_routing", default=None)
+
+
+class RoutingState:
+    """1 リクエスト分の振り分け状態"""
+    __slots__ = ("use_replica", "pinned", "wrote")
+
+    def __init__(self, use_replica, pinned):
+        self.use_replica = use_replica
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replica_alias():
+    """レプリカが設定されていればその alias、無ければ None"""
+    alias = settings.DB_REPLICA_ALIAS
+    return alias if alias in settings.DATABASES else None
+
+
+def pin_cache_problem():
+    """レプリカがあるのに pin のキャッシュがワーカー間で共有されないなら、その説明。問題なければ None"""
+    if replica_alias() is None or settings.DB_REPLICA_STICKY_SECONDS <= 0:
+        return None
+    if is_shared_cache(settings.DB_REPLICA_PIN_CACHE_ALIAS):
+        return None
+    return (
+        f"読み取りレプリカの pin を置くキャッシュ（CACHES['{settings.DB_REPLICA_PIN_CACHE_ALIAS}']）が"
+        "ワーカー間で共有されないため、書き込み直後の読み取りが別のワーカーでレプリカに行きます。"
+    )
+
+
+# ------------------------------
+# 1. リクエストの状態
+# ------------------------------
+def _pin_cache():
+    return caches[settings.DB_REPLICA_PIN_CACHE_ALIAS]
+
+
+def token_user_id(request):
+    """
+    Authorization: Bearer の JWT の user id（署名と期限だけ確かめる。DB は引かない）。
+    このミドルウェアは DRF の認証より前に動くので、ここで読む。無効・無しなら None
+    """
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+    from rest_framework_simplejwt.settings import api_settings
+
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    if header is None:
+        return None
+    try:
+        raw = auth.get_raw_token(header)
+        if raw is None:
+            return None
+        return auth.get_validated_token(raw).get(api_settings.USER_ID_CLAIM)
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+
+
+def is_pinned(request, now=None):
+    """直前に書き込みをしたクライアントか（ユーザーの pin か pin クッキーが期限内）"""
+    now = time.time() if now is None else now
+    user_id = token_user_id(request)
+    if user_id is not None:
+        until = _pin_cache().get(PIN_CACHE_KEY.format(user_id))
+        if until is not None and until > now:
+            return True
+    try:
+        until = float(request.COOKIES.get(PIN_COOKIE, 0))
+    except ValueError:
+        return False
+    return until > now
+
+
+def begin_request(request):
+    """リクエストの振り分け状態を作ってこのコンテキストに置く。(状態, reset 用トークン) を返す"""
+    pinned = is_pinned(request)
+    state = RoutingState(use_replica=request.method in SAFE_METHODS and not pinned, pinned=pinned)
+    return state, _state.set(state)
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+def current_state():
+    return _state.get()
+
+
+def apply_view_override(state, view_func):
+    """ビューの read_database（primary / replica）を状態に反映する"""
+    choice = view_read_database(view_func)
+    if choice == PRIMARY:
+        state.use_replica = False
+    elif choice == REPLICA:
+        # 書き込み直後（pin 中）のクライアントにはレプリカを使わない
+        state.use_replica = not state.pinned
+
+
+def pin_response(response, request):
+    """書き込みのあったリクエストの後、そのユーザー（とクッキーのクライアント）を pin する"""
+    seconds = settings.DB_REPLICA_STICKY_SECONDS
+    if seconds <= 0:
+        return
+    until = time.time() + seconds
+
+    # DRF の認証後は request.user に認証済みのユーザーが入っている
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        _pin_cache().set(PIN_CACHE_KEY.format(user.pk), until, timeout=seconds)
+
+    # SameSite=None は Secure が必須なので、HTTP（開発）では Lax のまま
+    secure = request.is_secure()
+    response.set_cookie(
+        PIN_COOKIE,
+        f"{until:.0f}",
+        max_age=seconds,
+        secure=secure,
+        httponly=True,
+        samesite="None" if secure else "Lax",
+    )
+
+
+# ------------------------------
+# 2. ビューごとの上書き
+# ------------------------------
+def view_read_database(view_func):
+    """関数ビューの属性、または DRF / Django のクラスビューの read_database"""
+    choice = getattr(view_func, "read_database", None)
+    if choice is None:
+        view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+        choice = getattr(view_class, "read_database", None)
+    return choice
+
+
+def read_from_primary(view):
+    """このビューの読み取りは常に default（書き込み直後の状態を必ず返したいもの）"""
+    view.read_database = PRIMARY
+    return view
+
+
+def read_from_replica(view):
+    """このビューは書き込みメソッドでも読み取りをレプリカに出してよい（pin 中は除く）"""
+    view.read_database = REPLICA
+    return view
+
+
+# ------------------------------
+# 3. ルーター
+# ------------------------------
+class ReplicaRouter:
+    # None を返すと Django はインスタンスの読み出し元（レプリカかもしれない）を使うので、
+    # default に寄せるときも明示的に "default" を返す
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replica or state.wrote:
+            return "default"
+        alias = replica_alias()
+        if alias is None or connections["default"].in_atomic_block:
+            return "default"
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # レプリカは default の複製なので、どちらから読んだオブジェクト同士でも関連づけてよい
+        aliases = {"default", settings.DB_REPLICA_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
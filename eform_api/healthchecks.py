@@ -0,0 +1,148 @@
+# eform_api/healthchecks.py
+"""
+readiness 用の依存先チェック（DB / オブジェクトストレージ / メール）
+
+- 各チェックの結果はプロセスごとに HEALTH_CHECK_CACHE_SECONDS 秒使い回す
+- 期限切れのときに同時に来たリクエストは、1 本が確認している間ロックで待って同じ結果を使う
+  （LB がどれだけ叩いても、依存先への確認はプロセスごと・TTL ごとに 1 回まで）
+- 外部への確認は HEALTH_CHECK_TIMEOUT_SECONDS で打ち切る
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.smtp import EmailBackend as SMTPEmailBackend
+from django.db import connections
+
+from .db.pool import pool_stats
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_SKIPPED = "skipped"
+
+_cache = {}
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+# ------------------------------
+# 1. 個々のチェック
+# ------------------------------
+def check_database(alias="default"):
+    """SELECT 1 の往復時間。PostgreSQL では接続数の上限に対する使用率も返す"""
+    started = time.perf_counter()
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        result = {"status": STATUS_OK, "latency_ms": _elapsed_ms(started)}
+
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT count(*), current_setting('max_connections')::int "
+                "FROM pg_stat_activity WHERE datname = current_database()"
+            )
+            used, limit = cursor.fetchone()
+            result["connections"] = {"used": used, "max": limit, "usage": round(used / limit, 3)}
+
+    pools = pool_stats()
+    if alias in pools:
+        result["pool"] = pools[alias]
+    return result
+
+
+def check_storage():
+    """S3（と MinIO が設定されていれば MinIO）のバケットに HEAD を送る"""
+    from .storage import get_probe_s3_client
+
+    targets = []
+    if settings.AWS_ACCESS_KEY_ID:
+        targets.append(("s3", settings.AWS_S3_BUCKET_NAME))
+    if settings.MINIO_ACCESS_KEY:
+        targets.append(("minio", settings.MINIO_BUCKET_NAME))
+    if not targets:
+        return {"status": STATUS_SKIPPED, "detail": "オブジェクトストレージの認証情報が未設定"}
+
+    result = {"status": STATUS_OK}
+    for target, bucket in targets:
+        started = time.perf_counter()
+        try:
+            get_probe_s3_client(target).head_bucket(Bucket=bucket)
+            result[target] = {"status": STATUS_OK, "latency_ms": _elapsed_ms(started)}
+        except Exception as e:
+            result[target] = {"status": STATUS_ERROR, "latency_ms": _elapsed_ms(started), "detail": str(e)}
+            result["status"] = STATUS_ERROR
+    return result
+
+
+def check_email():
+    """SMTP なら接続を開いて閉じる（EHLO・認証まで）。ファイル・コンソール等は確認不要"""
+    backend = get_connection(timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS)
+    if not isinstance(backend, SMTPEmailBackend):
+        return {"status": STATUS_SKIPPED, "backend": settings.EMAIL_BACKEND}
+
+    started = time.perf_counter()
+    backend.open()
+    backend.close()
+    return {"status": STATUS_OK, "latency_ms": _elapsed_ms(started)}
+
+
+CHECKS = {
+    "database": check_database,
+    "storage": check_storage,
+    "email": check_email,
+}
+
+
+# ------------------------------
+# 2. キャッシュ付きで実行
+# ------------------------------
+def _lock_for(name):
+    with _locks_guard:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def run_check(name, ttl=None):
+    """チェックを実行して結果（dict）を返す。TTL 内なら前回の結果を返す"""
+    ttl = settings.HEALTH_CHECK_CACHE_SECONDS if ttl is None else ttl
+
+    cached = _cache.get(name)
+    if cached and time.monotonic() < cached[0]:
+        return {**cached[1], "cached": True}
+
+    with _lock_for(name):
+        # 待っている間に別のスレッドが確認し終えていればその結果を使う
+        cached = _cache.get(name)
+        if cached and time.monotonic() < cached[0]:
+            return {**cached[1], "cached": True}
+
+        try:
+            result = CHECKS[name]()
+        except Exception as e:
+            result = {"status": STATUS_ERROR, "detail": f"{type(e).__name__}: {e}"}
+        _cache[name] = (time.monotonic() + ttl, result)
+    return {**result, "cached": False}
+
+
+def readiness():
+    """(HTTP ステータス, 本文) を返す。必須のチェックが失敗したら 503"""
+    checks = {name: run_check(name) for name in CHECKS}
+    failed = [name for name, result in checks.items() if result["status"] == STATUS_ERROR]
+    required_failed = [name for name in failed if name in settings.HEALTH_READINESS_REQUIRED]
+
+    if required_failed:
+        status, code = "error", 503
+    elif failed:
+        status, code = "degraded", 200
+    else:
+        status, code = "ok", 200
+    return code, {"status": status, "checks": checks}
+
+
+def clear_cache():
+    _cache.clear()
@@ -0,0 +1,191 @@
+# eform_api/idempotency.py
+"""
+public API（QR の同意送信）の二重送信対策
+
+イベント会場などの不安定な回線では、送信ボタンが何度も押されて同じ内容が繰り返し届く。
+クライアントが Idempotency-Key ヘッダ（またはボディの submission_uuid）を付けてきたら:
+
+- 最初のリクエスト: IdempotencyRecord を「処理中」で作ってから本処理を行い、応答を書き戻す
+  （5xx・例外のときは行を消して、同じキーで再試行できるようにする）
+- 同じキーの再送: 保存した応答をそのまま返す（Idempotent-Replayed: true）。
+  顧客・同意の表には触らない
+- 最初のリクエストがまだ処理中: 409（Retry-After）
+- 同じキーで別の内容: 422
+
+キーは scope（entry / renew）ごと。IDEMPOTENCY_TTL_SECONDS を過ぎた行は無いものとして扱う。
+キーが無いリクエストは従来どおり毎回処理する。
+"""
+import hashlib
+import json
+import re
+import uuid
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import IdempotencyRecord
+
+HEADER = "Idempotency-Key"
+BODY_FIELD = "submission_uuid"
+REPLAYED_HEADER = "Idempotent-Replayed"
+_KEY = re.compile(r"^[\x21-\x7e]{1,100}$")
+
+
+class IdempotencyKeyError(ValueError):
+    """キーの形式が不正"""
+
+
+class Claim:
+    """claim の結果。record があれば本処理を行い、finish / release を呼ぶ"""
+    __slots__ = ("record", "status", "body", "replayed")
+
+    def __init__(self, record=None, status=None, body=None, replayed=False):
+        self.record = record
+        self.status = status
+        self.body = body
+        self.replayed = replayed
+
+
+# ------------------------------
+# 1. キーとリクエストの指紋
+# ------------------------------
+def request_key(headers, data):
+    """ヘッダ（優先）またはボディの submission_uuid。どちらも無ければ None"""
+    key = headers.get(HEADER)
+    if key is not None:
+        key = key.strip()
+        if not _KEY.match(key):
+            raise IdempotencyKeyError(f"{HEADER} は 100 文字以内の英数字・記号で指定してください")
+        return key
+
+    value = data.get(BODY_FIELD) if hasattr(data, "get") else None
+    if value in (None, ""):
+        return None
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        raise IdempotencyKeyError(f"{BODY_FIELD} は uuid で指定してください")
+
+
+def fingerprint(data):
+    """リクエスト内容の sha256（multipart のファイルは名前と大きさで見る）"""
+    normalized = {}
+    for name in sorted(data.keys()):
+        if name == BODY_FIELD:
+            continue
+        value = data.get(name)
+        if hasattr(value, "read"):
+            value = f"file:{getattr(value, 'name', '')}:{getattr(value, 'size', '')}"
+        normalized[name] = value
+    raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ------------------------------
+# 2. 確保・書き戻し
+# ------------------------------
+def claim(scope, key, request_hash):
+    """
+    キーを確保する。
+    - 初めてのキー: Claim(record=...)。呼び出し側で本処理をして finish / release
+    - 応答が保存済み: Claim(status, body, replayed=True)
+    - 処理中・内容違い: Claim(status=409 / 422, body)
+    """
+    now = timezone.now()
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                record = IdempotencyRecord.objects.create(
+                    scope=scope,
+                    key=key,
+                    request_hash=request_hash,
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+                )
+            return Claim(record=record)
+        except IntegrityError:
+            pass
+
+        existing = IdempotencyRecord.objects.filter(scope=scope, key=key).first()
+        if existing is None:
+            continue
+        stale = existing.status_code is None and existing.created_at < now - timedelta(
+            seconds=settings.IDEMPOTENCY_LOCK_SECONDS
+        )
+        if existing.expires_at <= now or stale:
+            # 期限切れ・処理中のまま止まった行は消して取り直す（同時に消した側は 1 件だけ成功する）
+            IdempotencyRecord.objects.filter(pk=existing.pk, created_at=existing.created_at).delete()
+            continue
+        if existing.request_hash != request_hash:
+            return Claim(status=422, body={"detail": f"この {HEADER} は別の内容の送信に使われています。"})
+        if existing.status_code is None:
+            return Claim(status=409, body={"detail": "同じ送信を処理中です。しばらくしてから再度お試しください。"})
+        return Claim(status=existing.status_code, body=existing.response_body, replayed=True)
+
+    return Claim(status=409, body={"detail": "同じ送信を処理中です。しばらくしてから再度お試しください。"})
+
+
+def finish(record, status, body):
+    """応答を保存する。5xx は保存せずに行を消す（同じキーで再試行できる）"""
+    if status >= 500:
+        release(record)
+        return
+    IdempotencyRecord.objects.filter(pk=record.pk).update(status_code=status, response_body=body)
+
+
+def release(record):
+    IdempotencyRecord.objects.filter(pk=record.pk).delete()
+
+
+# ------------------------------
+# 3. 応答
+# ------------------------------
+def replay_headers(result):
+    """保存済みの応答・409 に付けるヘッダ"""
+    if result.replayed:
+        return {REPLAYED_HEADER: "true"}
+    if result.status == 409:
+        return {"Retry-After": "1"}
+    return {}
+
+
+def replay_response(result):
+    return Response(result.body, status=result.status, headers=replay_headers(result))
+
+
+# ------------------------------
+# 4. DRF の APIView 用
+# ------------------------------
+def idempotent(scope):
+    """
+    APIView の post に付けるデコレータ。キーがあれば最初の応答を保存し、再送にはそれを返す。
+    入力チェックの例外（ValidationError）は保存しない（直して同じキーで送り直せる）
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            try:
+                key = request_key(request.headers, request.data)
+            except IdempotencyKeyError as e:
+                return Response({"detail": str(e)}, status=400)
+            if key is None:
+                return method(view, request, *args, **kwargs)
+
+            result = claim(scope, key, fingerprint(request.data))
+            if result.record is None:
+                return replay_response(result)
+            try:
+                response = method(view, request, *args, **kwargs)
+            except BaseException:
+                release(result.record)
+                raise
+            finish(result.record, response.status_code, getattr(response, "data", None))
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,154 @@
+# eform_api/instrumentation.py
+"""
+リクエスト単位のパフォーマンス計測
+
+- RequestMetrics: 1 リクエスト分の計測値（DB クエリ数・DB 時間・シリアライザ時間・
+  レンダリング時間・外部呼び出し（S3 / メール / PDF）の時間）
+- 現在のリクエストの RequestMetrics は ContextVar で持つので、async ビューや
+  sync_to_async で別スレッドに移った処理からも同じオブジェクトに記録される
+- install() は EformApiConfig.ready() から 1 回だけ呼ばれ、
+  * 全 DB 接続に execute_wrapper を付ける（connection_created シグナル）
+  * DRF の BaseSerializer.is_valid / .data の所要時間を記録する
+- 外部呼び出しはコード側で `with timed("s3"):` のように囲む
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar("eform_api_request_metrics", default=None)
+
+# Server-Timing / ログに出す外部呼び出しの種類
+OUTBOUND_KINDS = ("s3", "email", "pdf")
+
+
+class RequestMetrics:
+    __slots__ = (
+        "started", "db_count", "db_seconds", "serializer_seconds",
+        "render_seconds", "outbound", "_serializer_depth", "_render_started",
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_count = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.render_seconds = 0.0
+        self.outbound = {}
+        self._serializer_depth = 0
+        self._render_started = None
+
+    def add_outbound(self, kind, seconds):
+        self.outbound[kind] = self.outbound.get(kind, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            "total_ms": round(self.elapsed() * 1000, 2),
+            "db_count": self.db_count,
+            "db_ms": round(self.db_seconds * 1000, 2),
+            "serializer_ms": round(self.serializer_seconds * 1000, 2),
+            "render_ms": round(self.render_seconds * 1000, 2),
+            "outbound_ms": {k: round(v * 1000, 2) for k, v in self.outbound.items()},
+        }
+
+    def server_timing(self):
+        """Server-Timing ヘッダの値"""
+        parts = [
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.db_count} queries"',
+            f"ser;dur={self.serializer_seconds * 1000:.2f}",
+            f"render;dur={self.render_seconds * 1000:.2f}",
+        ]
+        for kind in OUTBOUND_KINDS:
+            if kind in self.outbound:
+                parts.append(f"{kind};dur={self.outbound[kind] * 1000:.2f}")
+        parts.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(parts)
+
+
+# ------------------------------
+# 1. 現在のリクエストの計測値
+# ------------------------------
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_metrics():
+    return _current.get()
+
+
+@contextmanager
+def timed(kind):
+    """外部呼び出し（"s3" / "email" / "pdf"）の時間を現在のリクエストに加算する"""
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.add_outbound(kind, time.perf_counter() - started)
+
+
+# ------------------------------
+# 2. DB クエリの計測
+# ------------------------------
+def _db_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_count += 1
+        metrics.db_seconds += time.perf_counter() - started
+
+
+def _install_db_wrapper(sender, connection, **kwargs):
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+# ------------------------------
+# 3. シリアライザの計測（入れ子は一番外側だけ数える）
+# ------------------------------
+def _timed_serializer(func):
+    def wrapper(*args, **kwargs):
+        metrics = _current.get()
+        if metrics is None or metrics._serializer_depth:
+            return func(*args, **kwargs)
+        metrics._serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics._serializer_depth -= 1
+            metrics.serializer_seconds += time.perf_counter() - started
+
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+_installed = False
+
+
+def install():
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    from django.db.backends.signals import connection_created
+    from rest_framework.serializers import BaseSerializer
+
+    connection_created.connect(_install_db_wrapper, weak=False)
+
+    BaseSerializer.is_valid = _timed_serializer(BaseSerializer.is_valid)
+    data_property = BaseSerializer.data
+    BaseSerializer.data = property(_timed_serializer(data_property.fget))
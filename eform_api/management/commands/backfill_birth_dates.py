@@ -0,0 +1,79 @@
+# eform_api/management/commands/backfill_birth_dates.py
+from django.core.management.base import BaseCommand
+
+from eform_api.models import Customer, CustomerConsent
+from eform_api.utils import parse_birth_date
+
+
+class Command(BaseCommand):
+    """
+    文字列の生年月日から型付きカラムを埋める。
+    - Customer.birth_date → Customer.birth_date_value
+    - CustomerConsent.customer_birth_date_snapshot → customer_birth_date_value_snapshot
+
+    pk のキーセットページングで --batch-size 件ずつ bulk_update する。
+    解釈できなかった値は最後に一覧で報告する（値はそのまま残す）。
+
+    例:
+      python manage.py backfill_birth_dates
+      python manage.py backfill_birth_dates --batch-size 5000 --dry-run
+    """
+    help = "生年月日の文字列から型付きの日付カラムをバックフィルします"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--dry-run", action="store_true", help="更新せずに件数だけ表示")
+        parser.add_argument("--max-report", type=int, default=100,
+                            help="解釈できなかった行を何件まで表示するか")
+
+    def handle(self, *args, **options):
+        targets = [
+            (Customer, "birth_date", "birth_date_value"),
+            (CustomerConsent, "customer_birth_date_snapshot", "customer_birth_date_value_snapshot"),
+        ]
+        for model, source_field, target_field in targets:
+            self._backfill(model, source_field, target_field, options)
+
+    def _backfill(self, model, source_field, target_field, options):
+        batch_size = max(options["batch_size"], 1)
+        label = model.__name__
+        updated = 0
+        unparsable = []
+        last_pk = 0
+
+        while True:
+            rows = list(
+                model.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("pk", "uuid", source_field, target_field)[:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1].pk
+
+            changed = []
+            for row in rows:
+                raw = getattr(row, source_field)
+                parsed = parse_birth_date(raw)
+                if raw and parsed is None:
+                    unparsable.append((row.pk, row.uuid, raw))
+                if getattr(row, target_field) != parsed:
+                    setattr(row, target_field, parsed)
+                    changed.append(row)
+
+            if changed and not options["dry_run"]:
+                model.objects.bulk_update(changed, [target_field], batch_size=batch_size)
+            updated += len(changed)
+            self.stdout.write(f"{label}: pk <= {last_pk}, {updated} 件更新")
+
+        verb = "更新対象" if options["dry_run"] else "更新"
+        self.stdout.write(self.style.SUCCESS(f"{label}: {updated} 件{verb}"))
+
+        if unparsable:
+            self.stdout.write(self.style.WARNING(
+                f"{label}: 生年月日を解釈できなかった行 {len(unparsable)} 件"
+            ))
+            for pk, row_uuid, raw in unparsable[:options["max_report"]]:
+                self.stdout.write(f"  id={pk} uuid={row_uuid} {source_field}={raw!r}")
+            if len(unparsable) > options["max_report"]:
+                self.stdout.write(f"  ...ほか {len(unparsable) - options['max_report']} 件")
@@ -0,0 +1,69 @@
+# eform_api/management/commands/backfill_consent_pdfs.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from eform_api.models import ConsentPdf, CustomerConsent
+
+
+class Command(BaseCommand):
+    """
+    事前生成を入れる前の同意書を、PDF の生成キュー（ConsentPdf）に積む。
+    実際の生成は render_consent_pdfs ワーカーが行う。
+
+    pk のキーセットページングで --batch-size 件ずつ読み、ConsentPdf の無い同意書だけ bulk_create する
+    （既に行があるものはそのまま。--retry-failed で failed の行も生成待ちに戻す）。
+
+    例:
+      python manage.py backfill_consent_pdfs --dry-run
+      python manage.py backfill_consent_pdfs --batch-size 1000
+      python manage.py backfill_consent_pdfs --retry-failed
+    """
+    help = "既存の同意書を PDF の生成キューに積みます"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--include-inactive", action="store_true", help="無効化した同意書も積む")
+        parser.add_argument("--retry-failed", action="store_true", help="生成に失敗した行も生成待ちに戻す")
+        parser.add_argument("--dry-run", action="store_true", help="積まずに件数だけ表示")
+
+    def handle(self, *args, **options):
+        batch_size = max(options["batch_size"], 1)
+        last_pk = 0
+        queued = 0
+
+        base = CustomerConsent.objects.filter(pdf__isnull=True)
+        if not options["include_inactive"]:
+            base = base.filter(is_active=True)
+
+        while True:
+            pks = list(
+                base.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+
+            if not options["dry_run"]:
+                ConsentPdf.objects.bulk_create(
+                    [ConsentPdf(consent_id=pk) for pk in pks], batch_size=batch_size, ignore_conflicts=True,
+                )
+            queued += len(pks)
+            self.stdout.write(f"pk <= {last_pk}: {queued} 件")
+
+        retried = 0
+        if options["retry_failed"]:
+            failed = ConsentPdf.objects.filter(status=ConsentPdf.STATUS_FAILED)
+            if options["dry_run"]:
+                retried = failed.count()
+            else:
+                retried = failed.update(
+                    status=ConsentPdf.STATUS_PENDING,
+                    attempts=0,
+                    next_attempt_at=timezone.now(),
+                    last_error="",
+                )
+
+        message = f"積む対象の同意書 {queued} 件" if options["dry_run"] else f"同意書 {queued} 件を積みました"
+        if options["retry_failed"]:
+            message += f"（失敗分の再試行 {retried} 件）"
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,50 @@
+# eform_api/management/commands/backfill_consent_rollups.py
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from eform_api.rollups import rebuild_consent_rollups
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    同意書の日次ロールアップ（ConsentDailyRollup）を生データから作り直す。
+
+    例:
+      python manage.py backfill_consent_rollups
+      python manage.py backfill_consent_rollups --since 2025-01-01 --until 2025-12-31
+      python manage.py backfill_consent_rollups --username artist01 --batch-users 200
+    """
+    help = "CustomerConsent から日次ロールアップを再計算します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=date.fromisoformat, help="対象開始日 (YYYY-MM-DD)")
+        parser.add_argument("--until", type=date.fromisoformat, help="対象終了日 (YYYY-MM-DD)")
+        parser.add_argument("--username", action="append", default=[],
+                            help="対象ユーザー（複数指定可）。省略時は全ユーザー")
+        parser.add_argument("--batch-users", type=int, default=500,
+                            help="1 トランザクションで処理するユーザー数")
+
+    def handle(self, *args, **options):
+        since = options["since"]
+        until = options["until"]
+        if since and until and until < since:
+            raise CommandError("--until は --since 以降の日付を指定してください。")
+
+        users = User.objects.order_by("pk")
+        if options["username"]:
+            users = users.filter(username__in=options["username"])
+        user_ids = list(users.values_list("pk", flat=True))
+
+        batch = max(options["batch_users"], 1)
+        total = 0
+        for i in range(0, len(user_ids), batch):
+            chunk = user_ids[i:i + batch]
+            created = rebuild_consent_rollups(user_ids=chunk, since=since, until=until)
+            total += created
+            self.stdout.write(f"users {i + 1}-{i + len(chunk)} / {len(user_ids)}: {created} rows")
+
+        self.stdout.write(self.style.SUCCESS(f"ロールアップを {total} 行作成しました"))
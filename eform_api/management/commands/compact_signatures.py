@@ -0,0 +1,67 @@
+# eform_api/management/commands/compact_signatures.py
+from django.core.management.base import BaseCommand
+
+from eform_api.models import CustomerConsent
+from eform_api.signatures import SignatureError, compact_image, decode_data_url
+
+
+class Command(BaseCommand):
+    """
+    保存済みの署名（CustomerConsent.signature のデータ URL）を、新しく受け取る署名と同じ形に詰め直す。
+    - PNG / JPEG → 可逆 WebP（settings.SIGNATURE_IMAGE_FORMAT）。小さくならないものはそのまま
+    - 読めない署名・SVG（筆跡）はそのまま
+
+    pk のキーセットページングで --batch-size 件ずつ読み、小さくなった行だけ bulk_update する
+    （updated_at は動かさない）。
+
+    例:
+      python manage.py compact_signatures --dry-run
+      python manage.py compact_signatures --batch-size 500
+    """
+    help = "保存済みの署名画像を可逆圧縮で詰め直します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true", help="更新せずに件数とサイズだけ表示")
+
+    def handle(self, *args, **options):
+        batch_size = max(options["batch_size"], 1)
+        last_pk = 0
+        scanned = changed = skipped = 0
+        before = after = 0
+
+        while True:
+            rows = list(
+                CustomerConsent.objects.filter(pk__gt=last_pk, signature__startswith="data:image/")
+                .exclude(signature__startswith="data:image/svg")
+                .order_by("pk")
+                .values_list("pk", "signature")[:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            updates = []
+            for pk, signature in rows:
+                scanned += 1
+                try:
+                    compacted = compact_image(decode_data_url(signature))
+                except SignatureError:
+                    skipped += 1
+                    continue
+                if len(compacted) >= len(signature):
+                    continue
+                before += len(signature)
+                after += len(compacted)
+                updates.append(CustomerConsent(pk=pk, signature=compacted))
+
+            if updates and not options["dry_run"]:
+                CustomerConsent.objects.bulk_update(updates, ["signature"], batch_size=batch_size)
+            changed += len(updates)
+            self.stdout.write(f"pk <= {last_pk}: {scanned} 件確認, {changed} 件詰め直し")
+
+        verb = "詰め直し対象" if options["dry_run"] else "詰め直し"
+        saved = f"{before:,} → {after:,} bytes" if changed else "変更なし"
+        self.stdout.write(self.style.SUCCESS(
+            f"署名 {scanned} 件中 {changed} 件{verb}（{saved}）, 読めない署名 {skipped} 件"
+        ))
@@ -0,0 +1,781 @@
+import base64
+import io
+import multiprocessing
+import random
+import time
+import uuid
+from collections import namedtuple
+from contextlib import closing, contextmanager
+from itertools import repeat
+from operator import attrgetter
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from eform_api.models import (
+    ConsentAccessLog,
+    ConsentEntryToken,
+    Customer,
+    CustomerConsent,
+    CustomerDeleteLog,
+    CustomerMergeLog,
+    TattooArtist,
+)
+from eform_api.access_logs import ensure_partitions, is_partitioned, rebuild_access_rollups
+from eform_api.rollups import rebuild_consent_rollups
+from eform_api.utils import normalize_phone_number, parse_birth_date
+
+User = get_user_model()
+
+# (漢字, カナ)
+LAST_NAMES = [
+    ("佐藤", "サトウ"), ("鈴木", "スズキ"), ("高橋", "タカハシ"), ("田中", "タナカ"),
+    ("伊藤", "イトウ"), ("渡辺", "ワタナベ"), ("山本", "ヤマモト"), ("中村", "ナカムラ"),
+    ("小林", "コバヤシ"), ("加藤", "カトウ"), ("吉田", "ヨシダ"), ("山田", "ヤマダ"),
+    ("佐々木", "ササキ"), ("山口", "ヤマグチ"), ("松本", "マツモト"), ("井上", "イノウエ"),
+    ("木村", "キムラ"), ("林", "ハヤシ"), ("斎藤", "サイトウ"), ("清水", "シミズ"),
+    ("山崎", "ヤマザキ"), ("森", "モリ"), ("池田", "イケダ"), ("橋本", "ハシモト"),
+    ("阿部", "アベ"), ("石川", "イシカワ"), ("山下", "ヤマシタ"), ("中島", "ナカジマ"),
+    ("石井", "イシイ"), ("小川", "オガワ"), ("前田", "マエダ"), ("岡田", "オカダ"),
+]
+MALE_NAMES = [
+    ("翔太", "ショウタ"), ("大輔", "ダイスケ"), ("健太", "ケンタ"), ("拓也", "タクヤ"),
+    ("蓮", "レン"), ("悠真", "ユウマ"), ("陽翔", "ハルト"), ("湊", "ミナト"),
+    ("大樹", "ダイキ"), ("亮", "リョウ"), ("誠", "マコト"), ("直樹", "ナオキ"),
+    ("和也", "カズヤ"), ("達也", "タツヤ"), ("隼人", "ハヤト"), ("颯太", "ソウタ"),
+]
+FEMALE_NAMES = [
+    ("花子", "ハナコ"), ("美咲", "ミサキ"), ("陽菜", "ヒナ"), ("結衣", "ユイ"),
+    ("葵", "アオイ"), ("さくら", "サクラ"), ("彩", "アヤ"), ("愛", "アイ"),
+    ("優子", "ユウコ"), ("七海", "ナナミ"), ("真由", "マユ"), ("舞", "マイ"),
+    ("菜々子", "ナナコ"), ("凛", "リン"), ("芽衣", "メイ"), ("千尋", "チヒロ"),
+]
+LOCATIONS = [
+    ("東京都", "渋谷区"), ("東京都", "新宿区"), ("東京都", "世田谷区"), ("東京都", "豊島区"),
+    ("神奈川県", "横浜市"), ("神奈川県", "川崎市"), ("大阪府", "大阪市"), ("大阪府", "堺市"),
+    ("愛知県", "名古屋市"), ("福岡県", "福岡市"), ("北海道", "札幌市"), ("宮城県", "仙台市"),
+    ("京都府", "京都市"), ("兵庫県", "神戸市"), ("埼玉県", "さいたま市"), ("千葉県", "千葉市"),
+]
+USER_AGENTS = [
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (Linux; Android 13; SC-51C) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/123.0.0.0 Mobile Safari/537.36",
+    "Line/14.5.0 (iPhone; CPU iPhone OS 17_3 like Mac OS X)",
+]
+# 入力されがちな電話番号の書き方（save() と同じく normalize_phone_number を通す）
+PHONE_FORMATS = [
+    "{p}-{a}-{b}", "{p}{a}{b}", "+81 {q}-{a}-{b}", "({p}){a}-{b}", "TEL:{p}-{a}-{b}",
+]
+# 入力されがちな生年月日の書き方（birth_date は文字列のまま保存される）
+BIRTH_FORMATS = ["{y:04d}-{m:02d}-{d:02d}", "{y:04d}{m:02d}{d:02d}", "{y:04d}/{m:02d}/{d:02d}"]
+CONSENT_VERSIONS = ["v1.0", "v1.1", "v2.0"]
+PRIVACY_VERSIONS = ["p1.0", "p1.1"]
+
+
+CUSTOMER_COLUMNS = [
+    "id", "uuid", "user_id", "full_name", "last_name", "first_name", "last_name_kana",
+    "first_name_kana", "gender", "birth_date", "birth_date_value", "prefecture", "city",
+    "phone_number", "tattoo_experience", "tattooist", "created_at", "updated_at",
+    "is_active", "merged_into_id",
+]
+CONSENT_COLUMNS = [
+    "id", "uuid", "customer_id", "customer_uuid_snapshot", "customer_name_snapshot",
+    "customer_birth_date_snapshot", "customer_birth_date_value_snapshot", "customer_phone_snapshot",
+    "consent_version", "signed_at", "signature", "privacy_agreement_version",
+    "privacy_agreement_agreed_at", "visit_date", "created_at", "updated_at", "is_active",
+]
+ACCESS_LOG_COLUMNS = [
+    "id", "uuid", "token_id", "ip_address", "user_agent", "customer_phone", "created_at",
+]
+
+
+@contextmanager
+def _keep_timestamps(*models):
+    """auto_now / auto_now_add を一時的に外し、生成した過去日時をそのまま保存する"""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+def _memoize_last(convert):
+    """直前と同じオブジェクトなら変換結果を使い回す（同意書は 4 列が同じ signed_at）"""
+    last = [None, None]
+
+    def wrapper(value):
+        if value is not last[0]:
+            last[0], last[1] = value, convert(value)
+        return last[1]
+
+    return wrapper
+
+
+def _insert_fields(model, columns):
+    """INSERT する列（columns の順、そのあとに columns に無い具象フィールド）"""
+    meta = model._meta
+    given = [meta.get_field(name) for name in columns]
+    return given, [f for f in meta.concrete_fields if f not in given]
+
+
+def _uuid4(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+class _RowBuffer:
+    """
+    件数の多いテーブル（Customer / CustomerConsent / ConsentAccessLog）の行を溜めて、
+    DB に渡す値へ変換する。DB には問い合わせないのでワーカープロセスでも使える。
+
+    bulk_create はインスタンス生成と 1 値ごとの SQL コンパイルが重く、SQLite でも
+    数千行/秒で頭打ちになる。ここでは列ごとの DB 変換関数を最初に 1 回だけ決め、
+    行タプルを列ごとにまとめて変換する。
+    - columns に無い列はフィールドの default（無ければ NULL）を全行共通で入れる
+    - pk は take_id() で 0 から振る（実際の pk には _RowWriter が INSERT 時にずらす）
+    - UUID 列に None は渡さない
+    """
+
+    def __init__(self, model, columns):
+        self.Row = namedtuple(f"{model.__name__}Row", columns)
+        given, rest = _insert_fields(model, columns)
+        self.constants = tuple(f.get_db_prep_save(f.get_default(), connection) for f in rest)
+        self.converters = [
+            (i, conv) for i, conv in enumerate(self._converter(f) for f in given) if conv is not None
+        ]
+        self.rows = []
+        self.next_id = 0
+
+    @staticmethod
+    def _converter(field):
+        internal = field.get_internal_type()
+        if internal == "UUIDField" and not connection.features.has_native_uuid_field:
+            return attrgetter("hex")
+        if internal == "DateTimeField":
+            if connection.vendor == "sqlite" and settings.USE_TZ:
+                # adapt_datetimefield_value と同じ結果（DB のタイムゾーンの naive 文字列）を
+                # 1 値ごとの settings 参照なしで作る
+                db_tz = connection.timezone
+                return _memoize_last(
+                    lambda value: None if value is None
+                    else str(value.astimezone(db_tz).replace(tzinfo=None))
+                )
+            return _memoize_last(connection.ops.adapt_datetimefield_value)
+        if internal == "DateField":
+            return connection.ops.adapt_datefield_value
+        return None
+
+    def take_id(self):
+        pk = self.next_id
+        self.next_id += 1
+        return pk
+
+    def add(self, *values):
+        row = self.Row(*values)
+        self.rows.append(row)
+        return row
+
+    def drain(self):
+        """溜めた行を DB に渡す値のタプルにして返し、バッファと pk の採番を空に戻す"""
+        rows, self.rows, self.next_id = self.rows, [], 0
+        if not rows:
+            return []
+        # 列ごとに map で変換して行に戻す（1 値ずつの Python ループを避ける）
+        columns = list(zip(*rows))
+        for i, convert in self.converters:
+            columns[i] = map(convert, columns[i])
+        columns.extend(repeat(value, len(rows)) for value in self.constants)
+        return list(zip(*columns))
+
+
+class _RowWriter:
+    """
+    _RowBuffer.drain() の行を INSERT する（SQLite は executemany、それ以外は複数行 VALUES）。
+    行の pk と、同じまとまりの行を指す列（self_refs と write() の offsets）は 0 始まりなので、
+    INSERT 文の中で「%s + 先頭の pk」にしてずらす（Python 側で行を作り直さない）。
+    pk はここで採番するので、生成中に他から同じテーブルへ書き込まない前提。
+    """
+
+    def __init__(self, model, columns, self_refs=()):
+        meta = model._meta
+        given, rest = _insert_fields(model, columns)
+        self.attnames = [f.attname for f in given + rest]
+        self.shifted_by_self = [meta.pk.attname, *self_refs]
+
+        quote = connection.ops.quote_name
+        columns = ", ".join(quote(f.column) for f in given + rest)
+        self.insert_sql = f"INSERT INTO {quote(meta.db_table)} ({columns}) VALUES "
+        max_params = connection.features.max_query_params or 65535
+        self.rows_per_statement = max(1, min(2000, max_params // len(self.attnames)))
+        self.next_id = (model.objects.aggregate(m=Max("pk"))["m"] or 0) + 1
+
+    def write(self, rows, **offsets):
+        """rows を INSERT して先頭の pk を返す。offsets は {列名: 0 始まりの値に足す数}"""
+        base = self.next_id
+        if not rows:
+            return base
+        self.next_id += len(rows)
+        offsets.update(dict.fromkeys(self.shifted_by_self, base))
+        row_sql = "(" + ", ".join(
+            f"%s + {int(offsets[name])}" if name in offsets else "%s" for name in self.attnames
+        ) + ")"
+
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                # SQLite は 1 行の INSERT を使い回す executemany が一番速い
+                cursor.executemany(self.insert_sql + row_sql, rows)
+            else:
+                step = self.rows_per_statement
+                for start in range(0, len(rows), step):
+                    chunk = rows[start:start + step]
+                    cursor.execute(
+                        self.insert_sql + ", ".join([row_sql] * len(chunk)),
+                        [value for values in chunk for value in values],
+                    )
+        return base
+
+
+@contextmanager
+def _sqlite_bulk_mode(models, notice):
+    """
+    SQLite 向けの一時設定（他の DB では何もしない）
+    - Django は 1 クエリあたりの変数上限を 999 とみなすが、SQLite 3.32 以降の既定値は 32766。
+      生成中だけ上限を引き上げて 1 文あたりの行数を増やす
+    - ページキャッシュ（既定 2MB）を広げ、インデックス更新のたびにページを追い出さないようにする
+    - synchronous=OFF / journal_mode=MEMORY で fsync とジャーナルファイルへの書き出しを省く
+      （生成中に OS ごと落ちると DB が壊れうる。検証用の DB でだけ使うこと）
+    - models の二次インデックス（UNIQUE 制約の自動インデックス以外）を落として最後に作り直す。
+      行ごとに B-tree を更新するより、入れ終わってからまとめて作るほうが速い。
+      例外・Ctrl-C でも作り直すが、プロセスを kill したときは消えたままになるので、
+      落とす前に notice へ出した CREATE INDEX を流し直すこと
+    """
+    if connection.vendor != "sqlite":
+        yield
+        return
+    features = connection.features
+    original = features.max_query_params
+    if connection.Database.sqlite_version_info >= (3, 32):
+        features.max_query_params = 32766
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        saved = {}
+        for pragma in ("cache_size", "synchronous", "journal_mode"):
+            cursor.execute(f"PRAGMA {pragma}")
+            saved[pragma] = cursor.fetchone()[0]
+        cursor.execute("PRAGMA cache_size = -262144")  # 256MB
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.execute("PRAGMA journal_mode = MEMORY")
+        # sql が NULL のものは UNIQUE / PRIMARY KEY の自動インデックス（落とせないし落とさない）
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+            f" AND tbl_name IN ({', '.join(['%s'] * len(tables))}) ORDER BY name",
+            tables,
+        )
+        indexes = cursor.fetchall()
+        if indexes:
+            notice("二次インデックスを外して投入し、最後に作り直します（中断したら次を実行）:")
+        for name, sql in indexes:
+            notice(f"  {sql};")
+            cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+    try:
+        yield
+    finally:
+        features.max_query_params = original
+        with connection.cursor() as cursor:
+            for _, sql in indexes:
+                cursor.execute(sql)
+            cursor.execute(f"PRAGMA journal_mode = {saved['journal_mode']}")
+            cursor.execute(f"PRAGMA synchronous = {int(saved['synchronous'])}")
+            cursor.execute(f"PRAGMA cache_size = {int(saved['cache_size'])}")
+
+
+class Command(BaseCommand):
+    """
+    スケール検証用の合成データを大量に作る。
+    - 彫師（User + TattooArtist）・QR トークン・顧客・同意書・アクセスログ
+    - 顧客の一部はマージ済み（merged_into のチェーンは統合 API と同じくフラット）、
+      一部はソフトデリート済み（CustomerMergeLog / CustomerDeleteLog も作る）
+    - save() を通さずにまとめて INSERT するので、電話番号の正規化・birth_date_value・
+      同意書のスナップショットはここで同じ値を埋め、日次ロールアップは最後に作り直す
+    - 同じ --prefix・--seed・--until なら同じデータ（UUID 含む）になる
+    - 顧客・同意書・アクセスログの pk はこのコマンドが採番するので、
+      生成中に他のプロセスから同じテーブルへ書き込まないこと
+    - 署名は Pillow で作った本物の PNG（--signature-width）を数枚使い回す
+    - --workers N で顧客・同意書・アクセスログの行の組み立てを N プロセスに分ける
+      （INSERT は親プロセスだけ）。乱数は彫師ごとに分けてあるので N によらず同じデータになる
+    - SQLite では生成中だけ二次インデックスを外し、fsync を止める（_sqlite_bulk_mode）
+    - 速度（1 vCPU・SQLite、ロールアップを除く）: 約 3 万行/秒（インデックスの作り直し込み）。
+      目標の 10 万行/秒には届いていない（未解決）。行を組み立て済みにして親プロセスの INSERT
+      だけを測っても約 5〜6 万行/秒で、その大半は SQLite 自身の INSERT・インデックス作成・
+      コミットなので、SQLite では --workers を増やしてもここが上限になる
+
+    例:
+      python manage.py generate_synthetic_data --artists 200 --customers-per-artist 2000
+      python manage.py generate_synthetic_data --prefix synth --seed 42 --until 2026-01-31 --reset
+    """
+    help = "スケール検証用の合成データ（顧客・同意書・トークン・アクセスログ）を生成します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--artists", type=int, default=10)
+        parser.add_argument("--customers-per-artist", type=int, default=1000,
+                            help="彫師あたりの顧客数の平均（±50%% でばらつく）")
+        parser.add_argument("--consents-per-customer", type=float, default=1.8,
+                            help="顧客あたりの同意書数の平均（1 以上）")
+        parser.add_argument("--access-logs-per-consent", type=float, default=1.3,
+                            help="同意書あたりのアクセスログ数の平均（途中離脱の lookup を含む）")
+        parser.add_argument("--tokens-per-artist", type=int, default=3,
+                            help="彫師あたりの QR トークン数（1 本だけ有効、残りは無効化・期限切れ）")
+        parser.add_argument("--merge-rate", type=float, default=0.03,
+                            help="マージ元（統合済みの古い顧客）を持つ顧客の割合")
+        parser.add_argument("--delete-rate", type=float, default=0.02,
+                            help="ソフトデリート済みの顧客の割合")
+        parser.add_argument("--days", type=int, default=730, help="データを散らす期間（日）")
+        parser.add_argument("--until", type=date.fromisoformat, default=None,
+                            help="期間の最終日 (YYYY-MM-DD)。省略時は今日")
+        parser.add_argument("--signature-width", type=int, default=300,
+                            help="署名 PNG の幅（px。高さは 1/3）")
+        parser.add_argument("--prefix", default="synth", help="作成するユーザー名の接頭辞")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--workers", type=int, default=1,
+                            help="顧客・同意書・アクセスログの行を組み立てるプロセス数（INSERT は 1 プロセス）")
+        parser.add_argument("--chunk-size", type=int, default=100000,
+                            help="1 トランザクションで作る行数の目安")
+        parser.add_argument("--reset", action="store_true",
+                            help="同じ接頭辞の既存ユーザー（と関連データ）を先に削除する")
+        parser.add_argument("--skip-rollups", action="store_true",
+                            help="日次ロールアップを作り直さない（あとで backfill_consent_rollups / prune_access_logs --rebuild-rollups）")
+
+    def handle(self, *args, **options):
+        if options["consents_per_customer"] < 1:
+            raise CommandError("--consents-per-customer は 1 以上を指定してください。")
+        if options["artists"] < 1 or options["customers_per_artist"] < 1:
+            raise CommandError("--artists と --customers-per-artist は 1 以上を指定してください。")
+        if options["workers"] < 1:
+            raise CommandError("--workers は 1 以上を指定してください。")
+
+        prefix = options["prefix"]
+        existing = User.objects.filter(username__startswith=f"{prefix}-")
+        if existing.exists():
+            if not options["reset"]:
+                raise CommandError(
+                    f"{prefix}-* のユーザーが既にあります。--reset で削除するか --prefix を変えてください。"
+                )
+            # 監査ログは performed_by が SET_NULL で残り、同じ seed の UUID とぶつかるので先に消す
+            CustomerMergeLog.objects.filter(performed_by__in=existing).delete()
+            CustomerDeleteLog.objects.filter(performed_by__in=existing).delete()
+            deleted, _ = existing.delete()
+            self.stdout.write(f"既存の {prefix}-* データを削除しました（{deleted} 行）")
+
+        started = time.perf_counter()
+        generator = SyntheticDataGenerator(options)
+        with _keep_timestamps(
+            TattooArtist, ConsentEntryToken, CustomerMergeLog, CustomerDeleteLog,
+        ), _sqlite_bulk_mode([Customer, CustomerConsent, ConsentAccessLog], self.stdout.write), \
+                closing(generator):
+            # 過去の月のアクセスログが DEFAULT パーティションに溜まらないよう先に月を作っておく
+            if is_partitioned():
+                ensure_partitions(since=timezone.localtime(generator.start).date())
+            for artist_indexes in generator.artist_batches():
+                with transaction.atomic():
+                    counts = generator.generate(artist_indexes)
+                elapsed = time.perf_counter() - started
+                total = generator.total_rows
+                self.stdout.write(
+                    f"artists {artist_indexes[0] + 1}-{artist_indexes[-1] + 1}: "
+                    + ", ".join(f"{k}={v}" for k, v in counts.items())
+                    + f" / 累計 {total} 行 {total / elapsed:,.0f} 行/秒"
+                )
+
+        # pk を自前で振ったので PostgreSQL のシーケンスを追いつかせる（SQLite は不要）
+        sequence_sql = connection.ops.sequence_reset_sql(
+            no_style(), [Customer, CustomerConsent, ConsentAccessLog],
+        )
+        if sequence_sql:
+            with connection.cursor() as cursor:
+                for sql in sequence_sql:
+                    cursor.execute(sql)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{generator.total_rows} 行を {elapsed:.1f} 秒で作成しました"
+            f"（{generator.total_rows / elapsed:,.0f} 行/秒）"
+        ))
+        for model_name, count in generator.totals.items():
+            self.stdout.write(f"  {model_name}: {count}")
+
+        if not options["skip_rollups"]:
+            rollup_started = time.perf_counter()
+            rollups = rebuild_consent_rollups(user_ids=generator.user_ids)
+            rollups += rebuild_access_rollups(user_ids=generator.user_ids)
+            self.stdout.write(
+                f"日次ロールアップ {rollups} 行を作り直しました"
+                f"（{time.perf_counter() - rollup_started:.1f} 秒）"
+            )
+
+
+# 1 彫師分の行（ワーカーから親プロセスへ返す）。customers / consents / access_logs は
+# _RowBuffer.drain() の値、merge_logs / delete_logs は監査ログの値のタプル
+ArtistRows = namedtuple(
+    "ArtistRows", ["customers", "consents", "access_logs", "merge_logs", "delete_logs", "last_used"],
+)
+
+_worker = {}
+
+
+def _init_worker(factory):
+    _worker["factory"] = factory
+
+
+def _artist_rows(job):
+    return _worker["factory"].rows(*job)
+
+
+class SyntheticDataGenerator:
+    """
+    彫師のまとまりごとに行を組み立ててまとめて INSERT する。
+    顧客・同意書・アクセスログの組み立ては _ArtistRowFactory に任せ、--workers が 2 以上なら
+    ワーカープロセスで並列に作る（INSERT と pk の採番はこのプロセスだけで行う）
+    """
+
+    def __init__(self, options):
+        self.options = options
+        # 接頭辞も混ぜて、別の接頭辞で作ったデータと UUID がぶつからないようにする
+        self.rng = random.Random(f"{options['prefix']}:{options['seed']}")
+        tz = timezone.get_current_timezone()
+        until = options["until"] or timezone.localdate()
+        # すべての日時を TIME_ZONE の aware datetime で作るので .date() がそのまま現地の日付になる
+        self.until = timezone.make_aware(datetime.combine(until + timedelta(days=1), dt_time.min), tz)
+        self.start = self.until - timedelta(days=options["days"])
+        # パスワードのハッシュ化は重いので 1 回だけ（ログイン不可のハッシュ）
+        self.password = make_password(None)
+        # 署名は表示・PDF 生成で実際にデコードされるので本物の PNG を数枚だけ作って使い回す
+        signatures = [self._signature_png(options["signature_width"]) for _ in range(8)]
+        factory = _ArtistRowFactory(options, self.start, self.until, signatures)
+
+        self.pool = None
+        if options["workers"] > 1:
+            # ワーカーは DB に触らないが、fork で接続を持ち越さないよう繋ぐ前に起こしておく
+            connections.close_all()
+            self.pool = multiprocessing.get_context("fork").Pool(
+                options["workers"], initializer=_init_worker, initargs=(factory,),
+            )
+        else:
+            _init_worker(factory)
+
+        self.customers = _RowWriter(Customer, CUSTOMER_COLUMNS, self_refs=["merged_into_id"])
+        self.consents = _RowWriter(CustomerConsent, CONSENT_COLUMNS)
+        self.access_logs = _RowWriter(ConsentAccessLog, ACCESS_LOG_COLUMNS)
+
+        self.user_ids = []
+        self.totals = {}
+        self.total_rows = 0
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def _signature_png(self, width):
+        """手書き風の線を数本引いた 白黒の PNG（データ URL）"""
+        from PIL import Image, ImageDraw
+
+        height = max(width // 3, 1)
+        image = Image.new("L", (width, height), 255)
+        draw = ImageDraw.Draw(image)
+        rng = self.rng
+        x = rng.uniform(0.05, 0.15) * width
+        for _ in range(rng.randint(2, 4)):
+            points = []
+            y = rng.uniform(0.3, 0.7) * height
+            for _ in range(rng.randint(6, 12)):
+                x = min(x + rng.uniform(0.01, 0.06) * width, width - 1)
+                y = min(max(y + rng.uniform(-0.25, 0.25) * height, 0), height - 1)
+                points.append((x, y))
+            draw.line(points, fill=17, width=max(width // 150, 2), joint="curve")
+        buf = io.BytesIO()
+        image.save(buf, format="PNG", optimize=True)
+        return "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+    # ------------------------------
+    # バッチ分割
+    # ------------------------------
+    def artist_batches(self):
+        o = self.options
+        rows_per_artist = o["customers_per_artist"] * (
+            1 + o["consents_per_customer"] * (1 + o["access_logs_per_consent"])
+        )
+        per_batch = max(1, int(o["chunk_size"] // max(rows_per_artist, 1)))
+        indexes = list(range(o["artists"]))
+        for i in range(0, len(indexes), per_batch):
+            yield indexes[i:i + per_batch]
+
+    # ------------------------------
+    # 生成
+    # ------------------------------
+    def generate(self, artist_indexes):
+        o = self.options
+        rng = self.rng
+        created = self.start - timedelta(days=30)
+
+        # ---- 1. 彫師（User + TattooArtist）と QR トークン（件数が少ないので bulk_create） ----
+        users = [
+            User(
+                username=f"{o['prefix']}-{i + 1:05d}",
+                email=f"{o['prefix']}-{i + 1:05d}@example.com",
+                password=self.password,
+                date_joined=created,
+            )
+            for i in artist_indexes
+        ]
+        User.objects.bulk_create(users)
+        self.user_ids.extend(u.pk for u in users)
+
+        artists = []
+        for user in users:
+            last, last_kana = rng.choice(LAST_NAMES)
+            first, first_kana = rng.choice(MALE_NAMES + FEMALE_NAMES)
+            prefecture, city = rng.choice(LOCATIONS)
+            artists.append(TattooArtist(
+                uuid=_uuid4(rng), user=user, last_name=last, first_name=first,
+                artist_name=f"{last}{first}", furigana_name=f"{last_kana} {first_kana}",
+                studio_name=f"{last} Tattoo Studio", prefecture=prefecture, location=city,
+                email=user.email, created_at=created, updated_at=created,
+            ))
+        TattooArtist.objects.bulk_create(artists)
+
+        tokens = []
+        for artist in artists:
+            for t in range(max(o["tokens_per_artist"], 1)):
+                # 1 本目が現役、2 本目は期限切れ、残りは rotate で無効化されたもの
+                tokens.append(ConsentEntryToken(
+                    uuid=_uuid4(rng), artist=artist,
+                    label=rng.choice(("店頭POP", "イベント", "Instagram")),
+                    is_active=(t == 0), created_at=created, updated_at=created,
+                    expires_at=self.start + timedelta(days=90) if t == 1 else None,
+                ))
+        ConsentEntryToken.objects.bulk_create(tokens)
+        active_token = {token.artist.user_id: token for token in tokens if token.is_active}
+
+        # ---- 2. 顧客・同意書・アクセスログ（彫師ごとに組み立て、届いた順に INSERT） ----
+        jobs = [
+            (i, artist.user_id, artist.artist_name, active_token[artist.user_id].pk)
+            for i, artist in zip(artist_indexes, artists)
+        ]
+        if self.pool is not None:
+            results = self.pool.imap(_artist_rows, jobs)
+        else:
+            results = map(_artist_rows, jobs)
+
+        merge_logs = []
+        delete_logs = []
+        n_customers = n_consents = n_logs = 0
+        for artist, rows in zip(artists, results):
+            customer_base = self.customers.write(rows.customers)
+            self.consents.write(rows.consents, customer_id=customer_base)
+            self.access_logs.write(rows.access_logs)
+            n_customers += len(rows.customers)
+            n_consents += len(rows.consents)
+            n_logs += len(rows.access_logs)
+            active_token[artist.user_id].last_used_at = rows.last_used
+            merge_logs.extend(
+                CustomerMergeLog(
+                    uuid=log_uuid, keep_uuid=keep_uuid, merged_uuid=merged_uuid,
+                    performed_by_id=artist.user_id, performed_at=performed_at,
+                    details=f"顧客マージ: keep={keep_uuid} ← merged={merged_uuid}",
+                )
+                for log_uuid, keep_uuid, merged_uuid, performed_at in rows.merge_logs
+            )
+            delete_logs.extend(
+                CustomerDeleteLog(
+                    uuid=log_uuid, customer_uuid=customer_uuid, performed_by_id=artist.user_id,
+                    performed_at=performed_at, reason="ユーザーによる削除",
+                )
+                for log_uuid, customer_uuid, performed_at in rows.delete_logs
+            )
+
+        ConsentEntryToken.objects.bulk_update(tokens, ["last_used_at"])
+        CustomerMergeLog.objects.bulk_create(merge_logs)
+        CustomerDeleteLog.objects.bulk_create(delete_logs)
+
+        counts = {
+            "User": len(users),
+            "TattooArtist": len(artists),
+            "ConsentEntryToken": len(tokens),
+            "Customer": n_customers,
+            "CustomerConsent": n_consents,
+            "ConsentAccessLog": n_logs,
+            "CustomerMergeLog": len(merge_logs),
+            "CustomerDeleteLog": len(delete_logs),
+        }
+        for model_name, count in counts.items():
+            self.totals[model_name] = self.totals.get(model_name, 0) + count
+            self.total_rows += count
+        return counts
+
+
+class _ArtistRowFactory:
+    """
+    1 彫師分の顧客・同意書・アクセスログの行を組み立てる（DB には触らないのでワーカーでも動く）。
+    乱数は彫師ごとに「接頭辞:seed:彫師の番号」から作るので、--workers の数によらず同じ行になる。
+    pk と顧客を指す列は 0 始まりで、_RowWriter が INSERT 時に実際の値へずらす
+    """
+
+    def __init__(self, options, start, until, signatures):
+        self.options = options
+        self.seed = f"{options['prefix']}:{options['seed']}"
+        self.start = start
+        self.until = until
+        self.signatures = signatures
+        # 再来店の確率（同意書数が平均 consents_per_customer 件の幾何分布になる）
+        self.revisit_p = 1 - 1 / options["consents_per_customer"]
+        self.customers = _RowBuffer(Customer, CUSTOMER_COLUMNS)
+        self.consents = _RowBuffer(CustomerConsent, CONSENT_COLUMNS)
+        self.access_logs = _RowBuffer(ConsentAccessLog, ACCESS_LOG_COLUMNS)
+        self.rng = None
+
+    def rows(self, artist_index, user_id, artist_name, token_id):
+        o = self.options
+        rng = self.rng = random.Random(f"{self.seed}:{artist_index}")
+        merge_logs = []
+        delete_logs = []
+        last_used = None
+        n = rng.randint(max(o["customers_per_artist"] // 2, 1), o["customers_per_artist"] * 3 // 2)
+        for _ in range(n):
+            created_at = self._moment(self.start, self.until)
+            visits = self._visits(created_at, self.until)
+            is_deleted = rng.random() < o["delete_rate"]
+            keep = self._customer(user_id, artist_name, created_at, visits[-1], is_active=not is_deleted)
+            self._consents(keep, visits, token_id)
+            if last_used is None or visits[-1] > last_used:
+                last_used = visits[-1]
+
+            if is_deleted:
+                delete_logs.append((self._uuid(), keep.uuid, visits[-1]))
+            elif rng.random() < o["merge_rate"]:
+                # 1〜3 件の古い重複登録がこの顧客に統合済み（チェーンはフラット）
+                for _ in range(rng.randint(1, 3)):
+                    source_created = self._moment(self.start, created_at)
+                    source_visits = self._visits(source_created, created_at)
+                    source = self._customer(
+                        user_id, artist_name, source_created, created_at,
+                        is_active=False, merged_into=keep,
+                    )
+                    self._consents(source, source_visits, token_id)
+                    merge_logs.append((self._uuid(), keep.uuid, source.uuid, created_at))
+
+        return ArtistRows(
+            self.customers.drain(), self.consents.drain(), self.access_logs.drain(),
+            merge_logs, delete_logs, last_used,
+        )
+
+    # ------------------------------
+    # 乱数ヘルパー（すべて self.rng から引くので seed で再現できる）
+    # ------------------------------
+    def _uuid(self):
+        return _uuid4(self.rng)
+
+    def _moment(self, after, limit):
+        """after から limit までのどこかの時刻"""
+        return after + (limit - after) * self.rng.random()
+
+    def _phone(self):
+        rng = self.rng
+        head = rng.choice(("090", "080", "070"))
+        raw = rng.choice(PHONE_FORMATS).format(
+            p=head, q=head[1:], a=f"{rng.randrange(10000):04d}", b=f"{rng.randrange(10000):04d}",
+        )
+        return normalize_phone_number(raw)
+
+    def _birth_date(self):
+        rng = self.rng
+        y, m, d = rng.randint(1960, 2006), rng.randint(1, 12), rng.randint(1, 28)
+        return rng.choice(BIRTH_FORMATS).format(y=y, m=m, d=d)
+
+    def _ip(self):
+        n = self.rng.getrandbits(24)
+        return f"{self.rng.choice((49, 60, 110, 126, 153, 180, 220))}.{n >> 16}.{(n >> 8) & 255}.{n & 255}"
+
+    def _count(self, mean):
+        """平均 mean の回数（整数部 + 小数部の確率で 1 回）"""
+        whole = int(mean)
+        return whole + (self.rng.random() < mean - whole)
+
+    def _visits(self, first, limit):
+        """first から limit までの来店（同意）日時の一覧"""
+        visits = [first]
+        while self.rng.random() < self.revisit_p:
+            nxt = self._moment(visits[-1], limit)
+            if nxt >= limit - timedelta(minutes=1):
+                break
+            visits.append(nxt)
+        return visits
+
+    def _customer(self, user_id, artist_name, created_at, updated_at, is_active=True, merged_into=None):
+        """
+        顧客 1 行。Customer.save() と同じく電話番号を正規化し birth_date_value を埋める。
+        merged_into を渡すとその顧客の重複登録（マージ元）らしい値にする
+        """
+        rng = self.rng
+        like = merged_into
+        if like is None:
+            gender = rng.choice(("male", "female", "female", "other", "none"))
+            (last, last_kana) = rng.choice(LAST_NAMES)
+            (first, first_kana) = rng.choice(MALE_NAMES if gender == "male" else FEMALE_NAMES)
+            birth_date = self._birth_date()
+            phone = self._phone()
+            prefecture, city = rng.choice(LOCATIONS)
+        else:
+            gender, birth_date, prefecture, city = like.gender, like.birth_date, like.prefecture, like.city
+            last, last_kana = like.last_name, like.last_name_kana
+            first, first_kana = like.first_name, like.first_name_kana
+            # 同じ番号での二重登録と、番号を変えての再登録が半々
+            phone = like.phone_number if rng.random() < 0.5 else self._phone()
+
+        return self.customers.add(
+            self.customers.take_id(), self._uuid(), user_id, f"{last} {first}",
+            last, first, last_kana, first_kana, gender, birth_date, parse_birth_date(birth_date),
+            prefecture, city, phone, rng.random() < 0.4, artist_name,
+            created_at, updated_at, is_active, merged_into.id if merged_into else None,
+        )
+
+    def _consents(self, customer, visits, token_id):
+        """
+        来店ごとの同意書と、その直前のアクセスログ。
+        CustomerConsent.save() が新規作成時に埋めるスナップショットも同じ値で埋める
+        """
+        rng = self.rng
+        add_consent, add_log = self.consents.add, self.access_logs.add
+        for signed_at in visits:
+            add_consent(
+                self.consents.take_id(), self._uuid(), customer.id, customer.uuid,
+                customer.full_name, customer.birth_date or "", customer.birth_date_value,
+                customer.phone_number or "", rng.choice(CONSENT_VERSIONS), signed_at,
+                rng.choice(self.signatures), rng.choice(PRIVACY_VERSIONS), signed_at,
+                signed_at.date(), signed_at, signed_at, rng.random() >= 0.005,
+            )
+            # 1 件目は署名直前の entry / renew、2 件目以降は途中離脱した lookup など
+            for k in range(self._count(self.options["access_logs_per_consent"])):
+                offset = rng.randrange(30, 600) if k else rng.randrange(1, 5)
+                add_log(
+                    self.access_logs.take_id(), self._uuid(), token_id, self._ip(),
+                    rng.choice(USER_AGENTS), customer.phone_number,
+                    signed_at - timedelta(seconds=offset),
+                )
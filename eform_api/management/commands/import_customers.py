@@ -0,0 +1,57 @@
+# eform_api/management/commands/import_customers.py
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from eform_api.customer_import import DEFAULT_CHUNK_SIZE, CustomerImportError, import_customers
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    顧客 CSV をユーザー（彫師）の顧客として取り込む（API の import と同じ処理）。
+
+    例:
+      python manage.py import_customers artist01 customers.csv
+      python manage.py import_customers artist01 export.csv --encoding cp932 --errors errors.json
+    """
+    help = "顧客 CSV を取り込みます"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("path")
+        parser.add_argument("--encoding", default="utf-8-sig", help="文字コード（Excel の CSV なら cp932）")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument("--errors", help="行ごとのエラーを書き出す JSON ファイル")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"ユーザー {options['username']} が見つかりません")
+
+        def report(result):
+            self.stdout.write(
+                f"{result.rows} 行: 作成 {result.created} / 更新 {result.updated} / エラー {result.error_count}"
+            )
+
+        try:
+            with open(options["path"], "rb") as stream:
+                result = import_customers(
+                    user, stream, encoding=options["encoding"],
+                    chunk_size=options["chunk_size"], progress=report,
+                )
+        except (OSError, CustomerImportError) as e:
+            raise CommandError(str(e))
+
+        if options["errors"] and result.errors:
+            with open(options["errors"], "w", encoding="utf-8") as f:
+                json.dump(result.errors, f, ensure_ascii=False, indent=2)
+        for error in result.errors[:10]:
+            self.stderr.write(f"{error['row']} 行目: {' / '.join(error['errors'])}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"取り込み完了: 作成 {result.created} 件 / 更新 {result.updated} 件 / エラー {result.error_count} 件"
+        ))
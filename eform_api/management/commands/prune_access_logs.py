@@ -0,0 +1,89 @@
+# eform_api/management/commands/prune_access_logs.py
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from eform_api.access_logs import (
+    add_months,
+    archive_month,
+    drop_month,
+    ensure_partitions,
+    is_partitioned,
+    month_start,
+    months_with_logs,
+    rebuild_access_rollups,
+)
+
+
+class Command(BaseCommand):
+    """
+    公開フォームのアクセスログ（ConsentAccessLog）を月単位で保持期間管理する。
+
+    - 保持期間より古い月は、日次ロールアップを作り直してから月ごとまとめて削除する
+      （PostgreSQL はパーティションを DETACH → DROP、SQLite は範囲指定の DELETE 1 本）
+    - --archive-dir を付けると削除前に月ごとの CSV（gzip）に書き出す
+    - PostgreSQL では先の月のパーティションも作っておく（cron で毎日流す想定）
+
+    例:
+      python manage.py prune_access_logs
+      python manage.py prune_access_logs --keep-months 6 --archive-dir /var/backups/access_logs
+      python manage.py prune_access_logs --dry-run
+      python manage.py prune_access_logs --rebuild-rollups --since 2025-01-01
+    """
+    help = "保持期間を過ぎたアクセスログを月単位で削除（アーカイブ）します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep-months", type=int, default=settings.ACCESS_LOG_RETENTION_MONTHS,
+                            help="今月を含めて残す月数")
+        parser.add_argument("--archive-dir", help="削除前に CSV.gz を書き出すディレクトリ")
+        parser.add_argument("--months-ahead", type=int, default=settings.ACCESS_LOG_PARTITION_MONTHS_AHEAD,
+                            help="先に作っておくパーティションの月数（PostgreSQL のみ）")
+        parser.add_argument("--dry-run", action="store_true", help="対象の月を表示するだけ")
+        parser.add_argument("--rebuild-rollups", action="store_true",
+                            help="削除はせず、残っている生ログから日次ロールアップを作り直す")
+        parser.add_argument("--since", type=date.fromisoformat,
+                            help="--rebuild-rollups の対象開始日 (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        if options["rebuild_rollups"]:
+            created = rebuild_access_rollups(since=options["since"])
+            self.stdout.write(self.style.SUCCESS(f"アクセスログのロールアップを {created} 行作成しました"))
+            return
+
+        keep = options["keep_months"]
+        if keep < 1:
+            raise CommandError("--keep-months は 1 以上を指定してください。")
+
+        partitioned = is_partitioned()
+        if partitioned and not options["dry_run"]:
+            for month in ensure_partitions(months_ahead=options["months_ahead"]):
+                self.stdout.write(f"パーティション {month:%Y-%m} を作成しました")
+
+        cutoff = add_months(month_start(timezone.localdate()), -(keep - 1))
+        months = months_with_logs(before=cutoff)
+        if not months:
+            self.stdout.write(f"{cutoff:%Y-%m} より前のアクセスログはありません")
+            return
+
+        self.stdout.write(
+            f"{cutoff:%Y-%m} より前の {len(months)} か月分を削除します"
+            f"（{'パーティション' if partitioned else 'DELETE'}）: "
+            + ", ".join(f"{m:%Y-%m}" for m in months)
+        )
+        if options["dry_run"]:
+            return
+
+        total = 0
+        for month in months:
+            # 生ログが消えると作り直せなくなるので、先にその月のロールアップを確定させる
+            rebuild_access_rollups(since=month, until=add_months(month, 1) - timedelta(days=1))
+            if options["archive_dir"]:
+                path, archived = archive_month(month, options["archive_dir"])
+                self.stdout.write(f"{month:%Y-%m}: {archived} 行を {path} に書き出しました")
+            removed = drop_month(month)
+            total += removed
+            self.stdout.write(f"{month:%Y-%m}: {removed} 行を削除しました")
+
+        self.stdout.write(self.style.SUCCESS(f"アクセスログを {total} 行削除しました"))
@@ -0,0 +1,53 @@
+# eform_api/management/commands/prune_email_outbox.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from eform_api.models import EmailOutbox
+
+
+class Command(BaseCommand):
+    """
+    送信が終わったメール（EmailOutbox の sent / failed）を保存期間
+    （EMAIL_OUTBOX_RETENTION_DAYS）が過ぎたら消す（cron で毎日）。
+    本文にパスワード再設定リンクなどが入っているので、送り終えた行を残し続けない。
+
+    - sent は sent_at、failed は最後の試行の予定時刻（next_attempt_at）から数える
+    - pending / sending の行は消さない
+    - --batch-size 件ずつ消すので、長いロックを取らない
+
+    例:
+      python manage.py prune_email_outbox
+      python manage.py prune_email_outbox --days 1 --dry-run
+    """
+    help = "保存期間を過ぎた送信済み・送信失敗のメールを削除します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None,
+                            help="保存日数（省略時は EMAIL_OUTBOX_RETENTION_DAYS）")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--dry-run", action="store_true", help="削除せずに件数だけ表示")
+
+    def handle(self, *args, **options):
+        days = options["days"] if options["days"] is not None else settings.EMAIL_OUTBOX_RETENTION_DAYS
+        before = timezone.now() - timedelta(days=max(days, 0))
+        expired = EmailOutbox.objects.filter(
+            Q(status=EmailOutbox.STATUS_SENT, sent_at__lte=before)
+            | Q(status=EmailOutbox.STATUS_FAILED, next_attempt_at__lte=before)
+        )
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"削除対象 {expired.count()} 件"))
+            return
+
+        batch_size = max(options["batch_size"], 1)
+        deleted = 0
+        while True:
+            pks = list(expired.order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+            deleted += EmailOutbox.objects.filter(pk__in=pks).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f"{days} 日より前のメールを {deleted} 件削除しました"))
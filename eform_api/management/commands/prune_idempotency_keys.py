@@ -0,0 +1,39 @@
+# eform_api/management/commands/prune_idempotency_keys.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from eform_api.models import IdempotencyRecord
+
+
+class Command(BaseCommand):
+    """
+    期限（IDEMPOTENCY_TTL_SECONDS）を過ぎた二重送信対策の行（IdempotencyRecord）を消す。
+    期限切れの行は API からも無いものとして扱われるので、表を小さく保つためだけのもの（cron で毎日）。
+
+    --batch-size 件ずつ消すので、長いロックを取らない。
+
+    例:
+      python manage.py prune_idempotency_keys
+      python manage.py prune_idempotency_keys --dry-run
+    """
+    help = "期限切れの Idempotency-Key の記録を削除します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--dry-run", action="store_true", help="削除せずに件数だけ表示")
+
+    def handle(self, *args, **options):
+        expired = IdempotencyRecord.objects.filter(expires_at__lte=timezone.now())
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"削除対象 {expired.count()} 件"))
+            return
+
+        batch_size = max(options["batch_size"], 1)
+        deleted = 0
+        while True:
+            pks = list(expired.order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+            deleted += IdempotencyRecord.objects.filter(pk__in=pks).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f"期限切れの記録を {deleted} 件削除しました"))
@@ -0,0 +1,46 @@
+# eform_api/management/commands/register_consent_document.py
+from django.core.management.base import BaseCommand, CommandError
+
+from eform_api.consent_documents import ConsentDocumentError, register_document
+from eform_api.models import ConsentDocumentVersion
+
+
+class Command(BaseCommand):
+    """
+    同意書・プライバシーポリシーの本文（HTML。Django テンプレートとして描画）を版として登録する。
+
+    - 同じ本文が登録済みなら本文は共有する（sha256 で重複を除く）
+    - 登録済みの版は変えられない（同じ本文ならそのまま成功、違う本文ならエラー）
+
+    例:
+      python manage.py register_consent_document consent 2024-04 docs/consent_2024-04.html --title "タトゥー施術同意書"
+      python manage.py register_consent_document privacy 1.2 docs/privacy_1.2.html
+    """
+    help = "同意書の本文を版として登録します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=[k for k, _ in ConsentDocumentVersion.KIND_CHOICES])
+        parser.add_argument("version")
+        parser.add_argument("path", help="本文の HTML ファイル（UTF-8）")
+        parser.add_argument("--title", default="")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], encoding="utf-8") as f:
+                body = f.read()
+        except OSError as e:
+            raise CommandError(f"ファイルを読めません: {e}")
+
+        try:
+            document, created = register_document(
+                options["kind"], options["version"], body, title=options["title"],
+            )
+        except ConsentDocumentError as e:
+            raise CommandError(str(e))
+
+        shared = document.body.versions.count() - 1
+        verb = "登録しました" if created else "登録済みです（同じ本文）"
+        self.stdout.write(self.style.SUCCESS(
+            f"{document} を{verb} sha256={document.body.sha256[:12]}"
+            + (f"（本文を {shared} 件の版と共有）" if shared else "")
+        ))
@@ -0,0 +1,57 @@
+# eform_api/management/commands/render_consent_pdfs.py
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from eform_api.consent_pdfs import render_batch
+from eform_api.pdf_renderer import shutdown_pool
+
+
+class Command(BaseCommand):
+    """
+    ConsentPdf に積まれた同意書の PDF を作って S3 に置くワーカー。
+
+    - 署名時（public entry / renew・submit-consent・同意履歴 API の作成）に積まれた行を古い順に処理する
+    - 複数起動してよい（PostgreSQL では SKIP LOCKED で同じ行を取り合わない）
+    - 失敗した行は指数バックオフで再試行（settings.CONSENT_PDF_*）
+    - 署名前からある同意書は backfill_consent_pdfs で積む
+
+    例:
+      python manage.py render_consent_pdfs            # 溜まっている分を作って終了（cron 向け）
+      python manage.py render_consent_pdfs --loop     # 常駐（systemd 等で起動）
+    """
+    help = "生成待ちの同意書 PDF を作って S3 に保存します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=20)
+        parser.add_argument("--loop", action="store_true", help="キューを監視し続ける")
+        parser.add_argument("--interval", type=float, default=2.0,
+                            help="--loop 時、キューが空のときの待機秒数")
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        total_done = total_failed = 0
+        try:
+            while not self._stopping:
+                done, failed = render_batch(batch_size=options["batch_size"])
+                total_done += done
+                total_failed += failed
+                if done or failed:
+                    self.stdout.write(f"生成 {done} 件 / 失敗 {failed} 件")
+
+                if done + failed < options["batch_size"]:
+                    # キューが空（または残りはバックオフ待ち）
+                    if not options["loop"]:
+                        break
+                    time.sleep(options["interval"])
+        finally:
+            shutdown_pool()
+
+        self.stdout.write(self.style.SUCCESS(f"合計: 生成 {total_done} 件 / 失敗 {total_failed} 件"))
+
+    def _stop(self, signum, frame):
+        self._stopping = True
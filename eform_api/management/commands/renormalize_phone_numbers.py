@@ -0,0 +1,134 @@
+# eform_api/management/commands/renormalize_phone_numbers.py
+import json
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from eform_api.models import Customer, CustomerConsent
+from eform_api.utils import normalize_phone_numbers
+
+
+class Command(BaseCommand):
+    """
+    保存済みの電話番号を今の normalize_phone_number で正規化し直す。
+    - Customer.phone_number
+    - CustomerConsent.customer_phone_snapshot
+
+    pk のキーセットページングで --batch-size 件ずつ読み、変わる行だけ bulk_update する
+    （updated_at は動かさない）。
+    正規化し直した結果、同じ彫師の有効な顧客と電話番号が重なるものは最後に一覧で報告する
+    （マージはしない。顧客マージ API で整理する）。
+
+    例:
+      python manage.py renormalize_phone_numbers --dry-run
+      python manage.py renormalize_phone_numbers --batch-size 5000 --report duplicates.json
+    """
+    help = "顧客・同意書スナップショットの電話番号を正規化し直します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--dry-run", action="store_true", help="更新せずに件数と重複だけ表示")
+        parser.add_argument("--max-report", type=int, default=100,
+                            help="新しくできる重複を何件まで表示するか")
+        parser.add_argument("--report", help="新しくできる重複の一覧を書き出す JSON ファイル")
+
+    def handle(self, *args, **options):
+        changed_customers = self._renormalize(Customer, "phone_number", options)
+        self._renormalize(CustomerConsent, "customer_phone_snapshot", options)
+        self._report_duplicates(changed_customers, options)
+
+    def _renormalize(self, model, field, options):
+        """field を正規化し直し、{pk: (user_id, 新しい値, 元の値)}（有効な顧客のみ）を返す"""
+        batch_size = max(options["batch_size"], 1)
+        label = model.__name__
+        is_customer = model is Customer
+        columns = ["pk", field, "user_id", "is_active"] if is_customer else ["pk", field]
+        changed_customers = {}
+        updated = 0
+        last_pk = 0
+
+        while True:
+            rows = list(
+                model.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list(*columns)[:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            normalized = normalize_phone_numbers([row[1] or "" for row in rows])
+            changed = []
+            for row, value in zip(rows, normalized):
+                if (row[1] or "") == value:
+                    continue
+                changed.append(model(pk=row[0], **{field: value}))
+                if is_customer and row[3] and value:
+                    changed_customers[row[0]] = (row[2], value, row[1])
+
+            if changed and not options["dry_run"]:
+                model.objects.bulk_update(changed, [field], batch_size=batch_size)
+            updated += len(changed)
+            self.stdout.write(f"{label}: pk <= {last_pk}, {updated} 件更新")
+
+        verb = "更新対象" if options["dry_run"] else "更新"
+        self.stdout.write(self.style.SUCCESS(f"{label}.{field}: {updated} 件{verb}"))
+        return changed_customers
+
+    def _report_duplicates(self, changed_customers, options):
+        """正規化し直した顧客のうち、同じ彫師の有効な顧客と電話番号が重なるもの"""
+        if not changed_customers:
+            return
+
+        # (user_id, 電話番号) → {pk: 元の値}
+        by_key = defaultdict(dict)
+        for pk, (user_id, phone, old) in changed_customers.items():
+            by_key[(user_id, phone)][pk] = old
+
+        # 今 DB にある有効な顧客（--dry-run なら変わる前の値）を同じ電話番号で引く
+        batch_size = max(options["batch_size"], 1)
+        keys = list(by_key)
+        for i in range(0, len(keys), batch_size):
+            chunk = keys[i:i + batch_size]
+            holders = Customer.objects.filter(
+                is_active=True,
+                user_id__in={user_id for user_id, _ in chunk},
+                phone_number__in={phone for _, phone in chunk},
+            ).values_list("pk", "user_id", "phone_number")
+            for pk, user_id, phone in holders:
+                # 正規化し直した行は元の値で数える（--dry-run で別の番号に変わる行は除く）
+                if pk in changed_customers or (user_id, phone) not in by_key:
+                    continue
+                by_key[(user_id, phone)][pk] = phone
+
+        duplicates = []
+        for (user_id, phone), members in by_key.items():
+            # 元の値が全部同じなら、正規化し直す前から重複していた
+            if len(members) < 2 or len(set(members.values())) < 2:
+                continue
+            pks = list(members)
+            uuids = Customer.objects.filter(pk__in=pks).order_by("pk").values_list("uuid", flat=True)
+            duplicates.append({
+                "user_id": user_id,
+                "phone_number": phone,
+                "customer_uuids": [str(u) for u in uuids],
+            })
+
+        if not duplicates:
+            self.stdout.write("新しく重複する電話番号はありません")
+            return
+
+        self.stdout.write(self.style.WARNING(
+            f"正規化し直した結果、同じ彫師の顧客と電話番号が重なるもの {len(duplicates)} 組"
+        ))
+        for dup in duplicates[:options["max_report"]]:
+            self.stdout.write(
+                f"  user_id={dup['user_id']} phone={dup['phone_number']} "
+                f"customers={', '.join(dup['customer_uuids'])}"
+            )
+        if len(duplicates) > options["max_report"]:
+            self.stdout.write(f"  ...ほか {len(duplicates) - options['max_report']} 組")
+
+        if options["report"]:
+            with open(options["report"], "w", encoding="utf-8") as f:
+                json.dump(duplicates, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,57 @@
+# eform_api/management/commands/run_customer_imports.py
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from eform_api.customer_import import DEFAULT_CHUNK_SIZE, claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    """
+    顧客 CSV 取り込みジョブ（CustomerImportJob）を処理するワーカー。
+
+    - pending のジョブを古い順に 1 件ずつ確保して取り込む（PostgreSQL では SKIP LOCKED）
+    - 別のワーカーが止まって running のまま CUSTOMER_IMPORT_LOCK_SECONDS 秒経ったジョブも取り直す
+    - 進捗（行数・作成/更新/エラー件数）はチャンクごとにジョブへ書き戻す
+    - ファイルは API と同じストレージ（MEDIA_ROOT）から読むので、同じファイルシステムで動かす
+
+    例:
+      python manage.py run_customer_imports            # 溜まっている分を処理して終了（cron 向け）
+      python manage.py run_customer_imports --loop     # 常駐（systemd 等で起動）
+    """
+    help = "顧客 CSV 取り込みジョブを処理します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument("--loop", action="store_true", help="キューを監視し続ける")
+        parser.add_argument("--interval", type=float, default=5.0,
+                            help="--loop 時、キューが空のときの待機秒数")
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        processed = 0
+        while not self._stopping:
+            job = claim_next_job()
+            if job is None:
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+                continue
+
+            run_job(job, chunk_size=options["chunk_size"])
+            processed += 1
+            self.stdout.write(
+                f"{job.uuid} ({job.original_name}): {job.status} "
+                f"rows={job.rows} created={job.created_count} updated={job.updated_count} "
+                f"errors={job.error_count}"
+                + (f" / {job.last_error}" if job.last_error else "")
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"ジョブを {processed} 件処理しました"))
+
+    def _stop(self, signum, frame):
+        self._stopping = True
@@ -0,0 +1,57 @@
+# eform_api/management/commands/send_queued_emails.py
+import signal
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from eform_api.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    """
+    EmailOutbox に積まれたメールを送信するワーカー。
+
+    - 1 本のメール接続（SMTP ならセッション）を開いたまま、バッチ単位で送り続ける
+    - 失敗した行は指数バックオフで再送（settings.EMAIL_OUTBOX_*）
+
+    例:
+      python manage.py send_queued_emails            # 溜まっている分を送って終了（cron 向け）
+      python manage.py send_queued_emails --loop     # 常駐（systemd 等で起動）
+    """
+    help = "送信キュー（EmailOutbox）のメールを送信します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--loop", action="store_true", help="キューを監視し続ける")
+        parser.add_argument("--interval", type=float, default=2.0,
+                            help="--loop 時、キューが空のときの待機秒数")
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        connection = get_connection()
+        connection.open()
+        total_sent = total_failed = 0
+        try:
+            while not self._stopping:
+                sent, failed = deliver_batch(connection, batch_size=options["batch_size"])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f"送信 {sent} 件 / 失敗 {failed} 件")
+
+                if sent + failed < options["batch_size"]:
+                    # キューが空（または残りはバックオフ待ち）
+                    if not options["loop"]:
+                        break
+                    time.sleep(options["interval"])
+        finally:
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS(f"合計: 送信 {total_sent} 件 / 失敗 {total_failed} 件"))
+
+    def _stop(self, signum, frame):
+        self._stopping = True
@@ -0,0 +1,134 @@
+# eform_api/metrics.py
+"""
+Prometheus 形式のメトリクス
+
+- gunicorn の複数ワーカーでは環境変数 PROMETHEUS_MULTIPROC_DIR に
+  ワーカーごとのファイル（mmap）が書かれ、/metrics で全ワーカー分を合算して返す
+  （ディレクトリの初期化と後始末は gunicorn.conf.py）
+- 未設定（runserver 等）のときはプロセス内のレジストリだけを使う
+- 記録側の関数（observe_request / record_*）はリクエストごとに呼ばれるので軽く保つ
+  （benchmarks/metrics_overhead.py で計測）
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+
+# レイテンシのバケット（秒）: public API は数十 ms、PDF などは秒単位
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    "eform_api_http_request_duration_seconds",
+    "URL 名ごとのリクエスト処理時間",
+    ["url_name", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "eform_api_http_requests",
+    "URL 名・ステータス区分ごとのリクエスト数（エラー率の算出用）",
+    ["url_name", "method", "status_class"],
+)
+CONSENTS_CREATED = Counter(
+    "eform_api_consents_created",
+    "作成された同意書（CustomerConsent）の数",
+)
+PDFS_RENDERED = Counter(
+    "eform_api_pdfs_rendered",
+    "生成した同意書 PDF の数",
+)
+PDF_RENDER_SECONDS = Histogram(
+    "eform_api_pdf_render_duration_seconds",
+    "同意書 PDF 1 件の生成時間",
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "eform_api_cache_lookups",
+    "キャッシュ参照数（result=hit/miss でヒット率を算出）",
+    ["cache", "result"],
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "eform_api_db_pool_connections",
+    "DB 接続プールの接続数（state=in_use/idle, 全ワーカーの合計）",
+    ["alias", "state"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "eform_api_db_pool_wait_seconds",
+    "DB 接続プールから接続を借りるまでの待ち時間",
+    ["alias"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "eform_api_db_pool_timeouts",
+    "DB 接続プールの空き待ちがタイムアウトした回数",
+    ["alias"],
+)
+
+_STATUS_CLASSES = {1: "1xx", 2: "2xx", 3: "3xx", 4: "4xx", 5: "5xx"}
+
+# labels() は毎回ロックと検索が入るので、ラベル値ごとの子メトリクスを覚えておく
+# （URL 名・メソッド・ステータス区分の組み合わせは有限）
+_latency_children = {}
+_request_children = {}
+
+
+def observe_request(url_name, method, status_code, seconds):
+    url_name = url_name or "unresolved"
+    key = (url_name, method)
+    latency = _latency_children.get(key)
+    if latency is None:
+        latency = _latency_children[key] = REQUEST_LATENCY.labels(url_name, method)
+    latency.observe(seconds)
+
+    key = (url_name, method, status_code // 100)
+    counter = _request_children.get(key)
+    if counter is None:
+        status_class = _STATUS_CLASSES.get(status_code // 100, "other")
+        counter = _request_children[key] = REQUESTS.labels(url_name, method, status_class)
+    counter.inc()
+
+
+def record_consent_created():
+    CONSENTS_CREATED.inc()
+
+
+def record_pdf_rendered(seconds):
+    PDFS_RENDERED.inc()
+    PDF_RENDER_SECONDS.observe(seconds)
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_db_pool_wait(alias, seconds):
+    DB_POOL_WAIT_SECONDS.labels(alias).observe(seconds)
+
+
+def record_db_pool_timeout(alias):
+    DB_POOL_TIMEOUTS.labels(alias).inc()
+
+
+def record_db_pool_state(alias, in_use, idle):
+    DB_POOL_CONNECTIONS.labels(alias, "in_use").set(in_use)
+    DB_POOL_CONNECTIONS.labels(alias, "idle").set(idle)
+
+
+def render_latest():
+    """(本文 bytes, Content-Type) を返す。マルチプロセス時は全ワーカー分を合算"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
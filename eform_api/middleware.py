@@ -0,0 +1,145 @@
+# eform_api/middleware.py
+"""
+リクエスト計測・DB 振り分けのミドルウェア
+
+RequestTimingMiddleware
+- 1 リクエストごとに DB クエリ数 / DB 時間 / シリアライザ時間 / レンダリング時間 /
+  外部呼び出し（S3・メール・PDF）時間を集計する（eform_api.instrumentation）
+- Server-Timing ヘッダで返す（settings.PERF_SERVER_TIMING）
+- settings.PERF_LOG_SAMPLE_RATE の割合で、URL 名つきの構造化ログ（JSON 1 行）を
+  "eform_api.perf" ロガーに出す
+- URL 名ごとのレイテンシ・ステータス区分を Prometheus メトリクスに記録する（eform_api.metrics）
+- 同期・非同期どちらのリクエストにも対応
+
+ReplicaRoutingMiddleware
+- GET などの読み取りリクエストの DB 読み取りを読み取りレプリカに振り分ける（eform_api.db.routers）
+- 書き込みのあったリクエストの応答に pin クッキーを付け、しばらく default から読ませる
+- レプリカが設定されていなければ読み込まれない（MiddlewareNotUsed）
+"""
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+
+from .db import routers
+
+from .instrumentation import current_metrics, end_request, start_request
+from .metrics import observe_request
+
+perf_logger = logging.getLogger("eform_api.perf")
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = settings.PERF_SERVER_TIMING
+        self.sample_rate = settings.PERF_LOG_SAMPLE_RATE
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = start_request()
+        try:
+            response = self.get_response(request)
+            self._finish(request, response, metrics)
+        finally:
+            end_request(token)
+        return response
+
+    async def __acall__(self, request):
+        metrics, token = start_request()
+        try:
+            response = await self.get_response(request)
+            self._finish(request, response, metrics)
+        finally:
+            end_request(token)
+        return response
+
+    def process_template_response(self, request, response):
+        """DRF の Response など、これからレンダリングされるレスポンスの時間を測る"""
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics._render_started = time.perf_counter()
+
+            def _rendered(rendered_response):
+                metrics.render_seconds += time.perf_counter() - metrics._render_started
+                return rendered_response
+
+            response.add_post_render_callback(_rendered)
+        return response
+
+    def _finish(self, request, response, metrics):
+        match = getattr(request, "resolver_match", None)
+        observe_request(
+            match.url_name if match else None,
+            request.method,
+            response.status_code,
+            metrics.elapsed(),
+        )
+
+        if self.server_timing:
+            response["Server-Timing"] = metrics.server_timing()
+
+        if self.sample_rate and random.random() < self.sample_rate:
+            perf_logger.info(json.dumps({
+                "event": "request",
+                "url_name": match.url_name if match else None,
+                "view": match.view_name if match else None,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                **metrics.as_dict(),
+            }, ensure_ascii=False))
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if routers.replica_alias() is None:
+            raise MiddlewareNotUsed
+        # gunicorn は manage.py check を通らないので、ここでも止める
+        problem = routers.pin_cache_problem()
+        if problem:
+            raise ImproperlyConfigured(problem)
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = routers.begin_request(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end_request(token)
+        if state.wrote:
+            routers.pin_response(response, request)
+        return response
+
+    async def __acall__(self, request):
+        state, token = routers.begin_request(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end_request(token)
+        if state.wrote:
+            routers.pin_response(response, request)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = routers.current_state()
+        if state is not None:
+            routers.apply_view_override(state, view_func)
+        return None
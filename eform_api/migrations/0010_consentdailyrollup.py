@@ -0,0 +1,35 @@
+# Generated by Django 4.2.25 on 2026-10-19 14:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('eform_api', '0009_customer_merged_into_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsentDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('consent_count', models.PositiveIntegerField(default=0)),
+                ('new_consent_count', models.PositiveIntegerField(default=0)),
+                ('returning_consent_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consent_daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='consentdailyrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='uniq_consent_rollup_user_date'),
+        ),
+    ]
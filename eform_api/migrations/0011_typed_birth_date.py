@@ -0,0 +1,27 @@
+# Generated by Django 4.2.25 on 2026-10-19 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eform_api', '0010_consentdailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='birth_date_value',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customerconsent',
+            name='customer_birth_date_value_snapshot',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['user', 'birth_date_value'], name='customer_user_birth_idx'),
+        ),
+    ]
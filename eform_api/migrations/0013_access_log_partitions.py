@@ -0,0 +1,173 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:13
+
+from datetime import datetime, time
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+# この migration 以降、PostgreSQL の eform_api_consentaccesslog は Django の管理外（手で管理する表）。
+# モデルの状態（id の PK、uuid の UNIQUE）は SQLite の表のままで、PostgreSQL の実際の表
+# （PK (id, created_at)、UNIQUE (uuid, created_at)、月ごとのパーティション）とは一致しない。
+# 以後このモデルの変更は自動生成の migration を使わず、SeparateDatabaseAndState + RunSQL で書く。
+# 詳しくは ConsentAccessLog.Meta のコメントを参照。
+
+TABLE = "eform_api_consentaccesslog"
+SEQUENCE = f"{TABLE}_part_id_seq"
+NAMED_INDEXES = {
+    "access_log_token_created_idx": ("token_id", "created_at"),
+    "access_log_ip_created_idx": ("ip_address", "created_at"),
+}
+MONTHS_AHEAD = 3
+
+
+def _add_month(month):
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+
+def _month_start_at(month):
+    return datetime.combine(month, time.min, tzinfo=ZoneInfo(settings.TIME_ZONE)).isoformat()
+
+
+def partition_access_log(apps, schema_editor):
+    """
+    PostgreSQL ではアクセスログ表を created_at の月ごとのレンジパーティションに作り替える。
+    - パーティションキーを含める必要があるので PK は (id, created_at)、uuid の一意性は (uuid, created_at)
+    - パーティション表に IDENTITY 列は使えない（PG 17 未満）ので id は専用シーケンス
+    - 既存データの最古の月から 3 か月先まで + DEFAULT パーティション
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    ConsentAccessLog = apps.get_model("eform_api", "ConsentAccessLog")
+    connection = schema_editor.connection
+    quote = schema_editor.quote_name
+    old = f"{TABLE}_unpartitioned"
+
+    columns = []
+    for field in ConsentAccessLog._meta.local_concrete_fields:
+        db_type = field.db_type(connection)
+        default = f" DEFAULT nextval('{SEQUENCE}')" if field.primary_key else ""
+        columns.append(f"{quote(field.column)} {db_type} NOT NULL{default}")
+    column_names = ", ".join(quote(f.column) for f in ConsentAccessLog._meta.local_concrete_fields)
+
+    schema_editor.execute(f"ALTER TABLE {quote(TABLE)} RENAME TO {quote(old)}")
+    for name in NAMED_INDEXES:
+        schema_editor.execute(f"DROP INDEX {quote(name)}")
+    schema_editor.execute(f"CREATE SEQUENCE {quote(SEQUENCE)}")
+    schema_editor.execute(
+        f"CREATE TABLE {quote(TABLE)} ("
+        + ", ".join(columns)
+        + f", CONSTRAINT {quote(TABLE + '_part_pkey')} PRIMARY KEY (id, created_at)"
+        + f", CONSTRAINT {quote(TABLE + '_uuid_created_uniq')} UNIQUE (uuid, created_at)"
+        + f", CONSTRAINT {quote(TABLE + '_token_fk')} FOREIGN KEY (token_id)"
+        + " REFERENCES eform_api_consententrytoken (id) DEFERRABLE INITIALLY DEFERRED"
+        + ") PARTITION BY RANGE (created_at)"
+    )
+    schema_editor.execute(f"ALTER SEQUENCE {quote(SEQUENCE)} OWNED BY {quote(TABLE)}.id")
+    for name, fields in NAMED_INDEXES.items():
+        schema_editor.execute(f"CREATE INDEX {quote(name)} ON {quote(TABLE)} ({', '.join(fields)})")
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT min(created_at) FROM {quote(old)}")
+        oldest = cursor.fetchone()[0]
+    today = timezone.localdate()
+    month = timezone.localtime(oldest).date().replace(day=1) if oldest else today.replace(day=1)
+    last = today.replace(day=1)
+    for _ in range(MONTHS_AHEAD):
+        last = _add_month(last)
+    while month <= last:
+        following = _add_month(month)
+        schema_editor.execute(
+            f"CREATE TABLE {quote(f'{TABLE}_p{month:%Y%m}')} PARTITION OF {quote(TABLE)} "
+            f"FOR VALUES FROM ('{_month_start_at(month)}') TO ('{_month_start_at(following)}')"
+        )
+        month = following
+    schema_editor.execute(f"CREATE TABLE {quote(TABLE + '_default')} PARTITION OF {quote(TABLE)} DEFAULT")
+
+    schema_editor.execute(f"INSERT INTO {quote(TABLE)} ({column_names}) SELECT {column_names} FROM {quote(old)}")
+    schema_editor.execute(
+        f"SELECT setval('{SEQUENCE}', COALESCE(max(id), 1), max(id) IS NOT NULL) FROM {quote(TABLE)}"
+    )
+    schema_editor.execute(f"DROP TABLE {quote(old)}")
+
+
+def unpartition_access_log(apps, schema_editor):
+    """パーティション表を通常の表に戻す（データは全パーティションから移す）"""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    ConsentAccessLog = apps.get_model("eform_api", "ConsentAccessLog")
+    quote = schema_editor.quote_name
+    partitioned = f"{TABLE}_partitioned"
+    column_names = ", ".join(quote(f.column) for f in ConsentAccessLog._meta.local_concrete_fields)
+
+    schema_editor.execute(f"ALTER TABLE {quote(TABLE)} RENAME TO {quote(partitioned)}")
+    for name in NAMED_INDEXES:
+        schema_editor.execute(f"DROP INDEX {quote(name)}")
+    # create_model の索引・FK は deferred_sql に積まれ、この後の RemoveIndex より後に流れてしまうので今流す
+    deferred = len(schema_editor.deferred_sql)
+    schema_editor.create_model(ConsentAccessLog)
+    for sql in schema_editor.deferred_sql[deferred:]:
+        schema_editor.execute(sql)
+    del schema_editor.deferred_sql[deferred:]
+    schema_editor.execute(
+        f"INSERT INTO {quote(TABLE)} ({column_names}) SELECT {column_names} FROM {quote(partitioned)}"
+    )
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), COALESCE(max(id), 1), max(id) IS NOT NULL) "
+        f"FROM {quote(TABLE)}"
+    )
+    schema_editor.execute(f"DROP TABLE {quote(partitioned)} CASCADE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eform_api', '0012_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsentAccessDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.GenericIPAddressField()),
+                ('date', models.DateField()),
+                ('access_count', models.PositiveIntegerField(default=0)),
+                ('first_at', models.DateTimeField()),
+                ('last_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='consentaccesslog',
+            index=models.Index(fields=['token', 'created_at'], name='access_log_token_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consentaccesslog',
+            index=models.Index(fields=['ip_address', 'created_at'], name='access_log_ip_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='consentaccessdailyrollup',
+            name='token',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_daily_rollups', to='eform_api.consententrytoken'),
+        ),
+        migrations.AddIndex(
+            model_name='consentaccessdailyrollup',
+            index=models.Index(fields=['ip_address', 'date'], name='access_rollup_ip_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consentaccessdailyrollup',
+            index=models.Index(fields=['date'], name='access_rollup_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='consentaccessdailyrollup',
+            constraint=models.UniqueConstraint(fields=('token', 'ip_address', 'date'), name='uniq_access_rollup_token_ip_date'),
+        ),
+        migrations.RunPython(partition_access_log, unpartition_access_log),
+    ]
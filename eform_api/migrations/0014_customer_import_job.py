@@ -0,0 +1,53 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('eform_api', '0013_access_log_partitions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True)),
+                ('file', models.FileField(blank=True, upload_to='customer_imports/%Y/%m/')),
+                ('original_name', models.CharField(blank=True, max_length=255)),
+                ('encoding', models.CharField(default='utf-8-sig', max_length=20)),
+                ('status', models.CharField(choices=[('pending', '待機中'), ('running', '取り込み中'), ('done', '完了'), ('failed', '失敗')], default='pending', max_length=10)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('updated_count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['user', 'phone_number'], name='customer_user_phone_idx'),
+        ),
+        migrations.AddField(
+            model_name='customerimportjob',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='customer_import_jobs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='customerimportjob',
+            index=models.Index(fields=['status', 'created_at'], name='customer_import_due_idx'),
+        ),
+    ]
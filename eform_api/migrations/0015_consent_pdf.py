@@ -0,0 +1,35 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eform_api', '0014_customer_import_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsentPdf',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', '生成待ち'), ('rendering', '生成中'), ('done', '生成済み'), ('failed', '生成失敗')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('object_key', models.CharField(blank=True, max_length=255)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('rendered_at', models.DateTimeField(blank=True, null=True)),
+                ('consent', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pdf', to='eform_api.customerconsent')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='consent_pdf_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eform_api', '0015_consent_pdf'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsentDocumentBody',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('body', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ConsentDocumentVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('consent', '同意書'), ('privacy', 'プライバシーポリシー')], default='consent', max_length=10)),
+                ('version', models.CharField(max_length=50)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('body', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='versions', to='eform_api.consentdocumentbody')),
+            ],
+            options={
+                'ordering': ['kind', '-created_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='consentdocumentversion',
+            constraint=models.UniqueConstraint(fields=('kind', 'version'), name='consent_document_version_uniq'),
+        ),
+    ]
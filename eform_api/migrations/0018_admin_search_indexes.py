@@ -0,0 +1,49 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eform_api', '0017_idempotency_record'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['full_name'], name='customer_full_name_like_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['phone_number'], name='customer_phone_like_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['last_name'], name='customer_last_name_like_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['first_name'], name='customer_first_name_like_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['instagram_id'], name='customer_instagram_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerconsent',
+            index=models.Index(fields=['-signed_at', '-id'], name='consent_signed_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tattooartist',
+            index=models.Index(fields=['email'], name='artist_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tattooartist',
+            index=models.Index(fields=['artist_name'], name='artist_name_like_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='tattooartist',
+            index=models.Index(fields=['studio_name'], name='artist_studio_like_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
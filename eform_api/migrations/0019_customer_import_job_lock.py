@@ -0,0 +1,23 @@
+# Generated by Django 4.2.25 on 2026-10-19 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eform_api', '0018_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerimportjob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customerimportjob',
+            name='locked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,9 +1,12 @@
 # eform_api/models.py
 from datetime import datetime
 from django.db import models, transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 import uuid
-from .utils import normalize_phone_number
+from .metrics import record_consent_created
+from .utils import normalize_phone_number, parse_birth_date
 
 User = get_user_model()
 
@@ -76,6 +79,14 @@ class TattooArtist(models.Model):
     objects = models.Manager()
     active = ActiveManager()
 
+    class Meta:
+        indexes = [
+            # 管理画面の検索（メールは完全一致・彫師名/スタジオ名は前方一致）用
+            models.Index(fields=["email"], name="artist_email_idx"),
+            models.Index(fields=["artist_name"], name="artist_name_like_idx", opclasses=["varchar_pattern_ops"]),
+            models.Index(fields=["studio_name"], name="artist_studio_like_idx", opclasses=["varchar_pattern_ops"]),
+        ]
+
     def __str__(self):
         return self.artist_name
 
@@ -103,6 +114,8 @@ class Customer(models.Model):
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES, blank=True)
 
     birth_date = models.CharField(max_length=10, blank=True, null=True)
+    # birth_date（文字列）から save 時に導出する型付きの日付。集計・年齢計算用
+    birth_date_value = models.DateField(blank=True, null=True, editable=False)
 
     prefecture = models.CharField(max_length=100, blank=True)
     city = models.CharField(max_length=100, blank=True)
@@ -140,9 +153,27 @@ class Customer(models.Model):
     objects = models.Manager()
     active = ActiveManager()
 
+    class Meta:
+        indexes = [
+            # 彫師ごとの年齢統計（birth_date_value の中央値）用
+            models.Index(fields=["user", "birth_date_value"], name="customer_user_birth_idx"),
+            # 電話番号での照合（検索・CSV 取り込み）用
+            models.Index(fields=["user", "phone_number"], name="customer_user_phone_idx"),
+            # 管理画面の検索（彫師をまたいだ前方一致）用。opclasses は PostgreSQL のみ（LIKE 'xxx%' に使える）
+            models.Index(fields=["full_name"], name="customer_full_name_like_idx", opclasses=["varchar_pattern_ops"]),
+            models.Index(fields=["phone_number"], name="customer_phone_like_idx", opclasses=["varchar_pattern_ops"]),
+            models.Index(fields=["last_name"], name="customer_last_name_like_idx", opclasses=["varchar_pattern_ops"]),
+            models.Index(fields=["first_name"], name="customer_first_name_like_idx", opclasses=["varchar_pattern_ops"]),
+            models.Index(fields=["instagram_id"], name="customer_instagram_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if getattr(self, "phone_number", None):
             self.phone_number = normalize_phone_number(self.phone_number)
+        self.birth_date_value = parse_birth_date(self.birth_date)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "birth_date" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "birth_date_value"}
         super().save(*args, **kwargs)
 
 # =========================
@@ -171,6 +202,11 @@ class CustomerConsent(models.Model):
         blank=True,
         editable=False,
     )
+    customer_birth_date_value_snapshot = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+    )
     customer_phone_snapshot = models.CharField(
         max_length=50,
         null=True,
@@ -191,6 +227,10 @@ class CustomerConsent(models.Model):
 
     class Meta:
         ordering = ['-signed_at']
+        indexes = [
+            # 管理画面の一覧（新しい順）を並べ替え無しで先頭から読む用
+            models.Index(fields=["-signed_at", "-id"], name="consent_signed_at_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         # 新規作成時だけスナップショットを埋める
@@ -204,9 +244,74 @@ class CustomerConsent(models.Model):
                 ).strip()
             if not self.customer_birth_date_snapshot:
                 self.customer_birth_date_snapshot = self.customer.birth_date or ""
+            if self.customer_birth_date_value_snapshot is None:
+                self.customer_birth_date_value_snapshot = parse_birth_date(
+                    self.customer_birth_date_snapshot
+                )
             if not self.customer_phone_snapshot:
                 self.customer_phone_snapshot = self.customer.phone_number or ""
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        if adding:
+            record_consent_created()
+
+        # 日次ロールアップを差分更新（旧バケットと新バケットの両方）。
+        # QuerySet.update / delete などの一括操作はここを通らない（rollups.refreshing_customer_rollups）
+        from .rollups import sync_consent_rollups
+        sync_consent_rollups(self, previous=getattr(self, "_rollup_state", None))
+        self._rollup_state = self._current_rollup_state()
+
+    def delete(self, *args, **kwargs):
+        previous = getattr(self, "_rollup_state", None) or self._current_rollup_state()
+        result = super().delete(*args, **kwargs)
+
+        from .rollups import sync_consent_rollups
+        sync_consent_rollups(self, previous=previous, deleted=True)
+        return result
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # ロード時点の状態を覚えておき、save 時にどのバケットが変わったか判定する
+        if "is_active" in instance.__dict__ and "signed_at" in instance.__dict__:
+            instance._rollup_state = instance._current_rollup_state()
+        return instance
+
+    def _current_rollup_state(self):
+        """ロールアップ集計に影響する値 (is_active, signed_at) のスナップショット"""
+        return (self.is_active, self.signed_at)
+
+# =========================
+# ConsentDailyRollup（同意書の日次集計）
+# =========================
+
+class ConsentDailyRollup(models.Model):
+    """彫師(user)ごと・日ごとの同意書件数ロールアップ
+    - date は TIME_ZONE（Asia/Tokyo）での signed_at の日付
+    - new_consent_count: その顧客にとって最初の有効な同意書
+    - returning_consent_count: 2 回目以降の同意書（リピーター）
+    - CustomerConsent の保存・無効化時に差分更新される
+    - 全件の再計算は manage.py backfill_consent_rollups
+    # #consent #stats #rollup
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="consent_daily_rollups")
+    date = models.DateField()
+
+    consent_count = models.PositiveIntegerField(default=0)
+    new_consent_count = models.PositiveIntegerField(default=0)
+    returning_consent_count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["date"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "date"], name="uniq_consent_rollup_user_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.date}: {self.consent_count}"
+
 
 # =========================
 # 監査ログ：CustomerMergeLog / CustomerDeleteLog
@@ -322,6 +427,10 @@ class ConsentEntryToken(models.Model):
 class ConsentAccessLog(models.Model):
     """公開同意フォームへのアクセスログ
     - 日次制限や不正利用検知に使う
+    - PostgreSQL では created_at の月ごとのレンジパーティション（migration 0013）。
+      PK は (id, created_at)、uuid の一意制約も (uuid, created_at) になる
+    - 古い月は manage.py prune_access_logs がパーティション単位で削除・アーカイブする
+    - 書き込みは access_logs.record_access() から（日次ロールアップも同時に更新）
     # #consent #access-log
     """
     uuid = models.UUIDField(
@@ -346,7 +455,288 @@ class ConsentAccessLog(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        # PostgreSQL の表は migration 0013 の RunPython で手で作り替えたもので、ここの定義とは一致しない:
+        #   - PK: ここは id だけ / 実際は (id, created_at)。id は専用シーケンス（IDENTITY ではない）
+        #   - uuid: ここは unique=True / 実際は UNIQUE (uuid, created_at)（パーティションをまたぐ一意性は保証されない）
+        #   - FK・制約の名前も Django の命名とは違う
+        # Django 4.2 では複合 PK を表せないので、モデルの状態は SQLite（開発）の表に合わせてある。
+        # このモデルの列・索引・制約を変えるときは makemigrations の結果をそのまま使わず、
+        # PostgreSQL では SeparateDatabaseAndState + RunSQL でパーティション表（親）に対して手で書くこと。
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["token", "created_at"], name="access_log_token_created_idx"),
+            models.Index(fields=["ip_address", "created_at"], name="access_log_ip_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.token_id} @ {self.ip_address} ({self.created_at})"
+
+
+class ConsentAccessDailyRollup(models.Model):
+    """トークン × IP × 日ごとのアクセス件数ロールアップ
+    - date は TIME_ZONE（Asia/Tokyo）での created_at の日付
+    - ConsentAccessLog の記録時に差分更新される（access_logs.record_access）
+    - 生ログのパーティションを削除する前に prune_access_logs が作り直すので、
+      生ログの保持期間を過ぎても件数はここに残る
+    # #consent #access-log #rollup
+    """
+    token = models.ForeignKey(
+        "ConsentEntryToken",
+        on_delete=models.CASCADE,
+        related_name="access_daily_rollups",
+    )
+    ip_address = models.GenericIPAddressField()
+    date = models.DateField()
+
+    access_count = models.PositiveIntegerField(default=0)
+    first_at = models.DateTimeField()
+    last_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["token", "ip_address", "date"], name="uniq_access_rollup_token_ip_date",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["ip_address", "date"], name="access_rollup_ip_date_idx"),
+            models.Index(fields=["date"], name="access_rollup_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.token_id} @ {self.ip_address} {self.date}: {self.access_count}"
+
+
+# =========================
+# EmailOutbox（メール送信キュー）
+# =========================
+
+class EmailOutbox(models.Model):
+    """送信待ちメール（Outbox）
+    - リクエスト処理中は行を INSERT するだけ（元の変更と同じトランザクション）
+    - 実際の送信は manage.py send_queued_emails が 1 本の SMTP 接続でまとめて行う
+    - 失敗時は next_attempt_at を指数バックオフで後ろにずらして再送、上限を超えたら failed
+    - sent / failed の行は EMAIL_OUTBOX_RETENTION_DAYS 日後に prune_email_outbox が消す
+      （本文にパスワード再設定リンク等が残るため）
+    # #email #outbox
+    """
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "送信待ち"),
+        (STATUS_SENDING, "送信中"),
+        (STATUS_SENT, "送信済み"),
+        (STATUS_FAILED, "送信失敗"),
+    ]
+
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True, db_index=True)
+
+    subject = models.CharField(max_length=255)
+    body_text = models.TextField()
+    body_html = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255, blank=True)
+    to = models.JSONField(default=list)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            # ワーカーが「送信期限の来た pending」を拾うためのインデックス
+            models.Index(fields=["status", "next_attempt_at"], name="email_outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
+# =========================
+# CustomerImportJob（顧客 CSV 取り込みジョブ）
+# =========================
+
+class CustomerImportJob(models.Model):
+    """顧客 CSV の取り込みジョブ
+    - 大きいファイルは API でファイルを保存して pending の行を作るだけ
+    - 実際の取り込みは manage.py run_customer_imports がチャンクごとに行い、進捗を書き戻す
+    - 行ごとのエラーは errors に先頭 1000 件まで残す（件数は error_count）
+    - 進捗（rows など）と locked_at はチャンクと同じトランザクションで更新する。ワーカー停止で running のまま
+      CUSTOMER_IMPORT_LOCK_SECONDS 秒止まったジョブは、別のワーカーが rows 行を読み飛ばして続きから取り込む
+      （電話番号の無い行も含め、コミット済みの行を二重に作らない）
+    # #customer #import
+    """
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "待機中"),
+        (STATUS_RUNNING, "取り込み中"),
+        (STATUS_DONE, "完了"),
+        (STATUS_FAILED, "失敗"),
+    ]
+
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True, db_index=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="customer_import_jobs")
+
+    file = models.FileField(upload_to="customer_imports/%Y/%m/", blank=True)
+    original_name = models.CharField(max_length=255, blank=True)
+    encoding = models.CharField(max_length=20, default="utf-8-sig")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    last_error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # ワーカーが pending を古い順に拾うためのインデックス
+            models.Index(fields=["status", "created_at"], name="customer_import_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.original_name or self.uuid} ({self.status})"
+
+
+# =========================
+# ConsentPdf（同意書 PDF の事前生成）
+# =========================
+
+class ConsentPdf(models.Model):
+    """同意書 PDF の事前生成キュー兼、保存先（S3）の記録
+    - 署名時に pending の行を INSERT するだけ（PDF は作らない）
+    - manage.py render_consent_pdfs が PDF を作って S3 に置き、object_key を書き戻す
+    - 失敗時は next_attempt_at を指数バックオフで後ろにずらして再試行、上限を超えたら failed
+    - 行（同意書）を消すと S3 の PDF も消す（consent_pdfs.delete_stored_pdf）
+    # #consent #pdf
+    """
+    STATUS_PENDING = "pending"
+    STATUS_RENDERING = "rendering"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "生成待ち"),
+        (STATUS_RENDERING, "生成中"),
+        (STATUS_DONE, "生成済み"),
+        (STATUS_FAILED, "生成失敗"),
+    ]
+
+    consent = models.OneToOneField(CustomerConsent, on_delete=models.CASCADE, related_name="pdf")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+
+    object_key = models.CharField(max_length=255, blank=True)
+    size = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    rendered_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            # ワーカーが「期限の来た pending」を拾うためのインデックス
+            models.Index(fields=["status", "next_attempt_at"], name="consent_pdf_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.consent_id} ({self.status})"
+
+
+# =========================
+# ConsentDocument（同意書・プライバシーポリシーの本文と版）
+# =========================
+
+class ConsentDocumentBody(models.Model):
+    """同意書の本文（Django テンプレートの HTML）。同じ本文は sha256 で 1 行にまとめる
+    - 書き換えない（本文を変えるときは新しい版として登録する）
+    # #consent #document
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    body = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256[:12]
+
+
+class ConsentDocumentVersion(models.Model):
+    """同意書の版（CustomerConsent.consent_version / privacy_agreement_version）→ 本文
+    - 登録は manage.py register_consent_document（eform_api.consent_documents.register_document）
+    - 版は登録後に変えない。別の本文で同じ版を登録しようとするとエラー
+    # #consent #document
+    """
+    KIND_CONSENT = "consent"
+    KIND_PRIVACY = "privacy"
+    KIND_CHOICES = [
+        (KIND_CONSENT, "同意書"),
+        (KIND_PRIVACY, "プライバシーポリシー"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=KIND_CONSENT)
+    version = models.CharField(max_length=50)
+    title = models.CharField(max_length=255, blank=True)
+    body = models.ForeignKey(ConsentDocumentBody, on_delete=models.PROTECT, related_name="versions")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["kind", "-created_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "version"], name="consent_document_version_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.version}"
+
+
+# =========================
+# IdempotencyRecord（public API の二重送信対策）
+# =========================
+
+class IdempotencyRecord(models.Model):
+    """Idempotency-Key（または submission_uuid）ごとの最初の応答
+    - 最初のリクエストで status_code=NULL の行を作って「処理中」にし、応答を書き戻す
+    - 同じキーの再送には保存した応答をそのまま返す（顧客・同意の表には触らない）
+    - expires_at を過ぎた行は無いものとして扱い、prune_idempotency_keys で消す
+    # #consent #public #idempotency
+    """
+    scope = models.CharField(max_length=20)
+    key = models.CharField(max_length=100)
+    # 同じキーで別の内容を送ってきたら弾くための、リクエスト内容の sha256
+    request_hash = models.CharField(max_length=64)
+
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    response_body = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["scope", "key"], name="idempotency_scope_key_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key} ({self.status_code or 'processing'})"
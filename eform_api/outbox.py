@@ -0,0 +1,119 @@
+# eform_api/outbox.py
+"""
+メール送信キュー（EmailOutbox）
+
+- queue_email: リクエスト処理中に呼ぶ。行を INSERT するだけで SMTP には触らない
+  （呼び出し側のトランザクション内で作られるので、ロールバックされればメールも出ない）
+- deliver_batch: send_queued_emails コマンドから呼ぶ。期限の来た行を確保して、
+  渡された 1 本のメール接続で順に送り、結果を書き戻す
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.utils import timezone
+
+from .instrumentation import timed
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def queue_email(subject, text_content, to, html_content="", from_email=None):
+    """メールを送信キューに積む（送信は send_queued_emails ワーカーが行う）"""
+    return EmailOutbox.objects.create(
+        subject=subject,
+        body_text=text_content,
+        body_html=html_content or "",
+        from_email=from_email or "",
+        to=list(to),
+    )
+
+
+def backoff_delay(attempts):
+    """attempts 回失敗した後の再送までの待ち時間（指数バックオフ, 上限あり）"""
+    base = settings.EMAIL_OUTBOX_BACKOFF_SECONDS
+    return timedelta(seconds=min(base * (2 ** max(attempts - 1, 0)), settings.EMAIL_OUTBOX_BACKOFF_MAX_SECONDS))
+
+
+def claim_batch(batch_size):
+    """
+    送信期限の来た pending（と、ワーカー停止で取り残された sending）を確保して返す。
+    PostgreSQL では SKIP LOCKED で複数ワーカーが同じ行を取り合わない。
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.EMAIL_OUTBOX_LOCK_SECONDS)
+
+    with transaction.atomic():
+        rows = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status__in=[EmailOutbox.STATUS_PENDING, EmailOutbox.STATUS_SENDING])
+            .filter(next_attempt_at__lte=now)
+            .exclude(status=EmailOutbox.STATUS_SENDING, locked_at__gt=stale_before)
+            .order_by("next_attempt_at", "pk")[:batch_size]
+        )
+        if rows:
+            EmailOutbox.objects.filter(pk__in=[r.pk for r in rows]).update(
+                status=EmailOutbox.STATUS_SENDING,
+                locked_at=now,
+            )
+    return rows
+
+
+def _build_message(row, connection):
+    msg = EmailMultiAlternatives(
+        subject=row.subject,
+        body=row.body_text,
+        from_email=row.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=row.to,
+        connection=connection,
+    )
+    if row.body_html:
+        msg.attach_alternative(row.body_html, "text/html")
+    return msg
+
+
+def deliver_batch(connection, batch_size=50):
+    """
+    1 バッチ分を送信する。connection は呼び出し側で open 済みのものを使い回す。
+    戻り値: (送信成功数, 失敗数)
+    """
+    rows = claim_batch(batch_size)
+    sent = failed = 0
+
+    for row in rows:
+        row.attempts += 1
+        try:
+            with timed("email"):
+                _build_message(row, connection).send()
+        except Exception as e:  # SMTP 例外は種類が多いのでまとめて再送対象にする
+            failed += 1
+            row.last_error = f"{type(e).__name__}: {e}"[:2000]
+            row.locked_at = None
+            if row.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                row.status = EmailOutbox.STATUS_FAILED
+                logger.error("email outbox: 送信を断念しました uuid=%s %s", row.uuid, row.last_error)
+            else:
+                row.status = EmailOutbox.STATUS_PENDING
+                row.next_attempt_at = timezone.now() + backoff_delay(row.attempts)
+                logger.warning("email outbox: 送信失敗（再送予定） uuid=%s %s", row.uuid, row.last_error)
+            row.save(update_fields=["attempts", "status", "next_attempt_at", "locked_at", "last_error"])
+
+            # 接続自体が壊れている可能性があるので張り直す
+            try:
+                connection.close()
+                connection.open()
+            except Exception:
+                logger.exception("email outbox: 接続の再確立に失敗しました")
+            continue
+
+        sent += 1
+        row.status = EmailOutbox.STATUS_SENT
+        row.sent_at = timezone.now()
+        row.locked_at = None
+        row.last_error = ""
+        row.save(update_fields=["attempts", "status", "sent_at", "locked_at", "last_error"])
+
+    return sent, failed
@@ -0,0 +1,62 @@
+# eform_api/pagination.py
+"""
+ページング（API・管理画面）
+
+- ConsentHistoryPagination: 顧客詳細の同意履歴（?limit=&offset=）。
+  1 人の顧客の履歴は多くても数百件なので、OFFSET で十分速い
+- EstimatedCountPaginator: 管理画面の一覧。顧客・同意履歴は数百万行になるので COUNT(*) で表全体を読まない
+"""
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import LimitOffsetPagination
+
+
+class ConsentHistoryPagination(LimitOffsetPagination):
+    max_limit = 100
+
+    @property
+    def default_limit(self):
+        return settings.CUSTOMER_CONSENT_PAGE_SIZE
+
+
+def estimated_row_count(model, using):
+    """PostgreSQL の統計（pg_class.reltuples）の行数。他の DB・ANALYZE 前は None"""
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # 一度も VACUUM / ANALYZE されていない表は -1（PostgreSQL 14 以降）か 0
+    if row is None or row[0] is None or row[0] <= 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    管理画面（ModelAdmin.paginator）用。
+    - 絞り込みの無い一覧: 推定件数が ADMIN_ESTIMATED_COUNT_THRESHOLD 以上ならそれを使う（それ未満は COUNT(*)）
+    - 検索・絞り込みのある一覧: ADMIN_COUNT_LIMIT 件で打ち切って数える
+    件数は多少ずれるが、最後のページが空になるだけで一覧は壊れない
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+            return queryset.count()
+
+        return queryset.order_by().values("pk")[:settings.ADMIN_COUNT_LIMIT].count()
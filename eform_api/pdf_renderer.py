@@ -0,0 +1,252 @@
+# eform_api/pdf_renderer.py
+"""
+同意書 PDF の生成（templates/pdf/consent_document.html → WeasyPrint）
+
+- HTML はリクエストを受けたプロセスで Django テンプレートから作る（軽い）
+- HTML → PDF（重い・CPU を使う）はプロセスプールで行う
+    * PDF_RENDER_PROCESSES 個の子プロセス（0 ならその場で生成。開発・ワーカー用）
+    * 同時に受け付けるのは PDF_RENDER_MAX_PENDING 件まで。空かなければ
+      PDF_RENDER_QUEUE_TIMEOUT 秒待って PdfRendererBusy（ビューは 503 を返す）
+    * 子プロセスは forkserver から作る（gunicorn ワーカーのスレッドや接続を引き継がない）
+- フォント（FontConfiguration）と CSS（consent_document.css + PDF_FONT_PATH の @font-face）は
+  子プロセスごとに最初の 1 回だけ読み込み、以降の PDF で使い回す
+- プールは pid ごとに作る（storage.py のクライアントと同じ）
+- WeasyPrint が読みに行けるのは data: URL（署名画像）と PDF_FONT_PATH のフォントだけ。
+  署名や同意書本文の <img src> / url() に file:// や http:// があっても読まない
+  （ローカルファイルの読み出し・SSRF にならないように）
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import get_template
+
+from .instrumentation import timed
+from .metrics import record_pdf_rendered
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_NAME = "pdf/consent_document.html"
+STYLESHEET = Path(__file__).resolve().parent / "templates" / "pdf" / "consent_document.css"
+DEFAULT_TITLE = "タトゥー施術同意書（控え）"
+
+_lock = threading.Lock()
+_pools = {}       # pid → (プール, 受付数の上限を管理するセマフォ)
+_stylesheets = {}  # pid → CSS の文字列のリスト
+
+
+class PdfRenderError(Exception):
+    """PDF を作れなかった"""
+
+
+class PdfRendererBusy(PdfRenderError):
+    """プールが埋まっていて受け付けられない（しばらくしてから再試行）"""
+
+
+# ------------------------------
+# 1. HTML
+# ------------------------------
+def font_url():
+    """PDF_FONT_PATH の file:// URL（未設定なら None）"""
+    if not settings.PDF_FONT_PATH:
+        return None
+    return Path(settings.PDF_FONT_PATH).resolve().as_uri()
+
+
+def stylesheet_texts():
+    """PDF に当てる CSS（フォントの @font-face + consent_document.css）"""
+    pid = os.getpid()
+    texts = _stylesheets.get(pid)
+    if texts is None:
+        texts = []
+        if font_url():
+            texts.append(f'@font-face {{ font-family: "InkbaseJP"; src: url("{font_url()}"); }}')
+        texts.append(STYLESHEET.read_text(encoding="utf-8"))
+        _stylesheets[pid] = texts
+    return texts
+
+
+def signed_customer(consent):
+    """
+    同意書に載せる顧客の情報。署名した時点のスナップショット（customer_*_snapshot）を使う。
+    顧客を後から編集しても、保存済みの PDF とその場で作る PDF が同じ内容になる。
+    スナップショットの無い古い同意書だけ今の顧客の値を使う
+    """
+    def snapshot(value, current):
+        return value if value is not None else current
+
+    customer = consent.customer
+    return {
+        "uuid": snapshot(consent.customer_uuid_snapshot, customer.uuid),
+        "full_name": snapshot(consent.customer_name_snapshot, customer.full_name),
+        "birth_date": snapshot(consent.customer_birth_date_snapshot, customer.birth_date),
+        "phone_number": snapshot(consent.customer_phone_snapshot, customer.phone_number),
+    }
+
+
+def render_consent_html(consent, html_body=None, title=None):
+    """
+    同意書の HTML。consent.customer は select_related 済みにしておく。
+    html_body を省略すると consent_version の本文（eform_api.consent_documents。プロセスごとにキャッシュ）を使う
+    """
+    if html_body is None:
+        # 子プロセス（_write_pdf）はモデルを読み込まずにこのモジュールを import するので、ここで読む
+        from .consent_documents import consent_document_html
+
+        document_title, html_body = consent_document_html(consent)
+        title = title or document_title
+    return get_template(TEMPLATE_NAME).render({
+        "title": title or DEFAULT_TITLE,
+        "html_body": html_body,
+        "customer": signed_customer(consent),
+        "consent": consent,
+        "signature": consent.signature,
+    })
+
+
+# ------------------------------
+# 2. HTML → PDF（子プロセス側）
+# ------------------------------
+_worker = {}
+
+
+class BlockedUrl(ValueError):
+    """PDF の生成中に読みに行ってはいけない URL"""
+
+
+def url_fetcher_for(allowed_urls):
+    """
+    data: URL と allowed_urls（同梱のフォントなど）だけを読む url_fetcher。
+    それ以外は BlockedUrl にする（WeasyPrint はその画像・フォントを飛ばして PDF を作る）
+    """
+    allowed = frozenset(allowed_urls)
+
+    def fetch(url, timeout=10, ssl_context=None):
+        if not (url.startswith("data:") or url in allowed):
+            raise BlockedUrl(f"PDF の生成で読めない URL です: {url[:100]}")
+        from weasyprint.urls import default_url_fetcher
+
+        return default_url_fetcher(url, timeout=timeout, ssl_context=ssl_context)
+
+    return fetch
+
+
+def _init_worker(css_texts, asset_urls):
+    """フォントと CSS を読み込んで、このプロセスの以降の PDF で使い回す"""
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    font_config = FontConfiguration()
+    url_fetcher = url_fetcher_for(asset_urls)
+    _worker["font_config"] = font_config
+    _worker["url_fetcher"] = url_fetcher
+    _worker["stylesheets"] = [
+        CSS(string=text, font_config=font_config, url_fetcher=url_fetcher) for text in css_texts
+    ]
+
+
+def _write_pdf(html, css_texts, asset_urls):
+    from weasyprint import HTML
+
+    if not _worker:
+        _init_worker(css_texts, asset_urls)
+    return HTML(string=html, url_fetcher=_worker["url_fetcher"]).write_pdf(
+        stylesheets=_worker["stylesheets"],
+        font_config=_worker["font_config"],
+    )
+
+
+def asset_urls():
+    """PDF の生成で読んでよいファイルの URL（フォント）"""
+    return [url for url in (font_url(),) if url]
+
+
+# ------------------------------
+# 3. プール
+# ------------------------------
+def _get_pool():
+    pid = os.getpid()
+    entry = _pools.get(pid)
+    if entry is not None:
+        return entry
+    with _lock:
+        entry = _pools.get(pid)
+        if entry is None:
+            import multiprocessing
+
+            context = multiprocessing.get_context(settings.PDF_RENDER_START_METHOD)
+            if settings.PDF_RENDER_START_METHOD == "forkserver":
+                context.set_forkserver_preload(["weasyprint"])
+            processes = settings.PDF_RENDER_PROCESSES
+            pool = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(stylesheet_texts(), asset_urls()),
+            )
+            entry = _pools[pid] = (pool, threading.BoundedSemaphore(settings.PDF_RENDER_MAX_PENDING))
+    return entry
+
+
+def _discard_pool(pool):
+    with _lock:
+        for pid, (known, _) in list(_pools.items()):
+            if known is pool:
+                del _pools[pid]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pool():
+    """このプロセスのプールを止める（ワーカー終了時・ベンチマークの後始末）"""
+    entry = _pools.pop(os.getpid(), None)
+    if entry is not None:
+        entry[0].shutdown(wait=True, cancel_futures=True)
+
+
+def html_to_pdf(html):
+    """HTML を PDF（bytes）にする。PDF_RENDER_PROCESSES=0 ならこのプロセスで生成する"""
+    css_texts = stylesheet_texts()
+    if settings.PDF_RENDER_PROCESSES <= 0:
+        try:
+            return _write_pdf(html, css_texts, asset_urls())
+        except Exception as e:
+            raise PdfRenderError(f"PDF を生成できません: {e}") from e
+
+    pool, pending = _get_pool()
+    if not pending.acquire(timeout=settings.PDF_RENDER_QUEUE_TIMEOUT):
+        raise PdfRendererBusy("PDF の生成が混み合っています")
+    try:
+        future = pool.submit(_write_pdf, html, css_texts, asset_urls())
+    except Exception:
+        pending.release()
+        _discard_pool(pool)
+        raise PdfRenderError("PDF の生成プロセスを使えません")
+    # 待ちきれずに諦めた分も、子プロセスが終わるまでは受付数に数える
+    future.add_done_callback(lambda _: pending.release())
+
+    try:
+        return future.result(timeout=settings.PDF_RENDER_TIMEOUT)
+    except FutureTimeoutError:
+        raise PdfRenderError(f"PDF の生成が {settings.PDF_RENDER_TIMEOUT} 秒で終わりませんでした")
+    except BrokenProcessPool:
+        # 子プロセスが落ちた（メモリ不足など）。次の呼び出しで作り直す
+        logger.exception("pdf render pool is broken; recreating")
+        _discard_pool(pool)
+        raise PdfRenderError("PDF の生成プロセスが異常終了しました")
+    except Exception as e:
+        raise PdfRenderError(f"PDF を生成できません: {e}") from e
+
+
+def render_consent_pdf(consent, html_body=None, title=None):
+    """同意書の PDF（bytes）。メトリクスと Server-Timing（pdf）に時間を記録する"""
+    started = time.perf_counter()
+    with timed("pdf"):
+        pdf = html_to_pdf(render_consent_html(consent, html_body=html_body, title=title))
+    record_pdf_rendered(time.perf_counter() - started)
+    return pdf
@@ -0,0 +1,138 @@
+# eform_api/public_consent.py
+"""
+QR 同意フロー（public API）の書き込み処理
+
+同期版（views/public_consent_views）と非同期版（views/public_consent_async_views。
+db_in_thread でスレッドに逃がして呼ぶ）の両方がここを使う。
+どちらも入力チェック済みの validated_data と、クライアントの情報（ip_address, user_agent）を渡し、
+(レスポンスの本文, ステータス) を受け取ってそのまま返す。
+"""
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .access_logs import record_access
+from .consent_pdfs import queue_consent_pdf
+from .models import ConsentEntryToken, Customer, CustomerConsent
+
+
+def get_valid_token(token_uuid, related="artist__user"):
+    """(token, エラー (body, status)) を返す。トークンが使えなければ token は None"""
+    try:
+        token = ConsentEntryToken.objects.select_related(related).get(uuid=token_uuid)
+    except ConsentEntryToken.DoesNotExist:
+        return None, ({"detail": "entry_token が不正です"}, 400)
+
+    if not token.is_valid():
+        return None, ({"detail": "このQRコードは現在使用できません。"}, 400)
+
+    return token, None
+
+
+def _create_consent(customer, data, now):
+    """同意履歴を作って PDF の生成キューに積む"""
+    try:
+        with transaction.atomic():
+            consent = CustomerConsent.objects.create(
+                customer=customer,
+                consent_version=data["consent_version"],
+                signed_at=now,
+                signature=data["signature"],
+                privacy_agreement_version=data["privacy_agreement_version"],
+                privacy_agreement_agreed_at=now,
+            )
+    except IntegrityError:
+        # 同時送信などで作れなかったときは、同じ版の既存の同意を返す
+        consent = (
+            CustomerConsent.objects.filter(customer=customer, consent_version=data["consent_version"])
+            .order_by("-signed_at")
+            .first()
+        )
+        if consent is None:
+            raise
+    # PDF は render_consent_pdfs ワーカーが作って S3 に置く
+    queue_consent_pdf(consent)
+    return consent
+
+
+def _created(customer, consent):
+    return {"customer_uuid": str(customer.uuid), "consent_uuid": str(consent.uuid)}, 201
+
+
+# =========================
+# 1. ご新規同意: Entry
+# =========================
+def submit_entry(data, meta):
+    # ---- 1. トークン確認 ----
+    token, error = get_valid_token(data["entry_token"])
+    if error:
+        return error
+
+    artist = token.artist
+    user = artist.user
+
+    # ---- 2. 顧客情報検索または作成 ----
+    customer = Customer.objects.filter(
+        user=user,
+        phone_number=data["phone_number"],
+    ).first()
+
+    birth_str = str(data["birth_date"] or "")
+
+    if customer is None:
+        customer = Customer.objects.create(
+            user=user,
+            full_name=data["full_name"],
+            gender=data["gender"],
+            birth_date=birth_str,
+            prefecture=data["prefecture"],
+            city=data["city"],
+            phone_number=data["phone_number"],
+            tattooist=artist.artist_name,
+        )
+    else:
+        customer.full_name = data["full_name"]
+        customer.gender = data["gender"]
+        customer.birth_date = birth_str
+        customer.prefecture = data["prefecture"]
+        customer.city = data["city"]
+        customer.phone_number = data["phone_number"]
+        customer.tattooist = artist.artist_name
+        customer.save()
+
+    # ---- 3. 同意履歴の作成 ----
+    now = timezone.now()
+    consent = _create_consent(customer, data, now)
+
+    # ---- 4. アクセスログ ----
+    record_access(token, customer_phone=data["phone_number"], now=now, **meta)
+
+    return _created(customer, consent)
+
+
+# =========================
+# 2. 再同意: renew
+# =========================
+def submit_renew(data, meta):
+    # 1) トークン確認
+    token, error = get_valid_token(data["entry_token"], related="artist")
+    if error:
+        return error
+
+    # 2) 顧客確認
+    try:
+        customer = Customer.objects.get(uuid=data["customer_uuid"])
+    except Customer.DoesNotExist:
+        return {"detail": "customer_uuid が不正です"}, 400
+
+    # 3) token の artist と 顧客の user が一致するか
+    if customer.user_id != token.artist.user_id:
+        return {"detail": "このQRコードからはこのお客様の再同意は行えません。"}, 400
+
+    # 4) 再同意レコード作成
+    now = timezone.now()
+    consent = _create_consent(customer, data, now)
+
+    # 5) アクセスログ & 最終利用日時更新
+    record_access(token, customer_phone=customer.phone_number, now=now, **meta)
+
+    return _created(customer, consent)
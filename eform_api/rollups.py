@@ -0,0 +1,317 @@
+# eform_api/rollups.py
+"""
+同意書の日次ロールアップ（ConsentDailyRollup）の更新と集計
+
+- CustomerConsent の保存・削除時に、影響する (user, 日付) バケットだけを再計算する
+- 時系列 API は生の CustomerConsent ではなくロールアップ行を合計して返す
+- 全件の作り直しは backfill_consent_rollups コマンドから rebuild_consent_rollups を使う
+
+save() / delete() を通らない一括操作（CustomerConsent の QuerySet.update / delete・bulk_create /
+bulk_update、顧客の物理削除による同意の連鎖削除）ではロールアップは更新されない。
+その場合は refreshing_customer_rollups で囲むか、後で backfill_consent_rollups を実行する。
+顧客側だけの一括操作（CSV 取り込み・一括削除などの is_active の切り替え・マージ）は
+ロールアップに影響しない（集計は顧客の is_active を見ない。artist_views の統計と同じ）
+"""
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import ConsentDailyRollup, Customer, CustomerConsent
+
+GRANULARITIES = {
+    "day": None,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+
+# ------------------------------
+# 1. 日付バケットの計算
+# ------------------------------
+def local_date(dt):
+    """signed_at を TIME_ZONE の日付に変換する（ロールアップのバケット）"""
+    if isinstance(dt, str):
+        # save() 直後は代入されたままの文字列のことがある
+        dt = CustomerConsent._meta.get_field("signed_at").to_python(dt)
+    if dt is None:
+        return None
+    if timezone.is_naive(dt):
+        return dt.date()
+    return timezone.localtime(dt).date()
+
+
+def _day_range(day):
+    """TIME_ZONE での 1 日分を [start, end) の aware datetime で返す"""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(day, time.min), tz)
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def _earlier_active_consent():
+    """同じ顧客に、これより前の有効な同意書があるか（= リピーター判定）"""
+    return CustomerConsent.objects.filter(
+        customer_id=OuterRef("customer_id"),
+        is_active=True,
+    ).filter(
+        Q(signed_at__lt=OuterRef("signed_at"))
+        | Q(signed_at=OuterRef("signed_at"), pk__lt=OuterRef("pk"))
+    )
+
+
+def _rollup_source(user_ids=None):
+    """ロールアップ計算の元になる「有効な同意書 + リピーター判定」クエリ"""
+    qs = CustomerConsent.objects.filter(is_active=True)
+    if user_ids is not None:
+        qs = qs.filter(customer__user_id__in=user_ids)
+    return qs.annotate(is_returning=Exists(_earlier_active_consent()))
+
+
+# ------------------------------
+# 2. 差分更新
+# ------------------------------
+def refresh_consent_rollup(user_id, day):
+    """(user, day) の 1 バケットを生データから再計算して保存する"""
+    if user_id is None or day is None:
+        return None
+
+    start, end = _day_range(day)
+    counts = (
+        _rollup_source(user_ids=[user_id])
+        .filter(signed_at__gte=start, signed_at__lt=end)
+        .aggregate(
+            consent_count=Count("pk"),
+            returning_consent_count=Count("pk", filter=Q(is_returning=True)),
+        )
+    )
+    consent_count = counts["consent_count"] or 0
+    returning = counts["returning_consent_count"] or 0
+
+    if consent_count == 0:
+        ConsentDailyRollup.objects.filter(user_id=user_id, date=day).delete()
+        return None
+
+    rollup, _ = ConsentDailyRollup.objects.update_or_create(
+        user_id=user_id,
+        date=day,
+        defaults={
+            "consent_count": consent_count,
+            "new_consent_count": consent_count - returning,
+            "returning_consent_count": returning,
+        },
+    )
+    return rollup
+
+
+def _next_consent_day(consent, after):
+    """同じ顧客の「この次の」有効な同意書の日付（新規/リピーター判定が変わりうる）"""
+    if after is None:
+        return None
+    next_signed_at = (
+        CustomerConsent.objects.filter(
+            customer_id=consent.customer_id,
+            is_active=True,
+            signed_at__gt=after,
+        )
+        .exclude(pk=consent.pk)
+        .order_by("signed_at")
+        .values_list("signed_at", flat=True)
+        .first()
+    )
+    return local_date(next_signed_at)
+
+
+def sync_consent_rollups(consent, previous=None, deleted=False):
+    """
+    CustomerConsent の保存・削除後に呼ばれ、影響するバケットだけを再計算する。
+
+    - previous: 変更前の (is_active, signed_at)。新規作成時は None
+    - 変更前の日付・変更後の日付・同じ顧客の次回来店日の最大 3 バケット
+    """
+    current = None if deleted else consent._current_rollup_state()
+    if previous is not None and previous == current:
+        return
+
+    if "customer" in consent._state.fields_cache:
+        user_id = consent.customer.user_id
+    else:
+        user_id = (
+            Customer.objects.filter(pk=consent.customer_id)
+            .values_list("user_id", flat=True)
+            .first()
+        )
+    if user_id is None:
+        return
+
+    days = set()
+    timestamps = []
+    if previous is not None:
+        days.add(local_date(previous[1]))
+        timestamps.append(previous[1])
+    if current is not None:
+        days.add(local_date(current[1]))
+        timestamps.append(current[1])
+
+    earliest = min((ts for ts in timestamps if ts is not None), default=None)
+    days.add(_next_consent_day(consent, earliest))
+
+    with transaction.atomic():
+        for day in days:
+            refresh_consent_rollup(user_id, day)
+
+
+# ------------------------------
+# 2.5 一括操作の後の再計算
+# ------------------------------
+def customer_rollup_buckets(customer_ids):
+    """顧客たちの有効な同意書が載っている (user_id, 日付) バケット"""
+    rows = (
+        CustomerConsent.objects.filter(customer_id__in=customer_ids, is_active=True)
+        .values_list("customer__user_id", "signed_at")
+        .distinct()
+    )
+    return {(user_id, local_date(signed_at)) for user_id, signed_at in rows}
+
+
+def refresh_consent_rollup_buckets(buckets):
+    """(user_id, 日付) バケットをまとめて再計算する"""
+    with transaction.atomic():
+        for user_id, day in sorted(buckets, key=lambda bucket: (bucket[0], bucket[1])):
+            refresh_consent_rollup(user_id, day)
+
+
+@contextmanager
+def refreshing_customer_rollups(customer_ids):
+    """
+    顧客たちの同意書を一括で変える・消す処理を囲む。
+    前後のバケット（新規/リピーター判定が変わる同じ顧客の他の日も含む）をまとめて再計算する
+
+        with refreshing_customer_rollups(customer_ids):
+            CustomerConsent.objects.filter(customer_id__in=customer_ids).update(is_active=False)
+    """
+    customer_ids = list(customer_ids)
+    before = customer_rollup_buckets(customer_ids)
+    yield
+    refresh_consent_rollup_buckets(before | customer_rollup_buckets(customer_ids))
+
+
+# ------------------------------
+# 3. 全件再計算（バックフィル）
+# ------------------------------
+def rebuild_consent_rollups(user_ids=None, since=None, until=None):
+    """
+    ロールアップを生データから作り直す。
+
+    - user_ids: 対象ユーザー（None なら全員）
+    - since / until: 対象日付の範囲（両端を含む, None なら無制限）
+    - 戻り値: 作成したロールアップ行数
+    """
+    source = _rollup_source(user_ids=user_ids)
+    if since is not None:
+        source = source.filter(signed_at__gte=_day_range(since)[0])
+    if until is not None:
+        source = source.filter(signed_at__lt=_day_range(until)[1])
+
+    rows = (
+        source.annotate(day=TruncDate("signed_at"))
+        .values("customer__user_id", "day")
+        .annotate(
+            consent_count=Count("pk"),
+            returning_consent_count=Count("pk", filter=Q(is_returning=True)),
+        )
+        .order_by()
+    )
+
+    rollups = [
+        ConsentDailyRollup(
+            user_id=row["customer__user_id"],
+            date=row["day"],
+            consent_count=row["consent_count"],
+            new_consent_count=row["consent_count"] - row["returning_consent_count"],
+            returning_consent_count=row["returning_consent_count"],
+        )
+        for row in rows
+    ]
+
+    stale = ConsentDailyRollup.objects.all()
+    if user_ids is not None:
+        stale = stale.filter(user_id__in=user_ids)
+    if since is not None:
+        stale = stale.filter(date__gte=since)
+    if until is not None:
+        stale = stale.filter(date__lte=until)
+
+    with transaction.atomic():
+        stale.delete()
+        ConsentDailyRollup.objects.bulk_create(rollups, batch_size=1000)
+
+    return len(rollups)
+
+
+# ------------------------------
+# 4. 時系列集計（API 用）
+# ------------------------------
+def _period_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_period(day, granularity):
+    if granularity == "week":
+        return day + timedelta(days=7)
+    if granularity == "month":
+        return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def consent_timeseries(user_id, start, end, granularity="day"):
+    """
+    [start, end]（両端含む）の同意書件数をロールアップの合計で返す。
+    期間内にデータの無いバケットも 0 件で埋める。
+    週・月の最初と最後のバケットは [start, end] に入る日だけを数える。最初のバケットの
+    period_start は週初め・月初ではなく start にする（数えていない日から始まるように見せない）
+    """
+    trunc = GRANULARITIES[granularity]
+
+    qs = ConsentDailyRollup.objects.filter(user_id=user_id, date__gte=start, date__lte=end)
+    if trunc is None:
+        qs = qs.annotate(period=F("date"))
+    else:
+        qs = qs.annotate(period=trunc("date"))
+
+    rows = (
+        qs.values("period")
+        .annotate(
+            consent_count=Sum("consent_count"),
+            new_consent_count=Sum("new_consent_count"),
+            returning_consent_count=Sum("returning_consent_count"),
+        )
+        .order_by("period")
+    )
+    by_period = {}
+    for row in rows:
+        period = row["period"]
+        if isinstance(period, datetime):
+            period = period.date()
+        by_period[period] = row
+
+    series = []
+    period = _period_start(start, granularity)
+    while period <= end:
+        row = by_period.get(period, {})
+        series.append({
+            "period_start": max(period, start),
+            "consent_count": row.get("consent_count") or 0,
+            "new_consent_count": row.get("new_consent_count") or 0,
+            "returning_consent_count": row.get("returning_consent_count") or 0,
+        })
+        period = _next_period(period, granularity)
+
+    return series
@@ -1,6 +1,46 @@
-from .auth_serializers import *
-from .artist_serializers import *
-from .customer_serializers import *
-from .consent_serializers import *
-from .user_agreement_serializers import *
-from .stats_serializers import *
+# eform_api/serializers/__init__.py
+"""
+from ..serializers import XxxSerializer で使えるように各モジュールの名前を公開する。
+
+以前は全モジュールを star-import していたが、起動時に使わないものまで読み込むので、
+名前が参照されたときに _EXPORTS で引いたモジュールだけを import する（PEP 562 のモジュール __getattr__）。
+"""
+from importlib import import_module
+
+# 公開する名前 → 定義しているモジュール。シリアライザを足したらここにも足す
+_EXPORTS = {
+    # auth_serializers
+    "RegisterSerializer": "auth_serializers",
+    # artist_serializers
+    "TattooArtistSerializer": "artist_serializers",
+    # customer_serializers
+    "CustomerSerializer": "customer_serializers",
+    "CustomerEasyCreateSerializer": "customer_serializers",
+    "CustomerDetailSerializer": "customer_serializers",
+    "CustomerImportJobSerializer": "customer_serializers",
+    # consent_serializers
+    "CustomerSimpleSerializer": "consent_serializers",
+    "CustomerSummarySerializer": "consent_serializers",
+    "CustomerConsentReadSerializer": "consent_serializers",
+    "CustomerConsentWriteSerializer": "consent_serializers",
+    "CustomerConsentSummarySerializer": "consent_serializers",
+    "CustomerConsentSignatureSerializer": "consent_serializers",
+    "CONSENT_SUMMARY_FIELDS": "consent_serializers",
+    # user_agreement_serializers
+    "UserAgreementSerializer": "user_agreement_serializers",
+    # stats_serializers
+    "ArtistStatsSerializer": "stats_serializers",
+    "ConsentTimeseriesQuerySerializer": "stats_serializers",
+    "ConsentTimeseriesPointSerializer": "stats_serializers",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f"{__name__}.{module_name}"), name)
+    globals()[name] = value
+    return value
@@ -3,12 +3,14 @@ from rest_framework.validators import UniqueValidator
 from django.contrib.auth import get_user_model
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
-from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils.safestring import mark_safe
 from django.contrib.auth.tokens import default_token_generator
 
+from ..outbox import queue_email
+
 # ----------------------------
 # 1.ユーザー登録用(仮登録) リンク踏ませるメール送信まで
 # ----------------------------
@@ -34,13 +36,18 @@ class RegisterSerializer(serializers.ModelSerializer):
         fields = ['username', 'email', 'password']
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password'],
-            is_active=False
-        )
+        # ユーザー作成と認証メールの送信キュー登録を同じトランザクションで行う
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username=validated_data['username'],
+                email=validated_data['email'],
+                password=validated_data['password'],
+                is_active=False
+            )
+            self._queue_verify_email(user)
+        return user
 
+    def _queue_verify_email(self, user):
         uid = urlsafe_base64_encode(force_bytes(user.pk))
         token = default_token_generator.make_token(user)
         
@@ -56,15 +63,13 @@ class RegisterSerializer(serializers.ModelSerializer):
         text_content = render_to_string("emails/verify_email.txt", context)
         html_content = render_to_string("emails/verify_email.html", context)
 
-        msg = EmailMultiAlternatives(
-            subject="【INKBASE】メールアドレス認証のお願い",
-            body=text_content,
+        # 送信は send_queued_emails ワーカーが行う（SMTP の遅延を登録 API に持ち込まない）
+        queue_email(
+            "【INKBASE】メールアドレス認証のお願い",
+            text_content,
+            [user.email],
+            html_content=html_content,
             from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[user.email],
         )
-        msg.attach_alternative(html_content, "text/html")
-        msg.send()
-
-        return user
 
 
@@ -1,6 +1,7 @@
 # backend/eform_api/serializers/consent_serializers.py
 from rest_framework import serializers
 from ..models import CustomerConsent, Customer
+from ..signatures import SignatureField, SignatureStrokesField, resolve_signature
 
 
 # ----------------------------------------
@@ -110,6 +111,9 @@ class CustomerConsentWriteSerializer(serializers.ModelSerializer):
         slug_field='uuid',
         queryset=Customer.objects.all(),
     )
+    # データ URL / multipart のファイル / 筆跡ベクトル（保存時に圧縮。eform_api.signatures）
+    signature = SignatureField(required=False, allow_null=True)
+    signature_strokes = SignatureStrokesField(required=False, write_only=True)
 
     class Meta:
         model = CustomerConsent
@@ -119,6 +123,7 @@ class CustomerConsentWriteSerializer(serializers.ModelSerializer):
             'consent_version',
             'signed_at',
             'signature',
+            'signature_strokes',
             'privacy_agreement_version',
             'privacy_agreement_agreed_at',
             'visit_date',
@@ -127,3 +132,40 @@ class CustomerConsentWriteSerializer(serializers.ModelSerializer):
             'updated_at',
         ]
         read_only_fields = ['uuid', 'created_at', 'updated_at']
+
+    def validate(self, attrs):
+        return resolve_signature(attrs, required=False)
+
+
+# ----------------------------------------
+# 4. 顧客詳細の同意履歴（署名なし）
+#    ※ CustomerConsentReadSerializer から signature だけを除いたもの
+#      （customer / is_merged / merged_into_uuid はマージのバッジ表示で使う）
+#    ※ 署名画像は大きいので CustomerConsentSignatureSerializer で別に読む
+# ----------------------------------------
+class CustomerConsentSummarySerializer(CustomerConsentReadSerializer):
+    class Meta(CustomerConsentReadSerializer.Meta):
+        fields = [f for f in CustomerConsentReadSerializer.Meta.fields if f != 'signature']
+        read_only_fields = fields
+
+
+# 署名なしで読むときの only()（CustomerConsentSummarySerializer のモデルのフィールド + 外部キー）。
+# customer は顧客の related manager（customer.consents）から読んで、同じインスタンスを使い回す
+CONSENT_SUMMARY_FIELDS = (
+    'id',
+    'customer_id',
+    *(
+        f for f in CustomerConsentSummarySerializer.Meta.fields
+        if f not in ('customer', 'is_merged', 'merged_into_uuid')
+    ),
+)
+
+
+# ----------------------------------------
+# 5. 顧客詳細の署名画像（必要になったときに読む）
+# ----------------------------------------
+class CustomerConsentSignatureSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomerConsent
+        fields = ['uuid', 'signed_at', 'signature']
+        read_only_fields = fields
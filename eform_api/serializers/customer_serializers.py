@@ -1,6 +1,14 @@
+from django.conf import settings
+from django.urls import reverse
 from rest_framework import serializers
-from ..models import Customer, CustomerConsent
-from .consent_serializers import CustomerConsentReadSerializer, CustomerConsentWriteSerializer
+from rest_framework.utils.urls import replace_query_param
+from ..models import Customer, CustomerConsent, CustomerImportJob
+from .consent_serializers import (
+    CONSENT_SUMMARY_FIELDS,
+    CustomerConsentReadSerializer,
+    CustomerConsentSummarySerializer,
+    CustomerConsentWriteSerializer,
+)
 from ..utils import normalize_phone_number
 
 # ----------------------------------------
@@ -49,17 +57,70 @@ class CustomerEasyCreateSerializer(serializers.ModelSerializer):
 
 
 class CustomerDetailSerializer(serializers.ModelSerializer):
-    consents = CustomerConsentReadSerializer(
-        many=True, read_only=True)  # ✅ 表示用はRead用Serializerで
+    """
+    顧客詳細。同意履歴は全件を埋め込まず、要約と最初のページだけ返す（署名画像は含めない）
+    - consent_count: 同意の件数
+    - latest_consent: 最新の同意
+    - consents: 新しい順に CUSTOMER_CONSENT_PAGE_SIZE 件
+    - consents_next: 続きの URL（/api/customers/<uuid>/consents/?limit=&offset=。無ければ null）
+    署名画像は /api/customers/<uuid>/consents/signatures/ から必要な分だけ読む
+    """
+    consents = serializers.SerializerMethodField()
+    consent_count = serializers.SerializerMethodField()
     latest_consent = serializers.SerializerMethodField()
+    consents_next = serializers.SerializerMethodField()
 
     class Meta:
         model = Customer
         fields = '__all__'
         read_only_fields = ['uuid', 'user', 'created_at', 'updated_at']
 
+    def _history(self, obj):
+        """(最初のページ, 件数)。1 回の to_representation で 1 度だけ読む"""
+        cached = getattr(self, "_history_cache", None)
+        if cached is not None and cached[0] == obj.pk:
+            return cached[1]
+
+        limit = settings.CUSTOMER_CONSENT_PAGE_SIZE
+        page = list(
+            obj.consents.only(*CONSENT_SUMMARY_FIELDS).order_by('-signed_at', '-id')[:limit]
+        )
+        # 1 ページに収まれば件数のクエリは要らない
+        count = len(page) if len(page) < limit else obj.consents.count()
+        self._history_cache = (obj.pk, (page, count))
+        return page, count
+
+    def get_consents(self, obj):
+        page, _ = self._history(obj)
+        return CustomerConsentSummarySerializer(page, many=True).data
+
+    def get_consent_count(self, obj):
+        return self._history(obj)[1]
+
     def get_latest_consent(self, obj):
-        latest = obj.consents.order_by('-signed_at').first()
-        if latest:
-            return CustomerConsentReadSerializer(latest).data
-        return None
+        page, _ = self._history(obj)
+        return CustomerConsentSummarySerializer(page[0]).data if page else None
+
+    def get_consents_next(self, obj):
+        page, count = self._history(obj)
+        if count <= len(page):
+            return None
+        url = reverse('customer-consents', kwargs={'uuid': obj.uuid})
+        request = self.context.get('request')
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        url = replace_query_param(url, 'limit', len(page))
+        return replace_query_param(url, 'offset', len(page))
+
+# ----------------------------------------
+# 4.顧客 CSV 取り込みジョブ CustomerImportJobSerializer
+# ----------------------------------------
+
+
+class CustomerImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomerImportJob
+        fields = ['uuid', 'original_name', 'status', 'rows', 'created_count',
+                  'updated_count', 'error_count', 'errors', 'last_error',
+                  'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
@@ -11,3 +11,30 @@ class ArtistStatsSerializer(serializers.Serializer):
     customer_count = serializers.IntegerField()
     consent_count = serializers.IntegerField()
     median_age = serializers.IntegerField(allow_null=True) 
+
+
+# ----------------------------------------
+# 2. 同意書件数の時系列（ロールアップ集計）
+# ----------------------------------------
+
+class ConsentTimeseriesQuerySerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    granularity = serializers.ChoiceField(choices=["day", "week", "month"], default="day")
+
+    # 日次で返すときの最大期間（ゼロ埋めした配列が大きくなりすぎないように）
+    MAX_DAYS = 366 * 3
+
+    def validate(self, attrs):
+        if attrs["end"] < attrs["start"]:
+            raise serializers.ValidationError("end は start 以降の日付を指定してください。")
+        if (attrs["end"] - attrs["start"]).days > self.MAX_DAYS:
+            raise serializers.ValidationError(f"期間は最大 {self.MAX_DAYS} 日までです。")
+        return attrs
+
+
+class ConsentTimeseriesPointSerializer(serializers.Serializer):
+    period_start = serializers.DateField()
+    consent_count = serializers.IntegerField()
+    new_consent_count = serializers.IntegerField()
+    returning_consent_count = serializers.IntegerField()
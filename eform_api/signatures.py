@@ -0,0 +1,271 @@
+# eform_api/signatures.py
+"""
+署名の受け取りと圧縮
+
+受け付ける形:
+- signature: 画像のデータ URL（"data:image/png;base64,..." 従来の JSON 形式）
+- signature: multipart のファイル（PNG / JPEG / WebP の生バイナリ。base64 より 1/3 小さい）
+- signature_strokes: 筆跡のベクトル
+    {"width": 600, "height": 200, "strokes": [[x, y, x, y, ...], [[x, y], [x, y], ...]],
+     "stroke_width": 3, "color": "#111111"}
+
+保存する形（CustomerConsent.signature。今までどおりデータ URL なので、
+表示側・PDF テンプレートの <img src> は変えなくてよい）:
+- 画像 → 可逆の WebP（SIGNATURE_IMAGE_FORMAT）。色の無い署名はグレースケールにする。
+  元のほうが小さければ元のまま
+- 筆跡 → 座標を整数に丸めて間引き（SIGNATURE_STROKE_TOLERANCE px 以内のずれ）、
+  相対座標のパスにした SVG（拡大しても線がぼやけない）
+"""
+import base64
+import binascii
+import io
+import json
+import re
+
+from django.conf import settings
+from rest_framework import serializers
+
+ACCEPTED_IMAGE_FORMATS = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+_DATA_URL = re.compile(r"^data:(?P<mime>[\w.+-]+/[\w.+-]+)?(?P<params>(;[^,;]*)*?);base64,", re.I)
+_COLOR = re.compile(r"^#[0-9a-fA-F]{3}([0-9a-fA-F]{3})?$")
+
+
+class SignatureError(ValueError):
+    """署名として受け付けられない"""
+
+
+# ------------------------------
+# 1. 画像
+# ------------------------------
+def decode_data_url(value):
+    """"data:<mime>;base64,<本文>" を bytes にする"""
+    match = _DATA_URL.match(value.strip())
+    if not match:
+        raise SignatureError("signature は base64 のデータ URL で送ってください")
+    # base64 は 4 文字 → 3 バイトなので、デコードする前に大きさを見る
+    if (len(value) - match.end()) * 3 // 4 > settings.SIGNATURE_MAX_UPLOAD_BYTES:
+        raise SignatureError("署名画像が大きすぎます")
+    try:
+        return base64.b64decode(value[match.end():].strip(), validate=False)
+    except (binascii.Error, ValueError):
+        raise SignatureError("signature の base64 を読めません")
+
+
+def read_upload(upload):
+    """multipart で送られたファイルを bytes にする"""
+    if upload.size is not None and upload.size > settings.SIGNATURE_MAX_UPLOAD_BYTES:
+        raise SignatureError("署名画像が大きすぎます")
+    return upload.read()
+
+
+def _is_grayscale(img):
+    """RGB の 3 チャンネルがすべての画素で等しいか"""
+    from PIL import ImageChops
+
+    r, g, b = img.convert("RGB").split()
+    return ImageChops.difference(r, g).getbbox() is None and ImageChops.difference(g, b).getbbox() is None
+
+
+def compact_image(raw):
+    """画像の bytes を、保存用のなるべく小さいデータ URL にする（可逆）"""
+    # Pillow は署名画像を受け取ったときだけ読み込む
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        img = Image.open(io.BytesIO(raw))
+        source_format = img.format
+        if source_format not in ACCEPTED_IMAGE_FORMATS:
+            raise SignatureError("署名画像は PNG / JPEG / WebP で送ってください")
+        width, height = img.size
+        if width * height > settings.SIGNATURE_MAX_PIXELS:
+            raise SignatureError("署名画像の画素数が大きすぎます")
+        img.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise SignatureError("署名画像を読めません")
+
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+    if img.mode in ("1", "L", "LA"):
+        mode = "LA" if has_alpha else "L"
+    elif _is_grayscale(img):
+        mode = "LA" if has_alpha else "L"
+    else:
+        mode = "RGBA" if has_alpha else "RGB"
+
+    fmt = settings.SIGNATURE_IMAGE_FORMAT.upper()
+    buffer = io.BytesIO()
+    if fmt == "WEBP":
+        img.convert(mode).save(buffer, "WEBP", lossless=True, quality=100, method=4)
+    else:
+        img.convert(mode).save(buffer, "PNG", optimize=True)
+    encoded = buffer.getvalue()
+
+    # JPEG など、可逆で詰め直すと元より大きくなるものは元のまま
+    if len(encoded) >= len(raw):
+        encoded, fmt = raw, source_format
+    return f"data:{ACCEPTED_IMAGE_FORMATS[fmt]};base64,{base64.b64encode(encoded).decode('ascii')}"
+
+
+# ------------------------------
+# 2. 筆跡
+# ------------------------------
+def _points(stroke):
+    """[x, y, x, y, ...] / [[x, y], ...] / [{"x": .., "y": ..}, ...] を [(x, y), ...] に"""
+    if stroke and isinstance(stroke[0], (int, float)):
+        if len(stroke) % 2:
+            raise SignatureError("筆跡の座標が x, y の組になっていません")
+        return list(zip(stroke[0::2], stroke[1::2]))
+    points = []
+    for point in stroke:
+        if isinstance(point, dict):
+            points.append((point.get("x"), point.get("y")))
+        elif isinstance(point, (list, tuple)) and len(point) >= 2:
+            points.append((point[0], point[1]))
+        else:
+            raise SignatureError("筆跡の座標を読めません")
+    return points
+
+
+def _simplify(points, tolerance):
+    """
+    Ramer–Douglas–Peucker: 線からのずれが tolerance（px）以内の中間点を落とす。
+    ペン入力は 1〜2px おきに点が来るので、見た目を変えずに点の数が大きく減る
+    """
+    if len(points) < 3 or tolerance <= 0:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = points[first], points[last]
+        dx, dy = x2 - x1, y2 - y1
+        length = (dx * dx + dy * dy) ** 0.5
+        farthest, index = 0.0, None
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if length:
+                distance = abs(dy * (px - x1) - dx * (py - y1)) / length
+            else:
+                distance = ((px - x1) ** 2 + (py - y1) ** 2) ** 0.5
+            if distance > farthest:
+                farthest, index = distance, i
+        if index is not None and farthest > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, kept in zip(points, keep) if kept]
+
+
+def _path(strokes):
+    """整数に丸めた座標で、2 点目以降を相対座標（l）にした SVG のパス"""
+    parts = []
+    for stroke in strokes:
+        x, y = stroke[0]
+        numbers = []
+        # 1 点だけの筆跡は長さ 0 の線（丸い端で点になる）
+        for nx, ny in stroke[1:] or stroke:
+            numbers += [nx - x, ny - y]
+            x, y = nx, ny
+        parts.append(f"M{stroke[0][0]} {stroke[0][1]}l" + " ".join(map(str, numbers)))
+    # 負の数はマイナス記号が区切りになるので空白を省く
+    return "".join(parts).replace(" -", "-")
+
+
+def strokes_to_svg(data):
+    """筆跡のベクトルを SVG のデータ URL にする"""
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            raise SignatureError("signature_strokes の JSON を読めません")
+    if isinstance(data, list):
+        data = {"strokes": data}
+    if not isinstance(data, dict) or not isinstance(data.get("strokes"), list):
+        raise SignatureError("signature_strokes には strokes（座標の配列）が必要です")
+
+    strokes = []
+    total = 0
+    try:
+        for stroke in data["strokes"]:
+            points = [(round(float(x)), round(float(y))) for x, y in _points(stroke)]
+            # 同じ座標が続く点は線の形を変えないので落とす
+            points = [p for i, p in enumerate(points) if i == 0 or p != points[i - 1]]
+            points = _simplify(points, settings.SIGNATURE_STROKE_TOLERANCE)
+            if points:
+                strokes.append(points)
+                total += len(points)
+        if not strokes:
+            raise SignatureError("筆跡が空です")
+        width = round(float(data.get("width") or max(x for s in strokes for x, _ in s) + 1))
+        height = round(float(data.get("height") or max(y for s in strokes for _, y in s) + 1))
+        stroke_width = round(float(data.get("stroke_width", 3)), 2)
+    except SignatureError:
+        raise
+    except (TypeError, ValueError):
+        raise SignatureError("筆跡の座標は数値で送ってください")
+
+    if total > settings.SIGNATURE_MAX_POINTS:
+        raise SignatureError("筆跡の点が多すぎます")
+    if not (0 < width <= 10000 and 0 < height <= 10000 and 0 < stroke_width <= 100):
+        raise SignatureError("筆跡の大きさが不正です")
+    color = data.get("color") or "#000"
+    if not _COLOR.match(color):
+        raise SignatureError("color は #rgb / #rrggbb で指定してください")
+
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}"><path d="{_path(strokes)}" fill="none" stroke="{color}" '
+        f'stroke-width="{stroke_width:g}" stroke-linecap="round" stroke-linejoin="round"/></svg>'
+    )
+    return "data:image/svg+xml;base64," + base64.b64encode(svg.encode("ascii")).decode("ascii")
+
+
+# ------------------------------
+# 3. DRF のフィールド
+# ------------------------------
+class SignatureField(serializers.Field):
+    """データ URL の文字列、または multipart のファイルを受け取り、圧縮したデータ URL を返す"""
+
+    def to_internal_value(self, data):
+        # 空文字は「署名なし」（必須かどうかは resolve_signature で見る）
+        if isinstance(data, str) and not data.strip():
+            return None
+        try:
+            if isinstance(data, str):
+                raw = decode_data_url(data)
+            elif hasattr(data, "read"):
+                raw = read_upload(data)
+            else:
+                raise SignatureError("signature はデータ URL かファイルで送ってください")
+            return compact_image(raw)
+        except SignatureError as e:
+            raise serializers.ValidationError(str(e))
+
+    def to_representation(self, value):
+        return value
+
+
+class SignatureStrokesField(serializers.Field):
+    """筆跡のベクトル（JSON、または multipart の JSON 文字列）を SVG のデータ URL にする"""
+
+    def to_internal_value(self, data):
+        try:
+            return strokes_to_svg(data)
+        except SignatureError as e:
+            raise serializers.ValidationError(str(e))
+
+    def to_representation(self, value):
+        return value
+
+
+def resolve_signature(attrs, required=True):
+    """
+    serializer.validate 用: signature_strokes があれば signature に入れ替える。
+    required なのにどちらも無ければ ValidationError
+    """
+    strokes = attrs.pop("signature_strokes", None)
+    if strokes is not None:
+        attrs["signature"] = strokes
+    if required and not attrs.get("signature"):
+        raise serializers.ValidationError({"signature": "signature か signature_strokes のどちらかが必要です"})
+    return attrs
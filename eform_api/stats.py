@@ -0,0 +1,73 @@
+# eform_api/stats.py
+"""
+彫師ダッシュボード向けの集計（DB 側で計算し、顧客行を Python に読み込まない）
+
+- 年齢の中央値は Customer.birth_date_value（型付きの生年月日）から計算する
+  * PostgreSQL: percentile_cont(0.5)
+  * SQLite: ROW_NUMBER() / COUNT() OVER () のウィンドウ関数で中央の 1〜2 行を平均
+  * それ以外の DB: 生年月日だけを読んで Python（statistics.median）で計算
+"""
+import statistics
+
+from django.db import connections, router
+from django.utils import timezone
+
+from .models import Customer
+
+
+_MEDIAN_AGE_SQL = {
+    "postgresql": """
+        SELECT percentile_cont(0.5) WITHIN GROUP (
+            ORDER BY (%s::date - birth_date_value) / 365
+        )
+        FROM {table}
+        WHERE user_id = %s AND is_active AND birth_date_value IS NOT NULL
+    """,
+    "sqlite": """
+        WITH ranked AS (
+            SELECT
+                age,
+                ROW_NUMBER() OVER (ORDER BY age) AS rn,
+                COUNT(*) OVER () AS cnt
+            FROM (
+                SELECT CAST(julianday(%s) - julianday(birth_date_value) AS INTEGER) / 365 AS age
+                FROM {table}
+                WHERE user_id = %s AND is_active AND birth_date_value IS NOT NULL
+            )
+        )
+        SELECT AVG(age) FROM ranked WHERE rn IN ((cnt + 1) / 2, (cnt + 2) / 2)
+    """,
+}
+
+
+def median_customer_age(user_id, today=None):
+    """
+    現役顧客（is_active=True）の年齢の中央値（整数, 対象なしなら None）
+
+    年齢は従来の Python 実装と同じく「経過日数 // 365」で数える。
+    """
+    today = today or timezone.localdate()
+    # ORM のクエリと同じくルーター（読み取りレプリカ）に従う
+    connection = connections[router.db_for_read(Customer)]
+    sql = _MEDIAN_AGE_SQL.get(connection.vendor)
+    if sql is None:
+        return _median_customer_age_python(user_id, today)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(table=Customer._meta.db_table), [today.isoformat(), user_id])
+        row = cursor.fetchone()
+
+    if not row or row[0] is None:
+        return None
+    return int(row[0])
+
+
+def _median_customer_age_python(user_id, today):
+    """SQL を用意していない DB 用。birth_date_value の列だけを読んで計算する"""
+    birth_dates = Customer.objects.filter(
+        user_id=user_id, is_active=True, birth_date_value__isnull=False,
+    ).values_list("birth_date_value", flat=True)
+    ages = [(today - birth_date).days // 365 for birth_date in birth_dates.iterator()]
+    if not ages:
+        return None
+    return int(statistics.median(ages))
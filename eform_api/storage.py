@@ -0,0 +1,81 @@
+# eform_api/storage.py
+"""
+S3 / MinIO クライアントの取得
+
+- boto3 は import だけで 70ms 前後かかるので、初めて使うときに読み込む
+  （gunicorn の master で先読みする場合は eform_api.warmup を参照）
+- クライアントの生成も重いのでプロセスごとに 1 つだけ作って使い回す
+  （boto3 のクライアントはスレッドセーフ。fork 後は pid が変わるので作り直す）
+"""
+import os
+import threading
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_clients = {}
+
+
+def get_s3_client():
+    """プロフィール画像などを置く S3 バケット用のクライアント"""
+    key = ("s3", os.getpid())
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            import boto3
+
+            client = boto3.client(
+                "s3",
+                region_name=settings.AWS_S3_REGION_NAME,
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            )
+            _clients[key] = client
+    return client
+
+
+def get_probe_s3_client(target="s3"):
+    """
+    ヘルスチェック用のクライアント（target: "s3" / "minio"）。
+    応答が無いときに待たないよう、タイムアウトを短くしてリトライもしない。
+    """
+    key = (f"probe-{target}", os.getpid())
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            import boto3
+            from botocore.config import Config
+
+            timeout = settings.HEALTH_CHECK_TIMEOUT_SECONDS
+            config = Config(
+                connect_timeout=timeout,
+                read_timeout=timeout,
+                retries={"total_max_attempts": 1},
+            )
+            if target == "minio":
+                client = boto3.client(
+                    "s3",
+                    endpoint_url=settings.MINIO_ENDPOINT,
+                    region_name=settings.MINIO_REGION_NAME,
+                    aws_access_key_id=settings.MINIO_ACCESS_KEY,
+                    aws_secret_access_key=settings.MINIO_SECRET_KEY,
+                    config=config,
+                )
+            else:
+                client = boto3.client(
+                    "s3",
+                    region_name=settings.AWS_S3_REGION_NAME,
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    config=config,
+                )
+            _clients[key] = client
+    return client
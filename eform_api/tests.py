@@ -0,0 +1,985 @@
+# eform_api/tests.py
+"""
+python manage.py test eform_api
+
+集計・二重送信対策など、壊れても画面からは気づきにくいところのテスト
+"""
+import base64
+import io
+import json
+import random
+import re
+import unicodedata
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from importlib import import_module
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import consent_documents, idempotency
+from . import serializers as api_serializers
+from .authentication import CachedJWTAuthentication
+from .db import routers
+from .middleware import ReplicaRoutingMiddleware
+from .pagination import ConsentHistoryPagination
+from .pdf_renderer import BlockedUrl, url_fetcher_for
+from .customer_import import claim_next_job, run_job
+from .models import (
+    ConsentDailyRollup,
+    ConsentEntryToken,
+    ConsentDocumentBody,
+    ConsentDocumentVersion,
+    Customer,
+    CustomerConsent,
+    CustomerImportJob,
+    EmailOutbox,
+    IdempotencyRecord,
+    TattooArtist,
+    UserAgreement,
+)
+from .rollups import consent_timeseries, rebuild_consent_rollups, refreshing_customer_rollups
+from .signatures import SignatureField, SignatureStrokesField
+from .stats import median_customer_age
+from .utils import normalize_phone_number, normalize_phone_numbers
+
+User = get_user_model()
+
+
+def _at(day, hour=12):
+    return timezone.make_aware(datetime(2024, 4, day, hour), timezone.get_current_timezone())
+
+
+# =========================
+# 1. 同意書の日次ロールアップ（eform_api.rollups）
+# =========================
+class ConsentRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="artist", password="pw123456")
+        self.customer = Customer.objects.create(user=self.user, full_name="山田 花子")
+        self.other = Customer.objects.create(user=self.user, full_name="佐藤 太郎")
+
+    def consent(self, customer, day, **kwargs):
+        return CustomerConsent.objects.create(
+            customer=customer, consent_version="1.0", signed_at=_at(day), **kwargs
+        )
+
+    def rollups(self):
+        return set(
+            ConsentDailyRollup.objects.values_list(
+                "user_id", "date", "consent_count", "new_consent_count", "returning_consent_count"
+            )
+        )
+
+    def assertMatchesRebuild(self):
+        """差分更新の結果が、生データからの作り直しと同じになっているか"""
+        incremental = self.rollups()
+        rebuild_consent_rollups()
+        self.assertEqual(incremental, self.rollups())
+
+    def test_save_counts_new_and_returning(self):
+        self.consent(self.customer, 1)
+        self.consent(self.customer, 2)
+        self.consent(self.other, 2)
+
+        day2 = ConsentDailyRollup.objects.get(user=self.user, date=_at(2).date())
+        self.assertEqual((day2.consent_count, day2.new_consent_count, day2.returning_consent_count), (2, 1, 1))
+        self.assertMatchesRebuild()
+
+    def test_moving_first_consent_reclassifies_next_visit(self):
+        first = self.consent(self.customer, 1)
+        self.consent(self.customer, 3)
+
+        first.signed_at = _at(5)
+        first.save()
+
+        self.assertFalse(ConsentDailyRollup.objects.filter(date=_at(1).date()).exists())
+        day3 = ConsentDailyRollup.objects.get(date=_at(3).date())
+        self.assertEqual((day3.new_consent_count, day3.returning_consent_count), (1, 0))
+        self.assertMatchesRebuild()
+
+    def test_delete_and_deactivate(self):
+        first = self.consent(self.customer, 1)
+        second = self.consent(self.customer, 2)
+
+        first.delete()
+        self.assertMatchesRebuild()
+
+        second.is_active = False
+        second.save()
+        self.assertEqual(self.rollups(), set())
+
+    def test_queryset_update_needs_explicit_refresh(self):
+        self.consent(self.customer, 1)
+        self.consent(self.customer, 2)
+
+        # QuerySet.update は save() を通らないので、そのままではロールアップが古いまま
+        CustomerConsent.objects.filter(customer=self.customer, signed_at=_at(1)).update(is_active=False)
+        stale = self.rollups()
+        rebuild_consent_rollups()
+        self.assertNotEqual(stale, self.rollups())
+
+        with refreshing_customer_rollups([self.customer.pk]):
+            CustomerConsent.objects.filter(customer=self.customer).update(signed_at=_at(1, hour=9))
+        self.assertMatchesRebuild()
+
+    def test_queryset_delete_with_refresh(self):
+        self.consent(self.customer, 1)
+        self.consent(self.customer, 2)
+        self.consent(self.other, 2)
+
+        with refreshing_customer_rollups([self.customer.pk]):
+            Customer.objects.filter(pk=self.customer.pk).delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(ConsentDailyRollup.objects.get().consent_count, 1)
+
+    def test_customer_soft_delete_does_not_change_rollups(self):
+        self.consent(self.customer, 1)
+        self.consent(self.other, 1)
+        before = self.rollups()
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(
+            "/api/customers/bulk-delete/", {"uuids": [str(self.customer.uuid)]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # 集計は顧客の is_active を見ないので、一括削除の後もそのまま正しい
+        self.assertEqual(before, self.rollups())
+        self.assertMatchesRebuild()
+
+    def test_timeseries_first_bucket_starts_at_start(self):
+        # 2024-04-01 は月曜
+        self.consent(self.customer, 2)
+        self.consent(self.customer, 3)
+        self.consent(self.other, 10)
+        start, end = _at(3).date(), _at(10).date()
+
+        weeks = consent_timeseries(self.user.pk, start, end, granularity="week")
+        self.assertEqual(
+            [(p["period_start"], p["consent_count"]) for p in weeks],
+            [(start, 1), (_at(8).date(), 1)],
+        )
+        months = consent_timeseries(self.user.pk, start, end, granularity="month")
+        self.assertEqual([(p["period_start"], p["consent_count"]) for p in months], [(start, 2)])
+        days = consent_timeseries(self.user.pk, start, end)
+        self.assertEqual(days[0]["period_start"], start)
+        self.assertEqual(len(days), 8)
+        self.assertEqual(sum(p["consent_count"] for p in days), 2)
+
+    def test_rebuild_range(self):
+        self.consent(self.customer, 1)
+        self.consent(self.customer, 10)
+        ConsentDailyRollup.objects.all().delete()
+
+        created = rebuild_consent_rollups(since=_at(5).date(), until=_at(15).date())
+        self.assertEqual(created, 1)
+        self.assertEqual(
+            list(ConsentDailyRollup.objects.values_list("date", flat=True)), [_at(10).date()]
+        )
+
+
+# =========================
+# 2. 顧客 CSV 取り込みジョブの確保（eform_api.customer_import）
+# =========================
+@override_settings(CUSTOMER_IMPORT_LOCK_SECONDS=600, CUSTOMER_IMPORT_MAX_ATTEMPTS=3)
+class CustomerImportClaimTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="artist", password="pw123456")
+
+    def running_job(self, locked_seconds_ago, attempts=1):
+        locked_at = timezone.now() - timedelta(seconds=locked_seconds_ago)
+        return CustomerImportJob.objects.create(
+            user=self.user, status=CustomerImportJob.STATUS_RUNNING,
+            attempts=attempts, started_at=locked_at, locked_at=locked_at,
+        )
+
+    def test_claims_pending(self):
+        job = CustomerImportJob.objects.create(user=self.user)
+        claimed = claim_next_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual((claimed.status, claimed.attempts), (CustomerImportJob.STATUS_RUNNING, 1))
+        self.assertIsNone(claim_next_job())
+
+    def test_running_job_is_left_alone_while_locked(self):
+        self.running_job(locked_seconds_ago=60)
+        self.assertIsNone(claim_next_job())
+
+    def test_reclaims_stale_running_job(self):
+        job = self.running_job(locked_seconds_ago=601)
+        claimed = claim_next_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.attempts, 2)
+        self.assertGreater(claimed.locked_at, timezone.now() - timedelta(seconds=5))
+
+    def test_reclaimed_job_resumes_after_committed_rows(self):
+        from django.core.files.base import ContentFile
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+        # 電話番号の無い行は照合できないので、やり直すと二重に作られてしまう
+        lines = ["full_name"] + [f"顧客{i}" for i in range(5)]
+        job = CustomerImportJob.objects.create(user=self.user)
+        job.file.save("customers.csv", ContentFile("\n".join(lines).encode("utf-8")))
+        claimed = claim_next_job()
+
+        # 2 チャンク目の途中でワーカーが止まった（そのチャンクはロールバック）
+        from . import customer_import
+
+        original = customer_import._import_chunk
+        calls = []
+
+        def crash_on_second_chunk(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise SystemExit("worker killed")
+            return original(*args, **kwargs)
+
+        customer_import._import_chunk = crash_on_second_chunk
+        try:
+            with self.assertRaises(SystemExit):
+                run_job(claimed, chunk_size=2)
+        finally:
+            customer_import._import_chunk = original
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows, job.created_count), (CustomerImportJob.STATUS_RUNNING, 2, 2))
+
+        CustomerImportJob.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(seconds=601))
+        job = run_job(claim_next_job(), chunk_size=2)
+        self.assertEqual((job.status, job.rows, job.created_count), (CustomerImportJob.STATUS_DONE, 5, 5))
+        self.assertEqual(
+            sorted(Customer.objects.filter(user=self.user).values_list("full_name", flat=True)),
+            [f"顧客{i}" for i in range(5)],
+        )
+
+    def test_gives_up_after_max_attempts(self):
+        job = self.running_job(locked_seconds_ago=601, attempts=3)
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, CustomerImportJob.STATUS_FAILED)
+
+
+# =========================
+# 3. public API の二重送信対策（eform_api.idempotency）
+# =========================
+@override_settings(IDEMPOTENCY_TTL_SECONDS=3600, IDEMPOTENCY_LOCK_SECONDS=60)
+class IdempotencyClaimTests(TestCase):
+    def test_first_claim_then_replay(self):
+        first = idempotency.claim("entry", "k1", "hash-a")
+        self.assertIsNotNone(first.record)
+
+        idempotency.finish(first.record, 201, {"consent_uuid": "c1"})
+        again = idempotency.claim("entry", "k1", "hash-a")
+        self.assertIsNone(again.record)
+        self.assertEqual((again.status, again.body, again.replayed), (201, {"consent_uuid": "c1"}, True))
+        self.assertEqual(idempotency.replay_headers(again), {idempotency.REPLAYED_HEADER: "true"})
+
+    def test_in_progress_is_409(self):
+        idempotency.claim("entry", "k1", "hash-a")
+        busy = idempotency.claim("entry", "k1", "hash-a")
+        self.assertEqual((busy.record, busy.status, busy.replayed), (None, 409, False))
+        self.assertEqual(idempotency.replay_headers(busy), {"Retry-After": "1"})
+
+    def test_other_request_with_same_key_is_422(self):
+        first = idempotency.claim("entry", "k1", "hash-a")
+        idempotency.finish(first.record, 201, {})
+        self.assertEqual(idempotency.claim("entry", "k1", "hash-b").status, 422)
+
+    def test_keys_are_per_scope(self):
+        idempotency.claim("entry", "k1", "hash-a")
+        self.assertIsNotNone(idempotency.claim("renew", "k1", "hash-a").record)
+
+    def test_release_and_5xx_free_the_key(self):
+        first = idempotency.claim("entry", "k1", "hash-a")
+        idempotency.release(first.record)
+        second = idempotency.claim("entry", "k1", "hash-a")
+        self.assertIsNotNone(second.record)
+
+        idempotency.finish(second.record, 503, {"detail": "x"})
+        self.assertFalse(IdempotencyRecord.objects.exists())
+        self.assertIsNotNone(idempotency.claim("entry", "k1", "hash-a").record)
+
+    def test_stale_lock_is_taken_over(self):
+        first = idempotency.claim("entry", "k1", "hash-a")
+        IdempotencyRecord.objects.filter(pk=first.record.pk).update(
+            created_at=timezone.now() - timedelta(seconds=61)
+        )
+        takeover = idempotency.claim("entry", "k1", "hash-a")
+        self.assertIsNotNone(takeover.record)
+        self.assertNotEqual(takeover.record.pk, first.record.pk)
+        self.assertEqual(IdempotencyRecord.objects.count(), 1)
+
+    def test_finished_record_is_not_taken_over_until_expired(self):
+        first = idempotency.claim("entry", "k1", "hash-a")
+        idempotency.finish(first.record, 201, {})
+        IdempotencyRecord.objects.update(created_at=timezone.now() - timedelta(seconds=61))
+        self.assertTrue(idempotency.claim("entry", "k1", "hash-a").replayed)
+
+        IdempotencyRecord.objects.update(expires_at=timezone.now())
+        self.assertIsNotNone(idempotency.claim("entry", "k1", "hash-a").record)
+
+
+class IdempotentEntryViewTests(TestCase):
+    url = "/api/consent/public/entry/"
+
+    def setUp(self):
+        user = User.objects.create_user(username="artist", password="pw123456")
+        artist = TattooArtist.objects.create(user=user, artist_name="artist")
+        self.token = ConsentEntryToken.objects.create(artist=artist)
+        self.client = APIClient()
+
+    def payload(self, **overrides):
+        data = {
+            "entry_token": str(self.token.uuid),
+            "full_name": "山田 花子",
+            "gender": "female",
+            "birth_date": "1990-01-01",
+            "prefecture": "東京都",
+            "city": "渋谷区",
+            "phone_number": "09011112222",
+            "consent_version": "1.0",
+            "privacy_agreement_version": "1.0",
+            "signature_strokes": {"width": 100, "height": 50, "strokes": [[1, 1, 50, 25, 90, 40]]},
+        }
+        data.update(overrides)
+        return data
+
+    def post(self, data, key="submit-1"):
+        headers = {idempotency.HEADER: key} if key else {}
+        return self.client.post(self.url, data, format="json", headers=headers)
+
+    def test_resend_replays_first_response(self):
+        first = self.post(self.payload())
+        self.assertEqual(first.status_code, 201)
+
+        second = self.post(self.payload())
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second.headers.get(idempotency.REPLAYED_HEADER), "true")
+        self.assertEqual(CustomerConsent.objects.count(), 1)
+
+    def test_same_key_with_other_content_is_422(self):
+        self.post(self.payload())
+        response = self.post(self.payload(full_name="別人"))
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(CustomerConsent.objects.count(), 1)
+
+    def test_validation_error_is_not_stored(self):
+        invalid = self.payload()
+        del invalid["signature_strokes"]
+        self.assertEqual(self.post(invalid).status_code, 400)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+        self.assertEqual(self.post(self.payload()).status_code, 201)
+
+    def test_body_submission_uuid_and_bad_key(self):
+        data = self.payload(submission_uuid="0b6f0f5e-8c1a-4a8e-9a43-2f1a1c7d5e11")
+        self.assertEqual(self.post(data, key=None).status_code, 201)
+        self.assertEqual(self.post(data, key=None).headers.get(idempotency.REPLAYED_HEADER), "true")
+
+        self.assertEqual(self.post(self.payload(), key="空白 を含む").status_code, 400)
+
+    def test_without_key_every_request_is_processed(self):
+        self.post(self.payload(), key=None)
+        self.post(self.payload(), key=None)
+        self.assertEqual(CustomerConsent.objects.count(), 2)
+
+
+# =========================
+# 4. JWT 認証のユーザーキャッシュ（eform_api.authentication）
+# =========================
+@override_settings(JWT_USER_CACHE_SECONDS=60, JWT_USER_CACHE_ALIAS="default", JWT_TRUST_CLAIMS=False)
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.user = User.objects.create_user(username="artist", password="pw123456")
+        self.header = f"Bearer {AccessToken.for_user(self.user)}"
+
+    def authenticate(self):
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=self.header)
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    @override_settings(LOCAL_CACHE_IS_SHARED=True)
+    def test_second_request_is_served_from_cache(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.username, "artist")
+
+    @override_settings(LOCAL_CACHE_IS_SHARED=True)
+    def test_save_evicts_and_inactive_user_is_rejected(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    @override_settings(LOCAL_CACHE_IS_SHARED=True)
+    def test_delete_evicts(self):
+        self.authenticate()
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    @override_settings(LOCAL_CACHE_IS_SHARED=False)
+    def test_process_local_cache_is_not_used(self):
+        self.authenticate()
+        # 他のワーカーで無効化された場合と同じく、シグナルを通さずに更新する
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertNumQueries(1), self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+
+# =========================
+# 5. 読み取りレプリカへの振り分け（eform_api.db.routers）
+# =========================
+# DB には繋がず、ミドルウェアの中でルーターがどこを選ぶかだけを見る
+@override_settings(
+    DATABASES={**settings.DATABASES, "replica": {**settings.DATABASES["default"], "TEST": {"MIRROR": "default"}}},
+    DB_REPLICA_STICKY_SECONDS=10,
+    DB_REPLICA_PIN_CACHE_ALIAS="default",
+    LOCAL_CACHE_IS_SHARED=True,
+)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.factory = RequestFactory()
+        self.user = User(pk=42, username="artist")
+        self.header = f"Bearer {AccessToken.for_user(self.user)}"
+
+    def call(self, method, view=None, write=False, user=None, **extra):
+        seen = {}
+
+        def get_response(request):
+            if view is not None:
+                middleware.process_view(request, view, (), {})
+            if write:
+                router.db_for_write(Customer)
+            seen["read"] = router.db_for_read(Customer)
+            if user is not None:
+                request.user = user
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request = getattr(self.factory, method)("/", HTTP_AUTHORIZATION=self.header, **extra)
+        response = middleware(request)
+        return seen["read"], response
+
+    def test_safe_read_goes_to_replica(self):
+        self.assertEqual(self.call("get")[0], "replica")
+        self.assertEqual(self.call("post")[0], "default")
+
+    def test_reads_after_write_are_pinned_by_user(self):
+        read, response = self.call("post", write=True, user=self.user)
+        self.assertEqual(read, "default")
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+
+        # クッキーの付かない（別サイトの）XHR でも、同じユーザーなら default
+        self.assertEqual(self.call("get")[0], "default")
+
+        other = User(pk=43, username="other")
+        self.header = f"Bearer {AccessToken.for_user(other)}"
+        self.assertEqual(self.call("get")[0], "replica")
+
+    def test_pin_cookie_without_login(self):
+        self.header = ""
+        _, response = self.call("post", write=True)
+        cookie = response.cookies[routers.PIN_COOKIE].value
+        self.factory.cookies[routers.PIN_COOKIE] = cookie
+        self.assertEqual(self.call("get")[0], "default")
+
+    def test_view_override(self):
+        @routers.read_from_primary
+        def primary_view(request):
+            pass
+
+        @routers.read_from_replica
+        def replica_view(request):
+            pass
+
+        self.assertEqual(self.call("get", view=primary_view)[0], "default")
+        self.assertEqual(self.call("post", view=replica_view)[0], "replica")
+
+    @override_settings(LOCAL_CACHE_IS_SHARED=False)
+    def test_refuses_process_local_pin_cache(self):
+        self.assertIsNotNone(routers.pin_cache_problem())
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+
+# =========================
+# 6. PDF 生成で読みに行く URL（eform_api.pdf_renderer）
+# =========================
+class PdfUrlFetcherTests(SimpleTestCase):
+    def test_blocks_local_files_and_network(self):
+        fetch = url_fetcher_for(["file:///srv/fonts/NotoSansJP.ttf"])
+        for url in (
+            "file:///etc/passwd",
+            "http://169.254.169.254/latest/meta-data/",
+            "https://example.com/a.png",
+            "FILE:///etc/passwd",
+            "//169.254.169.254/",
+        ):
+            with self.subTest(url=url), self.assertRaises(BlockedUrl):
+                fetch(url)
+
+
+# =========================
+# 7. 署名の受け取り（eform_api.signatures）
+# =========================
+def _image(fmt="PNG", size=(60, 20), mode="L", color=255):
+    from PIL import Image, ImageDraw
+
+    img = Image.new(mode, size, color)
+    ImageDraw.Draw(img).line([(2, 2), (size[0] - 3, size[1] - 3)], fill=0, width=2)
+    buffer = io.BytesIO()
+    img.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def _data_url(raw, mime="image/png"):
+    return f"data:{mime};base64,{base64.b64encode(raw).decode('ascii')}"
+
+
+def _decode(data_url):
+    header, body = data_url.split(",", 1)
+    return header, base64.b64decode(body)
+
+
+@override_settings(
+    SIGNATURE_IMAGE_FORMAT="webp",
+    SIGNATURE_MAX_UPLOAD_BYTES=64 * 1024,
+    SIGNATURE_MAX_PIXELS=200 * 200,
+    SIGNATURE_MAX_POINTS=100,
+    SIGNATURE_STROKE_TOLERANCE=0.75,
+)
+class SignatureFieldTests(SimpleTestCase):
+    def signature(self, value):
+        return SignatureField().to_internal_value(value)
+
+    def strokes(self, value):
+        return SignatureStrokesField().to_internal_value(value)
+
+    def assertRejected(self, convert, value, message):
+        with self.assertRaises(serializers.ValidationError) as ctx:
+            convert(value)
+        self.assertIn(message, str(ctx.exception.detail))
+
+    def test_data_url_is_stored_as_readable_image(self):
+        from PIL import Image
+
+        header, raw = _decode(self.signature(_data_url(_image())))
+        self.assertEqual(header, "data:image/webp;base64")
+        img = Image.open(io.BytesIO(raw))
+        self.assertEqual((img.format, img.size), ("WEBP", (60, 20)))
+
+    def test_multipart_upload(self):
+        upload = SimpleUploadedFile("signature.png", _image(), content_type="image/png")
+        header, _ = _decode(self.signature(upload))
+        self.assertEqual(header, "data:image/webp;base64")
+
+    def test_keeps_original_when_smaller(self):
+        from PIL import Image
+
+        # ノイズの多い写真のような JPEG は、可逆の WebP にすると元より大きくなる
+        noise = Image.frombytes("RGB", (60, 60), bytes(range(256)) * 42 + bytes(48))
+        buffer = io.BytesIO()
+        noise.save(buffer, "JPEG", quality=30)
+        raw = buffer.getvalue()
+        self.assertEqual(self.signature(_data_url(raw, "image/jpeg")), _data_url(raw, "image/jpeg"))
+
+    def test_empty_means_no_signature(self):
+        self.assertIsNone(self.signature("  "))
+
+    def test_rejected_inputs(self):
+        self.assertRejected(self.signature, "not a data url", "データ URL")
+        self.assertRejected(self.signature, "data:image/png;base64," + "A" * 2000, "読めません")
+        self.assertRejected(self.signature, _data_url(_image("GIF"), "image/gif"), "PNG / JPEG / WebP")
+        self.assertRejected(self.signature, 123, "データ URL かファイル")
+
+    def test_size_and_pixel_limits(self):
+        too_large = "data:image/png;base64," + "A" * (90 * 1024)
+        self.assertRejected(self.signature, too_large, "大きすぎます")
+        upload = SimpleUploadedFile("big.png", b"0" * (65 * 1024), content_type="image/png")
+        self.assertRejected(self.signature, upload, "大きすぎます")
+        self.assertRejected(self.signature, _data_url(_image(size=(300, 200))), "画素数")
+
+    def test_strokes_become_simplified_svg(self):
+        header, svg = _decode(self.strokes({
+            "width": 100, "height": 50, "color": "#111",
+            # 一直線上の中間点は落ちる
+            "strokes": [[0, 0, 10, 10, 20, 20, 30, 30], [[5, 40], [5, 40]]],
+        }))
+        self.assertEqual(header, "data:image/svg+xml;base64")
+        self.assertIn(b'd="M0 0l30 30M5 40l0 0"', svg)
+        self.assertIn(b'stroke="#111"', svg)
+
+    def test_strokes_as_json_string(self):
+        value = json.dumps([[{"x": 1, "y": 2}, {"x": 3.4, "y": 4.6}]])
+        _, svg = _decode(self.strokes(value))
+        self.assertIn(b'd="M1 2l2 3"', svg)
+
+    def test_stroke_limits_and_errors(self):
+        many = {"strokes": [[i, (i % 2) * 10] for i in range(101)]}
+        self.assertRejected(self.strokes, {"strokes": [sum(many["strokes"], [])]}, "多すぎます")
+        self.assertRejected(self.strokes, {"strokes": [[1, 2, 3]]}, "x, y の組")
+        self.assertRejected(self.strokes, {"strokes": [[["a", "b"]]]}, "数値")
+        self.assertRejected(self.strokes, {"strokes": []}, "空です")
+        self.assertRejected(self.strokes, {"width": 20000, "strokes": [[1, 1]]}, "大きさ")
+        self.assertRejected(self.strokes, {"color": "red", "strokes": [[1, 1]]}, "color")
+        self.assertRejected(self.strokes, "{", "JSON")
+
+
+class SubmitCustomerConsentTests(TestCase):
+    def test_creates_consent_for_own_customer(self):
+        user = User.objects.create_user(username="artist", password="pw123456")
+        customer = Customer.objects.create(user=user, full_name="山田 花子")
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.post("/api/customers/submit-consent/", {
+            "customer_uuid": str(customer.uuid),
+            "consent_version": "1.0",
+            "privacy_agreement_version": "1.0",
+            "signature_strokes": {"strokes": [[1, 1, 40, 20]]},
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(customer.consents.count(), 1)
+
+
+# =========================
+# 8. シリアライザの遅延 import（eform_api.serializers）
+# =========================
+class SerializerExportsTests(SimpleTestCase):
+    def test_every_exported_name_resolves_to_its_module(self):
+        for name, module_name in api_serializers._EXPORTS.items():
+            module = import_module(f"eform_api.serializers.{module_name}")
+            self.assertIs(getattr(api_serializers, name), getattr(module, name), name)
+
+    def test_unknown_name_raises_attribute_error(self):
+        with self.assertRaises(AttributeError):
+            api_serializers.NoSuchSerializer
+
+
+# =========================
+# 9. ダッシュボードの集計（eform_api.stats）
+# =========================
+class MedianCustomerAgeTests(TestCase):
+    def test_median_age_reads_through_router(self):
+        user = User.objects.create_user(username="artist", password="pw123456")
+        for birth_date in ("2000-01-01", "1990-01-01", "1980-01-01", "1970-01-01"):
+            Customer.objects.create(user=user, full_name="山田 花子", birth_date=birth_date)
+        Customer.objects.create(user=user, full_name="退会", birth_date="1950-01-01", is_active=False)
+
+        with mock.patch("eform_api.stats.router.db_for_read", return_value="default") as db_for_read:
+            age = median_customer_age(user.pk, today=datetime(2025, 1, 1).date())
+        # 25, 35, 45, 55 歳の中央値
+        self.assertEqual(age, 40)
+        db_for_read.assert_called_with(Customer)
+
+
+# =========================
+# 10. メール送信キューの掃除（prune_email_outbox）
+# =========================
+@override_settings(EMAIL_OUTBOX_RETENTION_DAYS=7)
+class PruneEmailOutboxTests(TestCase):
+    def make(self, status, age_days):
+        at = timezone.now() - timedelta(days=age_days)
+        return EmailOutbox.objects.create(
+            subject="パスワード再設定", body_text="https://example.com/reset/xxx", to=["a@example.com"],
+            status=status, next_attempt_at=at,
+            sent_at=at if status == EmailOutbox.STATUS_SENT else None,
+        )
+
+    def test_deletes_only_finished_rows_past_retention(self):
+        old_sent = self.make(EmailOutbox.STATUS_SENT, 8)
+        old_failed = self.make(EmailOutbox.STATUS_FAILED, 8)
+        keep = [
+            self.make(EmailOutbox.STATUS_SENT, 6),
+            self.make(EmailOutbox.STATUS_FAILED, 6),
+            self.make(EmailOutbox.STATUS_PENDING, 30),
+            self.make(EmailOutbox.STATUS_SENDING, 30),
+        ]
+
+        call_command("prune_email_outbox", "--dry-run", stdout=io.StringIO())
+        self.assertEqual(EmailOutbox.objects.count(), 6)
+
+        call_command("prune_email_outbox", "--batch-size", "1", stdout=io.StringIO())
+        self.assertFalse(EmailOutbox.objects.filter(pk__in=[old_sent.pk, old_failed.pk]).exists())
+        self.assertCountEqual(EmailOutbox.objects.values_list("pk", flat=True), [r.pk for r in keep])
+
+    def test_days_option_overrides_setting(self):
+        self.make(EmailOutbox.STATUS_SENT, 2)
+        call_command("prune_email_outbox", "--days", "1", stdout=io.StringIO())
+        self.assertFalse(EmailOutbox.objects.exists())
+
+
+# =========================
+# 11. 電話番号の正規化（eform_api.utils）
+# =========================
+def _reference_normalize_phone_number(phone):
+    """正規表現 4 本で書いていた以前の実装（結果が変わっていないことの確認用）"""
+    if not phone:
+        return ''
+    phone = unicodedata.normalize('NFKC', phone)
+    phone = re.sub(r'^[A-Za-z\s:]+', '', phone)
+    phone = re.sub(r'[()\[\]\s\-–ー−―‐]', '', phone)
+    phone = re.sub(r'^\+?81', '0', phone)
+    return re.sub(r'\D', '', phone)
+
+
+class NormalizePhoneNumberTests(SimpleTestCase):
+    SAMPLES = [
+        "", None, "09012345678", "090-1234-5678", "090 1234 5678", "(090)1234-5678",
+        "０９０－１２３４－５６７８", "０９０ー１２３４ー５６７８", "090−1234―5678", "090‐1234–5678",
+        "+81 90-1234-5678", "+819012345678", "819012345678", "81-90-1234-5678", "(+81)90-1234-5678",
+        "＋８１　９０　１２３４　５６７８", "TEL:090-1234-5678", "Tel: 03-1234-5678", "Phone 0312345678",
+        "tel:+81 3 1234 5678", "03.1234.5678", "090/1234/5678", "[03]1234-5678", "\t090 1234\n5678",
+        "810", "81", "+8", "0081312345678", "内線123", "090-1234-5678 内線 12", "abc", "携帯:090-1234-5678",
+        "\u3000090\u30001234\u30005678", "①②③", "090-1234-5678#2",
+    ]
+
+    def test_matches_previous_implementation(self):
+        for phone in self.SAMPLES:
+            with self.subTest(phone=phone):
+                self.assertEqual(normalize_phone_number(phone), _reference_normalize_phone_number(phone))
+
+    def test_matches_previous_implementation_on_random_inputs(self):
+        rng = random.Random(38)
+        alphabet = "0123456789０１２３４５６７８９+＋81 　-－ー−―‐–()（）[]TELtel:：.#内線"
+        for _ in range(5000):
+            phone = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 16)))
+            self.assertEqual(normalize_phone_number(phone), _reference_normalize_phone_number(phone), phone)
+
+    def test_batch_matches_single(self):
+        phones = [p for p in self.SAMPLES if p is not None] * 2
+        self.assertEqual(normalize_phone_numbers(phones), [normalize_phone_number(p) for p in phones])
+
+
+# =========================
+# 12. トークンに載せるクレーム（eform_api.authentication.user_claims）
+# =========================
+class TokenClaimsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="artist", password="pw123456")
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post(
+            "/api/auth/token/", {"username": "artist", "password": "pw123456"}, format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return AccessToken(response.data["access"]), RefreshToken(response.data["refresh"]), response.data
+
+    def test_login_without_profile(self):
+        access, refresh, _ = self.login()
+        for token in (access, refresh):
+            self.assertIsNone(token["artist_uuid"])
+            self.assertFalse(token["has_profile"])
+            self.assertFalse(token["agreed"])
+            self.assertIsNone(token["terms_version"])
+            self.assertIsNone(token["privacy_version"])
+
+    def test_login_with_profile_and_agreement(self):
+        artist = TattooArtist.objects.create(user=self.user, artist_name="artist")
+        now = timezone.now()
+        UserAgreement.objects.create(
+            user=self.user, terms_version="t2", terms_agreed_at=now,
+            privacy_version="p3", privacy_agreed_at=now,
+        )
+        access, refresh, _ = self.login()
+        for token in (access, refresh):
+            self.assertEqual(token["artist_uuid"], str(artist.uuid))
+            self.assertTrue(token["has_profile"])
+            self.assertTrue(token["agreed"])
+            self.assertEqual(token["terms_version"], "t2")
+            self.assertEqual(token["privacy_version"], "p3")
+
+    def test_refresh_reloads_claims(self):
+        _, _, data = self.login()
+        artist = TattooArtist.objects.create(user=self.user, artist_name="artist")
+        now = timezone.now()
+        UserAgreement.objects.create(
+            user=self.user, terms_version="t2", terms_agreed_at=now,
+            privacy_version="p3", privacy_agreed_at=now,
+        )
+
+        response = self.client.post("/api/auth/token/refresh/", {"refresh": data["refresh"]}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        access = AccessToken(response.data["access"])
+        self.assertEqual(access["artist_uuid"], str(artist.uuid))
+        self.assertTrue(access["has_profile"])
+        self.assertTrue(access["agreed"])
+        self.assertEqual(access["terms_version"], "t2")
+        self.assertEqual(access["privacy_version"], "p3")
+        self.assertEqual(str(access["user_id"]), str(self.user.pk))
+
+
+# =========================
+# 13. 同意書の本文の登録（eform_api.consent_documents）
+# =========================
+class ConsentDocumentRegistryTests(TestCase):
+    BODY = "<h1>施術同意書</h1>\n<p>{{ customer.full_name }} 様</p>"
+
+    def setUp(self):
+        for cache in (consent_documents._versions, consent_documents._missing, consent_documents._compiled):
+            cache.clear()
+
+    def register(self, version, body, kind=consent_documents.KIND_CONSENT):
+        return consent_documents.register_document(kind, version, body, title="同意書")
+
+    def test_same_text_is_stored_once(self):
+        v1, created1 = self.register("v1", self.BODY)
+        # 改行コードと前後の空白だけ違う本文は同じもの
+        v2, created2 = self.register("v2", "  " + self.BODY.replace("\n", "\r\n") + "\r\n")
+        privacy, _ = self.register("v1", self.BODY, kind=consent_documents.KIND_PRIVACY)
+
+        self.assertTrue(created1 and created2)
+        self.assertEqual(ConsentDocumentBody.objects.count(), 1)
+        self.assertEqual({v1.body_id, v2.body_id, privacy.body_id}, {ConsentDocumentBody.objects.get().pk})
+        self.assertEqual(
+            ConsentDocumentBody.objects.get().sha256,
+            consent_documents.body_sha256(consent_documents.normalize_body(self.BODY)),
+        )
+
+    def test_registered_version_is_immutable(self):
+        self.register("v1", self.BODY)
+        # 同じ本文での再登録は何もしない
+        document, created = self.register("v1", self.BODY + "\n")
+        self.assertFalse(created)
+
+        with self.assertRaises(consent_documents.ConsentDocumentError):
+            self.register("v1", self.BODY + "<p>追記</p>")
+        # 別の本文の行はロールバックされ、版は元の本文を指したまま
+        self.assertEqual(ConsentDocumentBody.objects.count(), 1)
+        self.assertEqual(ConsentDocumentVersion.objects.get(version="v1").body_id, document.body_id)
+        self.assertEqual(consent_documents.get_document("consent", "v1").sha256, document.body.sha256)
+
+    def test_rejects_template_syntax_error(self):
+        with self.assertRaises(consent_documents.ConsentDocumentError):
+            self.register("v1", "{% if %}")
+        self.assertFalse(ConsentDocumentBody.objects.exists())
+
+    def test_document_view_uses_sha256_as_etag(self):
+        document, _ = self.register("v1", self.BODY)
+        client = APIClient()
+        response = client.get("/api/consent/documents/consent/v1/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], f'"{document.body.sha256}"')
+
+        response = client.get("/api/consent/documents/consent/v1/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(client.get("/api/consent/documents/consent/v9/").status_code, 404)
+
+
+# =========================
+# 14. 顧客詳細の同意履歴の要約とページング（CustomerDetailSerializer / ConsentHistoryPagination）
+# =========================
+@override_settings(CUSTOMER_CONSENT_PAGE_SIZE=3)
+class CustomerConsentHistoryTests(TestCase):
+    SIGNATURE = "data:image/png;base64,iVBORw0KGgo="
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="artist", password="pw123456")
+        self.customer = Customer.objects.create(user=self.user, full_name="山田 花子")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        base = timezone.now() - timedelta(days=10)
+        # 古い順に作る（consents[-1] が最新）
+        self.consents = [
+            CustomerConsent.objects.create(
+                customer=self.customer, consent_version="1.0",
+                signed_at=base + timedelta(days=i), signature=self.SIGNATURE,
+            )
+            for i in range(5)
+        ]
+
+    def detail(self):
+        response = self.client.get(f"/api/customers/{self.customer.uuid}/")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def test_detail_returns_summary_and_first_page(self):
+        data = self.detail()
+        self.assertEqual(data["consent_count"], 5)
+        self.assertEqual(data["latest_consent"]["uuid"], str(self.consents[-1].uuid))
+        self.assertEqual(
+            [c["uuid"] for c in data["consents"]],
+            [str(c.uuid) for c in reversed(self.consents[2:])],
+        )
+        for consent in [data["latest_consent"], *data["consents"]]:
+            self.assertNotIn("signature", consent)
+        self.assertIn(f"/api/customers/{self.customer.uuid}/consents/", data["consents_next"])
+        self.assertIn("limit=3", data["consents_next"])
+        self.assertIn("offset=3", data["consents_next"])
+
+    def test_detail_without_more_pages(self):
+        CustomerConsent.objects.filter(pk__in=[c.pk for c in self.consents[:3]]).delete()
+        data = self.detail()
+        self.assertEqual(data["consent_count"], 2)
+        self.assertEqual(len(data["consents"]), 2)
+        self.assertIsNone(data["consents_next"])
+
+        CustomerConsent.objects.all().delete()
+        data = self.detail()
+        self.assertEqual(data["consent_count"], 0)
+        self.assertIsNone(data["latest_consent"])
+        self.assertIsNone(data["consents_next"])
+
+    def test_history_pages_continue_the_detail(self):
+        response = self.client.get(f"/api/customers/{self.customer.uuid}/consents/?limit=3&offset=3")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 5)
+        self.assertEqual(
+            [c["uuid"] for c in response.data["results"]],
+            [str(c.uuid) for c in reversed(self.consents[:2])],
+        )
+        self.assertNotIn("signature", response.data["results"][0])
+        self.assertIsNone(response.data["next"])
+
+    def test_pagination_limits(self):
+        pagination = ConsentHistoryPagination()
+        factory = RequestFactory()
+        self.assertEqual(pagination.get_limit(Request(factory.get("/"))), 3)
+        self.assertEqual(pagination.get_limit(Request(factory.get("/", {"limit": 1000}))), 100)
+
+    def test_signatures_by_uuid(self):
+        target = self.consents[1]
+        url = f"/api/customers/{self.customer.uuid}/consents/signatures/"
+        response = self.client.get(url, {"uuid": str(target.uuid)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c["uuid"] for c in response.data["results"]], [str(target.uuid)])
+        self.assertEqual(response.data["results"][0]["signature"], self.SIGNATURE)
+        self.assertEqual(self.client.get(url, {"uuid": "nope"}).status_code, 400)
+
+    def test_other_artists_and_inactive_customers_are_hidden(self):
+        other = User.objects.create_user(username="other", password="pw123456")
+        self.client.force_authenticate(other)
+        url = f"/api/customers/{self.customer.uuid}/consents/"
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.force_authenticate(self.user)
+        Customer.objects.filter(pk=self.customer.pk).update(is_active=False)
+        self.assertEqual(self.client.get(url).status_code, 404)
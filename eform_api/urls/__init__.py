@@ -1,9 +1,12 @@
 # eform_api/urls/__init__.py
 from django.urls import path, include
-from eform_api.views.health import health
+from eform_api.views.health import ReadinessDetailView, health, liveness, readiness_check
 
 urlpatterns = [
     path("health/", health, name="health"),
+    path("health/live/", liveness, name="health-live"),
+    path("health/ready/", readiness_check, name="health-ready"),
+    path("health/ready/detail/", ReadinessDetailView.as_view(), name="health-ready-detail"),
 
     # 認証・ユーザー
     path('auth/', include('eform_api.urls.auth_urls')),
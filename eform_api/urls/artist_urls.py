@@ -1,6 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from ..views.artist_views import TattooArtistViewSet, ArtistStatsAPIView
+from ..views.artist_views import (
+    TattooArtistViewSet,
+    ArtistStatsAPIView,
+    ArtistConsentTimeseriesAPIView,
+)
 
 router = DefaultRouter()
 router.register(r'', TattooArtistViewSet, basename='tattoo-artist')
@@ -8,4 +12,6 @@ router.register(r'', TattooArtistViewSet, basename='tattoo-artist')
 urlpatterns = [
     path('', include(router.urls)),
     path('<uuid:uuid>/stats/', ArtistStatsAPIView.as_view(), name='artist-stats'),
+    path('<uuid:uuid>/stats/timeseries/', ArtistConsentTimeseriesAPIView.as_view(),
+         name='artist-consent-timeseries'),
 ]
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from ..views.consent_document_views import ConsentDocumentView
 from ..views.consent_views import CustomerConsentViewSet
 from ..views.pdf_views import ConsentPdfView
 from ..views.public_consent_views import (
@@ -11,6 +13,16 @@ from ..views.public_consent_views import (
     PublicConsentEntryTokenCreateView,
 )
 
+from ..views.public_consent_async_views import (
+    AsyncPublicConsentEntryView,
+    AsyncPublicLookupCustomerByPhoneView,
+    AsyncPublicConsentRenewView,
+    AsyncPublicEntryTokenStatusView,
+)
+
+# ASGI 配信時（PUBLIC_CONSENT_ASYNC）は QR フローを async 版にする
+ASYNC = settings.PUBLIC_CONSENT_ASYNC
+
 router = DefaultRouter()
 router.register(
     r'history',
@@ -25,11 +37,30 @@ urlpatterns = [
     # PDF
     path('pdf/<uuid:uuid>/', ConsentPdfView.as_view(), name='consent-pdf'),
 
+    # 同意書・プライバシーポリシーの本文（版ごと）
+    path('documents/<str:kind>/<str:version>/', ConsentDocumentView.as_view(), name='consent-document'),
+
     # 🔓 public 同意書 API
-    path('public/entry/', PublicConsentEntryView.as_view(), name='public-consent-entry'),
-    path('public/lookup-by-phone/', PublicLookupCustomerByPhoneView.as_view(), name='public-lookup-by-phone'),
-    path('public/renew/', PublicConsentRenewView.as_view(), name='public-consent-renew'),
-    path('public/token/<uuid:token_uuid>/', PublicEntryTokenStatusView.as_view(), name='public-consent-token-status'),
+    path(
+        'public/entry/',
+        (AsyncPublicConsentEntryView if ASYNC else PublicConsentEntryView).as_view(),
+        name='public-consent-entry',
+    ),
+    path(
+        'public/lookup-by-phone/',
+        (AsyncPublicLookupCustomerByPhoneView if ASYNC else PublicLookupCustomerByPhoneView).as_view(),
+        name='public-lookup-by-phone',
+    ),
+    path(
+        'public/renew/',
+        (AsyncPublicConsentRenewView if ASYNC else PublicConsentRenewView).as_view(),
+        name='public-consent-renew',
+    ),
+    path(
+        'public/token/<uuid:token_uuid>/',
+        (AsyncPublicEntryTokenStatusView if ASYNC else PublicEntryTokenStatusView).as_view(),
+        name='public-consent-token-status',
+    ),
 
     # 新規トークン発行（認証必須）
     path('public/token/create/', PublicConsentEntryTokenCreateView.as_view(), name='public-consent-token-create'),
@@ -8,6 +8,11 @@ from ..views.customer_views import (
     lookup_customer_by_phone,
     submit_customer_consent,
     merge_customers,  # ←★追加
+    bulk_delete_customers,
+    CustomerImportView,
+    CustomerImportJobDetailView,
+    CustomerConsentHistoryView,
+    CustomerConsentSignatureListView,
 )
 
 urlpatterns = [
@@ -17,6 +22,12 @@ urlpatterns = [
     path('<uuid:uuid>/', CustomerRetrieveUpdateAPIView.as_view(),
          name='customer-detail'),
 
+    # 顧客詳細の同意履歴の続き・署名画像（ページング）
+    path('<uuid:uuid>/consents/', CustomerConsentHistoryView.as_view(),
+         name='customer-consents'),
+    path('<uuid:uuid>/consents/signatures/', CustomerConsentSignatureListView.as_view(),
+         name='customer-consent-signatures'),
+
     path('easy-create/', CustomerEasyCreateView.as_view(),
          name='customer-easy-create'),
 
@@ -28,4 +39,12 @@ urlpatterns = [
 
     # ★ 顧客マージAPI（POST）
     path('merge/', merge_customers, name='customer-merge'),
+
+    # 顧客一括削除API（POST, ソフトデリート）
+    path('bulk-delete/', bulk_delete_customers, name='customer-bulk-delete'),
+
+    # 顧客 CSV 取り込みAPI（POST）と取り込みジョブの進捗（GET）
+    path('import/', CustomerImportView.as_view(), name='customer-import'),
+    path('import/<uuid:uuid>/', CustomerImportJobDetailView.as_view(),
+         name='customer-import-job'),
 ]
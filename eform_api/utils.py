@@ -1,13 +1,52 @@
 import re
-from django.core.mail import EmailMultiAlternatives
+import unicodedata
+from datetime import date
+from functools import lru_cache
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
 from html import unescape
 
 
 # ------------------------------
 # 1. 電話番号正規化
 # ------------------------------
+# 顧客の保存・電話番号検索・CSV 取り込みのたびに呼ばれるので、正規表現と変換表は
+# import 時に 1 回だけ作り、同じ入力の結果は LRU キャッシュから返す。
+_PHONE_PREFIX = re.compile(r'[A-Za-z\s:]+')
+_PHONE_NON_DIGIT = re.compile(r'\D')
+# 区切りとして捨てる文字（記号・空白・括弧）。\s と同じ空白文字は U+3000 までにしか無い
+_PHONE_SEPARATORS = str.maketrans('', '', '()[]-–ー−―‐' + ''.join(
+    c for c in map(chr, range(0x3001)) if c.isspace()
+))
+
+
+@lru_cache(maxsize=4096)
+def _normalize_phone_number(phone: str) -> str:
+    # 保存済みの値など、すでに半角数字だけのもの
+    if phone.isascii() and phone.isdigit():
+        return '0' + phone[2:] if phone.startswith('81') else phone
+
+    # 全角 → 半角変換（数字・記号）。ASCII だけなら NFKC しても変わらない
+    if not phone.isascii():
+        phone = unicodedata.normalize('NFKC', phone)
+
+    # 英字プレフィックス削除（例: TEL:, Phone:）
+    prefix = _PHONE_PREFIX.match(phone)
+    if prefix:
+        phone = phone[prefix.end():]
+
+    # 数字のみを残す
+    digits = _PHONE_NON_DIGIT.sub('', phone)
+
+    # 記号・空白・括弧を除いた先頭が +81 / 81 なら国内表記（0 始まり）にする
+    if phone.translate(_PHONE_SEPARATORS).startswith(('+81', '81')):
+        digits = '0' + digits[2:]
+    return digits
+
+
 def normalize_phone_number(phone: str) -> str:
     """
     電話番号を正規化する：
@@ -18,30 +57,59 @@ def normalize_phone_number(phone: str) -> str:
     """
     if not phone:
         return ''
+    return _normalize_phone_number(phone)
 
-    # 全角 → 半角変換（数字・記号）
-    import unicodedata
-    phone = unicodedata.normalize('NFKC', phone)
 
-    # 英字プレフィックス削除（例: TEL:, Phone:）
-    phone = re.sub(r'^[A-Za-z\s:]+', '', phone)
+def normalize_phone_numbers(phones):
+    """
+    電話番号をまとめて正規化する（CSV 取り込み・再正規化などのバッチ用）。
+    入力と同じ順・同じ長さのリストを返す。同じ表記は 1 回だけ変換する。
+    """
+    normalized = {}
+    result = []
+    for phone in phones:
+        value = normalized.get(phone)
+        if value is None:
+            value = normalized[phone] = _normalize_phone_number(phone) if phone else ''
+        result.append(value)
+    return result
 
-    # 記号・空白・括弧を除去
-    phone = re.sub(r'[()\[\]\s\-–ー−―‐]', '', phone)
+# ------------------------------
+# 1.5 生年月日（文字列）→ date 変換
+# ------------------------------
+_BIRTH_DATE_PATTERN = re.compile(
+    r'^(\d{4})(\d{2})(\d{2})$|^(\d{4})[-/.年](\d{1,2})[-/.月](\d{1,2})日?$'
+)
 
-    # +81 や 81 で始まる番号を 0 に変換
-    phone = re.sub(r'^\+?81', '0', phone)
 
-    # 数字のみを残す（万が一の記号混入に備え）
-    phone = re.sub(r'\D', '', phone)
+def parse_birth_date(value):
+    """
+    生年月日の文字列を date に変換する。解釈できなければ None。
+    - "1990-01-02" / "1990/1/2" / "19900102" / "1990年1月2日" を許容
+    - 全角数字も NFKC で半角にしてから判定
+    """
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value
 
-    return phone
+    match = _BIRTH_DATE_PATTERN.match(unicodedata.normalize('NFKC', str(value)).strip())
+    if not match:
+        return None
+    try:
+        return date(*(int(part) for part in match.groups() if part is not None))
+    except ValueError:
+        return None
 
 # ------------------------------
 # 2. 本登録案内メールのtxt,html読み込み
 # ------------------------------
 
+# ※ 送信は EmailOutbox に積むだけ。実際の送信は manage.py send_queued_emails
+
 def send_activation_email(user, activation_url):
+    from .outbox import queue_email
+
     subject = "【INKBASE】仮登録のご案内"
     context = {
         "user": user,
@@ -51,14 +119,14 @@ def send_activation_email(user, activation_url):
     text_content = render_to_string("emails/activation_email.txt", context)
     html_content = render_to_string("emails/activation_email.html", context)
 
-    msg = EmailMultiAlternatives(subject, text_content, to=[user.email])
-    msg.attach_alternative(html_content, "text/html")
-    msg.send()
+    return queue_email(subject, text_content, [user.email], html_content=html_content)
 
 # ------------------------------
 # 3. パスワード再設定用メールのtxt,html読み込み
 # ------------------------------
 def send_reset_password_email(user, reset_url):
+    from .outbox import queue_email
+
     subject = "【INKBASE】パスワード再設定のご案内"
     context = {
         'user': user,
@@ -67,6 +135,19 @@ def send_reset_password_email(user, reset_url):
     text_content = render_to_string("emails/reset_password_email.txt", context)
     html_content = render_to_string("emails/reset_password_email.html", context)
 
-    msg = EmailMultiAlternatives(subject, text_content, to=[user.email])
-    msg.attach_alternative(html_content, "text/html")
-    msg.send()
+    return queue_email(subject, text_content, [user.email], html_content=html_content)
+
+# ------------------------------
+# 4. キャッシュ
+# ------------------------------
+def is_shared_cache(alias):
+    """
+    そのキャッシュがワーカー（プロセス）間で共有されるか。
+    LocMemCache は LOCAL_CACHE_IS_SHARED（1 プロセスで動かすとき）だけ共有とみなす
+    """
+    cache = caches[alias]
+    if isinstance(cache, DummyCache):
+        return False
+    if isinstance(cache, LocMemCache):
+        return settings.LOCAL_CACHE_IS_SHARED
+    return True
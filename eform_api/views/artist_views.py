@@ -6,13 +6,14 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from ..models import TattooArtist, Customer, CustomerConsent
 from ..serializers import (
     TattooArtistSerializer,
-    ArtistStatsSerializer
+    ArtistStatsSerializer,
+    ConsentTimeseriesQuerySerializer,
+    ConsentTimeseriesPointSerializer,
 )
+from ..rollups import consent_timeseries
+from ..stats import median_customer_age
 from rest_framework.views import APIView
-from django.db.models import Avg
-from datetime import datetime
 from django.shortcuts import get_object_or_404
-from statistics import median
 
 
 # ------------------------------
@@ -127,18 +128,8 @@ class ArtistStatsAPIView(APIView):
             is_active=True,          # ← Consent 自体が有効なもの
         ).count()
 
-        # 年齢計算（現役顧客だけを対象）
-        ages = []
-        for c in customers:
-            if c.birth_date:
-                try:
-                    birth = datetime.strptime(c.birth_date, "%Y-%m-%d")
-                    age = (datetime.now() - birth).days // 365
-                    ages.append(age)
-                except ValueError:
-                    continue
-
-        median_age = int(median(ages)) if ages else None
+        # 年齢の中央値（現役顧客だけを対象, birth_date_value から DB 側で計算）
+        median_age = median_customer_age(user.id)
 
         return Response({
             "customer_count": customer_count,
@@ -146,3 +137,45 @@ class ArtistStatsAPIView(APIView):
             "median_age": median_age,
             "username": artist.user.username,
         })
+
+
+# ------------------------------
+# 3. 同意書件数の時系列（日・週・月）
+# ------------------------------
+
+class ArtistConsentTimeseriesAPIView(APIView):
+    """
+    /api/artists/<uuid>/stats/timeseries/?start=YYYY-MM-DD&end=YYYY-MM-DD&granularity=day|week|month
+
+    - ConsentDailyRollup を合計して返す（生の CustomerConsent は走査しない）
+    - 新規 / リピーターの内訳つき
+    - week / month の最初のバケットは start から数え、period_start も start になる
+    - ログイン中の彫師本人のみ参照可能
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, uuid):
+        artist = get_object_or_404(TattooArtist, uuid=uuid, user=request.user)
+
+        serializer = ConsentTimeseriesQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        series = consent_timeseries(
+            artist.user_id,
+            params["start"],
+            params["end"],
+            granularity=params["granularity"],
+        )
+
+        return Response({
+            "granularity": params["granularity"],
+            "start": params["start"],
+            "end": params["end"],
+            "totals": {
+                "consent_count": sum(p["consent_count"] for p in series),
+                "new_consent_count": sum(p["new_consent_count"] for p in series),
+                "returning_consent_count": sum(p["returning_consent_count"] for p in series),
+            },
+            "series": ConsentTimeseriesPointSerializer(series, many=True).data,
+        })
@@ -0,0 +1,42 @@
+# eform_api/views/consent_document_views.py
+from django.http import Http404, HttpResponseNotModified
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..consent_documents import get_document
+from ..models import ConsentDocumentVersion
+
+
+class ConsentDocumentView(APIView):
+    """
+    同意書・プライバシーポリシーの本文（公開。QR フローで署名の前に表示する）
+
+      GET /api/consent/documents/<kind>/<version>/   kind: consent / privacy
+
+    版の本文は変わらないので ETag（本文の sha256）と Cache-Control を付ける。
+    顧客ごとの差し込み（{{ customer.full_name }} など）は空で描画する
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, kind, version):
+        if kind not in dict(ConsentDocumentVersion.KIND_CHOICES):
+            raise Http404("Document not found")
+        document = get_document(kind, version)
+        if document is None:
+            raise Http404("Document not found")
+
+        etag = f'"{document.sha256}"'
+        if request.headers.get("If-None-Match") == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = Response({
+                "kind": document.kind,
+                "version": document.version,
+                "title": document.title,
+                "sha256": document.sha256,
+                "html": document.render(),
+            })
+        response["ETag"] = etag
+        response["Cache-Control"] = "public, max-age=86400"
+        return response
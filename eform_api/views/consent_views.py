@@ -6,6 +6,7 @@ from rest_framework.exceptions import PermissionDenied
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
 
+from ..consent_pdfs import queue_consent_pdf
 from ..models import CustomerConsent
 from ..serializers import (
     CustomerConsentReadSerializer,
@@ -51,7 +52,12 @@ class CustomerConsentViewSet(viewsets.ModelViewSet):
         customer = serializer.validated_data['customer']
         if customer.user != self.request.user:
             raise PermissionDenied("この顧客に対する同意は許可されていません。")
-        serializer.save()
+        # PDF は render_consent_pdfs ワーカーが作って S3 に置く
+        queue_consent_pdf(serializer.save())
+
+    def perform_update(self, serializer):
+        # 署名・版が変わったかもしれないので、保存済みの PDF を作り直す
+        queue_consent_pdf(serializer.save(), refresh=True)
 
     def get_queryset(self):
         qs = super().get_queryset()
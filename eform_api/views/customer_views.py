@@ -1,24 +1,39 @@
 # eform_api/views/customer_views.py
 
+import uuid
+
+from django.conf import settings
 from django.db import transaction
+from django.shortcuts import get_object_or_404
 from django.utils.timezone import now as timezone_now
 
 from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 
 from ..models import (
     Customer,
     CustomerDeleteLog,
     CustomerMergeLog,
     CustomerConsent,
+    CustomerImportJob,
 )
+from ..consent_pdfs import queue_consent_pdf
+from ..customer_import import CustomerImportError, import_customers
+from ..db.routers import PRIMARY
+from ..pagination import ConsentHistoryPagination
 from ..serializers import (
+    CONSENT_SUMMARY_FIELDS,
     CustomerSerializer,
     CustomerEasyCreateSerializer,
+    CustomerConsentSignatureSerializer,
+    CustomerConsentSummarySerializer,
     CustomerConsentWriteSerializer,
     CustomerDetailSerializer,
+    CustomerImportJobSerializer,
 )
 from ..utils import normalize_phone_number
 
@@ -140,7 +155,7 @@ def submit_customer_consent(request):
         return Response({"error": "顧客が見つかりません"}, status=404)
 
     consent_data = {
-        "customer": customer.id,
+        "customer": customer.uuid,
         "consent_version": data.get("consent_version"),
         "signed_at": data.get("agreements_timestamp", timezone_now()),
         "signature": data.get("signature"),
@@ -149,10 +164,13 @@ def submit_customer_consent(request):
             "privacy_agreement_agreed_at"
         ),
     }
+    # 署名は筆跡ベクトルでも受け取れる（eform_api.signatures）
+    if data.get("signature_strokes") is not None:
+        consent_data["signature_strokes"] = data.get("signature_strokes")
 
     serializer = CustomerConsentWriteSerializer(data=consent_data)
     if serializer.is_valid():
-        serializer.save()
+        queue_consent_pdf(serializer.save())
         return Response(
             {
                 "message": "同意情報を保存しました",
@@ -305,3 +323,207 @@ def merge_customers(request):
         },
         status=status.HTTP_200_OK,
     )
+
+
+# ------------------------------
+# 8.顧客の一括削除（bulk-delete, ソフトデリート）
+# ------------------------------
+BULK_DELETE_MAX_UUIDS = 500
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_delete_customers(request):
+    """
+    顧客一括削除API:
+    - uuids: 削除する顧客 UUID の配列（最大 BULK_DELETE_MAX_UUIDS 件）
+    - reason: 削除ログに残す理由（省略時は「ユーザーによる一括削除」）
+
+    自分の有効な顧客だけを UPDATE 1 本で is_active=False にし、
+    削除ログは bulk_create でまとめて残す（全体で 1 トランザクション）。
+    results には uuid ごとに deleted / already_deleted / not_found / invalid を返す。
+    """
+    user = request.user
+    uuids = request.data.get("uuids")
+    reason = request.data.get("reason") or "ユーザーによる一括削除"
+
+    # --- 1. バリデーション ---
+    if not isinstance(uuids, list) or not uuids:
+        return Response(
+            {"error": "uuids は 1 件以上の配列で指定してください"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if len(uuids) > BULK_DELETE_MAX_UUIDS:
+        return Response(
+            {"error": f"一度に削除できるのは {BULK_DELETE_MAX_UUIDS} 件までです"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    parsed = {}
+    for value in uuids:
+        try:
+            parsed.setdefault(str(value), uuid.UUID(str(value)))
+        except ValueError:
+            parsed.setdefault(str(value), None)
+    requested = list(dict.fromkeys(u for u in parsed.values() if u is not None))
+
+    # --- 2. 一括ソフトデリート ---
+    with transaction.atomic():
+        # 同時に来た削除と二重にログを残さないよう、対象行をロックしてから状態を見る
+        states = dict(
+            Customer.objects.select_for_update()
+            .filter(user=user, uuid__in=requested)
+            .values_list("uuid", "is_active")
+        )
+        targets = [u for u in requested if states.get(u)]
+
+        if targets:
+            Customer.objects.filter(user=user, uuid__in=targets).update(
+                is_active=False,
+                updated_at=timezone_now(),
+            )
+            CustomerDeleteLog.objects.bulk_create([
+                CustomerDeleteLog(
+                    customer_uuid=customer_uuid,
+                    performed_by=user,
+                    reason=reason,
+                )
+                for customer_uuid in targets
+            ])
+
+    # --- 3. 返却（リクエストの順。重複は 1 件にまとめる）---
+    results = []
+    reported = set()
+    for value, customer_uuid in parsed.items():
+        if customer_uuid is None:
+            result = "invalid"
+        elif customer_uuid in reported:
+            continue
+        elif customer_uuid not in states:
+            result = "not_found"
+        elif states[customer_uuid]:
+            result = "deleted"
+        else:
+            result = "already_deleted"
+        reported.add(customer_uuid)
+        results.append({"uuid": value, "status": result})
+
+    return Response(
+        {
+            "deleted": len(targets),
+            "results": results,
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+# ------------------------------
+# 9.顧客 CSV 取り込み（import）
+# ------------------------------
+class CustomerImportView(APIView):
+    """
+    顧客 CSV 取り込みAPI（multipart/form-data）:
+    - file: CSV（1 行目が見出し。full_name / phone_number などのフィールド名か「氏名」「電話番号」等）
+    - encoding: 文字コード（省略時 utf-8-sig。Excel の CSV なら cp932）
+    - background: true ならサイズに関係なくジョブとして取り込む
+
+    電話番号が一致する自分の有効な顧客は更新（空欄のセルは上書きしない）、それ以外は新規作成。
+    CUSTOMER_IMPORT_SYNC_MAX_BYTES 以下のファイルはその場で取り込んで結果を返し（200）、
+    それより大きいファイルはジョブに積んで 202 を返す（進捗は GET import/<uuid>/）。
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"error": "file は必須です"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        encoding = request.data.get("encoding") or "utf-8-sig"
+        background = str(request.data.get("background", "")).lower() in ("1", "true", "yes")
+
+        if background or upload.size > settings.CUSTOMER_IMPORT_SYNC_MAX_BYTES:
+            job = CustomerImportJob.objects.create(
+                user=request.user,
+                file=upload,
+                original_name=upload.name[:255],
+                encoding=encoding,
+            )
+            return Response(
+                CustomerImportJobSerializer(job).data,
+                status=status.HTTP_202_ACCEPTED,
+            )
+
+        try:
+            result = import_customers(request.user, upload, encoding=encoding)
+        except CustomerImportError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+
+class CustomerImportJobDetailView(APIView):
+    """GET /customers/import/<uuid>/ : 取り込みジョブの進捗・結果"""
+    permission_classes = [permissions.IsAuthenticated]
+    # ワーカーが書き込んだ進捗をポーリングするので、レプリカの遅延を挟まない
+    read_database = PRIMARY
+
+    def get(self, request, uuid):
+        job = get_object_or_404(CustomerImportJob, uuid=uuid, user=request.user)
+        return Response(CustomerImportJobSerializer(job).data)
+
+
+# ------------------------------
+# 10.顧客詳細の同意履歴・署名画像（ページング, 必要になったときに読む）
+# ------------------------------
+class CustomerConsentListMixin:
+    """URL の顧客（自分の, is_active=True）の同意を新しい順に返す"""
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ConsentHistoryPagination
+
+    def get_customer(self):
+        return get_object_or_404(
+            Customer.objects.select_related("merged_into"),
+            uuid=self.kwargs["uuid"],
+            user=self.request.user,
+            is_active=True,
+        )
+
+    def get_queryset(self):
+        # related manager から読むと、各同意の customer はこの顧客のインスタンスになる（行ごとに引かない）
+        return self.get_customer().consents.order_by("-signed_at", "-id")
+
+
+class CustomerConsentHistoryView(CustomerConsentListMixin, generics.ListAPIView):
+    """
+    GET /customers/<uuid>/consents/?limit=&offset= : 同意履歴（署名なし）
+    顧客詳細（consents / consents_next）の続き
+    """
+    serializer_class = CustomerConsentSummarySerializer
+
+    def get_queryset(self):
+        return super().get_queryset().only(*CONSENT_SUMMARY_FIELDS)
+
+
+class CustomerConsentSignatureListView(CustomerConsentListMixin, generics.ListAPIView):
+    """
+    GET /customers/<uuid>/consents/signatures/?limit=&offset= : 署名画像
+    ?uuid=<同意の uuid>（複数可）で、表示する同意の分だけ読める
+    """
+    serializer_class = CustomerConsentSignatureSerializer
+
+    def get_queryset(self):
+        qs = super().get_queryset().only("id", "uuid", "signed_at", "signature")
+        uuids = self.request.query_params.getlist("uuid")
+        if uuids:
+            try:
+                qs = qs.filter(uuid__in=[uuid.UUID(value) for value in uuids])
+            except ValueError:
+                raise ValidationError({"uuid": "uuid の形式が不正です"})
+        return qs
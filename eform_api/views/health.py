@@ -1,8 +1,14 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.db import connections
 from django.db.utils import OperationalError
 
+from ..healthchecks import readiness
+from .metrics_views import MetricsAccessMixin
+
+
 @api_view(["GET"])
 def health(request):
     """
@@ -21,3 +27,42 @@ def health(request):
         "status": "ok",
         "db": db_status,
     })
+
+
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def liveness(request):
+    """
+    liveness: プロセスが応答できるかだけを返す（DB・外部には一切触らない）。
+    落ちていたらコンテナを再起動してよい、という判定に使う。
+    """
+    return Response({"status": "ok"})
+
+
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def readiness_check(request):
+    """
+    readiness: リクエストを受けてよいか。
+    - database: SELECT 1 の往復時間
+    - storage: S3 / MinIO バケットへの HEAD
+    - email: SMTP への接続
+    HEALTH_READINESS_REQUIRED のチェックが失敗したら 503、それ以外の失敗は degraded（200）。
+    結果は HEALTH_CHECK_CACHE_SECONDS 秒キャッシュする（eform_api.healthchecks）。
+    誰でも叩けるので全体の status だけを返す（内訳は ReadinessDetailView）
+    """
+    code, body = readiness()
+    return Response({"status": body["status"]}, status=code)
+
+
+class ReadinessDetailView(MetricsAccessMixin, APIView):
+    """
+    readiness の内訳（チェックごとの結果・例外の内容・DB の接続数・プールの統計）。
+    /metrics と同じ権限（METRICS_BEARER_TOKEN / スタッフ / METRICS_ALLOWED_IPS）
+    """
+
+    def get(self, request):
+        code, body = readiness()
+        return Response(body, status=code)
@@ -0,0 +1,75 @@
+# eform_api/views/metrics_views.py
+import hmac
+import ipaddress
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.permissions import BasePermission
+from rest_framework.views import APIView
+
+from ..metrics import render_latest
+
+
+def has_metrics_token(request):
+    """Authorization: Bearer <METRICS_BEARER_TOKEN> が付いているか（未設定なら常に False）"""
+    token = settings.METRICS_BEARER_TOKEN
+    if not token:
+        return False
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    scheme, _, credentials = header.partition(" ")
+    if scheme.lower() != "bearer":
+        return False
+    return hmac.compare_digest(credentials.strip().encode(), token.encode())
+
+
+class MetricsAccessPermission(BasePermission):
+    """
+    /metrics の閲覧権限（どれか 1 つを満たせば可）
+    - Authorization: Bearer <METRICS_BEARER_TOKEN>（Prometheus のスクレイパー）
+    - スタッフユーザー
+    - settings.METRICS_ALLOWED_IPS（CIDR 可, 既定は空）からのアクセス
+    ※ IP は REMOTE_ADDR だけを見る（X-Forwarded-For は偽装できるので使わない）
+    """
+    message = "メトリクスを閲覧する権限がありません。"
+
+    def has_permission(self, request, view):
+        if has_metrics_token(request):
+            return True
+
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated and user.is_staff:
+            return True
+
+        if not settings.METRICS_ALLOWED_IPS:
+            return False
+        try:
+            addr = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+        except ValueError:
+            return False
+        return any(addr in network for network in _allowed_networks())
+
+
+def _allowed_networks():
+    return [ipaddress.ip_network(value, strict=False) for value in settings.METRICS_ALLOWED_IPS]
+
+
+class MetricsAccessMixin:
+    """/metrics と同じ閲覧権限にする（readiness の詳細などの運用向けビュー用）"""
+    permission_classes = [MetricsAccessPermission]
+
+    def perform_authentication(self, request):
+        # メトリクス用のトークンは JWT ではないので、JWT の認証（401）に回さない
+        if has_metrics_token(request):
+            return
+        super().perform_authentication(request)
+
+
+class MetricsView(MetricsAccessMixin, APIView):
+    """
+    Prometheus 形式のメトリクス（text/plain; version=0.0.4）
+    /metrics
+    """
+
+    def get(self, request):
+        body, content_type = render_latest()
+        return HttpResponse(body, content_type=content_type)
@@ -2,60 +2,82 @@
 
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from django.http import HttpResponse, Http404
+from rest_framework.response import Response
+from rest_framework import status
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseRedirect, Http404, StreamingHttpResponse
 
-from io import BytesIO
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
+import logging
 
-from ..models import CustomerConsent
+from ..consent_pdfs import open_stored_pdf, presigned_url, queue_consent_pdf, stored_pdf
+from ..models import ConsentPdf, CustomerConsent
+from ..pdf_renderer import PdfRenderError, PdfRendererBusy, render_consent_pdf
+
+logger = logging.getLogger(__name__)
 
 
 class ConsentPdfView(APIView):
+    """
+    同意書の控え PDF
+
+    - render_consent_pdfs ワーカーが作って S3 に置いたものがあればそれを返す
+      （CONSENT_PDF_DELIVERY: "stream" は S3 から読んで返す / "redirect" は署名付き URL へ 302）
+    - まだ無い（生成待ち・失敗・事前生成前の古い同意書）・S3 から読めないときはその場で作る
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, uuid):
-        # --- 1. 同意データを取得 ---
+        # --- 1. 同意データを取得（自分の顧客のものだけ） ---
         try:
-            consent = CustomerConsent.objects.select_related("customer").get(uuid=uuid)
+            consent = CustomerConsent.objects.select_related("customer", "pdf").get(
+                uuid=uuid, customer__user=request.user
+            )
         except CustomerConsent.DoesNotExist:
             raise Http404("Consent not found")
 
-        customer = consent.customer
-
-        # --- 2. PDF をメモリ上で生成 ---
-        buffer = BytesIO()
-        p = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-
-        y = height - 50
-
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(50, y, "タトゥー同意書（控え）")
-        y -= 40
-
-        p.setFont("Helvetica", 11)
-        p.drawString(50, y, f"氏名: {customer.full_name or ''}")
-        y -= 20
-
-        p.drawString(50, y, f"生年月日: {customer.birth_date or ''}")
-        y -= 20
-
-        p.drawString(50, y, f"同意日時: {consent.signed_at}")
-        y -= 20
+        # --- 2. 保存済みの PDF があればそれを返す ---
+        row = stored_pdf(consent)
+        if row is not None:
+            try:
+                return self.stored_response(consent, row)
+            except Exception:
+                logger.exception("stored consent pdf unavailable: %s", consent.uuid)
 
-        p.drawString(50, y, f"バージョン: {consent.consent_version or ''}")
-        y -= 40
-
-        p.drawString(50, y, "※このPDFは自動生成された控えです。")
+        # --- 3. 無ければその場で生成（HTML テンプレート → プロセスプール） ---
+        try:
+            pdf = render_consent_pdf(consent)
+        except PdfRendererBusy:
+            response = Response(
+                {"detail": "PDF の生成が混み合っています。しばらくしてから再度お試しください。"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+            response["Retry-After"] = "5"
+            return response
+        except PdfRenderError:
+            logger.exception("consent pdf render failed: %s", consent.uuid)
+            return Response(
+                {"detail": "PDF を生成できませんでした。"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        # キューに載っていない同意書（事前生成を入れる前のもの）は次回から保存済みを返せるよう積んでおく
+        try:
+            consent.pdf
+        except ConsentPdf.DoesNotExist:
+            queue_consent_pdf(consent)
 
-        p.showPage()
-        p.save()
+        # --- 4. レスポンスとして返す ---
+        response = HttpResponse(pdf, content_type='application/pdf')
+        response['Content-Disposition'] = f'inline; filename=\"consent_{consent.uuid}.pdf\"'
+        return response
 
-        pdf = buffer.getvalue()
-        buffer.close()
+    def stored_response(self, consent, row):
+        if settings.CONSENT_PDF_DELIVERY == "redirect":
+            return HttpResponseRedirect(presigned_url(row))
 
-        # --- 3. レスポンスとして返す ---
-        response = HttpResponse(pdf, content_type='application/pdf')
+        body, length = open_stored_pdf(row)
+        response = StreamingHttpResponse(body.iter_chunks(chunk_size=64 * 1024), content_type='application/pdf')
+        if length is not None:
+            response['Content-Length'] = str(length)
         response['Content-Disposition'] = f'inline; filename=\"consent_{consent.uuid}.pdf\"'
         return response
@@ -0,0 +1,249 @@
+# eform_api/views/public_consent_async_views.py
+"""
+QR 同意フロー（public API）の非同期版
+
+- ASGI サーバー（uvicorn ワーカー等）で動かすと、DB 待ちの間にイベントループが
+  他のリクエストを処理できるので、イベント時の QR 読み取りの集中に強い
+- URL・リクエスト・レスポンス形式は public_consent_views の同期版と同じ。
+  書き込み処理（entry / renew）も同期版と同じ関数（eform_api.public_consent）をスレッドで呼ぶ
+- settings.PUBLIC_CONSENT_ASYNC=True のときに consent_urls でこちらが使われる
+- DRF の APIView は async に対応していないため、Django の View を直接使い、
+  入力チェックだけ同期版と同じ DRF Serializer で行う（署名の変換が重いので _validate でスレッドに逃がす）
+
+DB アクセスについて:
+  Django 4.2 の async ORM（aget / acreate ...）は内部で
+  sync_to_async(thread_sensitive=True) を使うため、全リクエストのクエリが
+  1 本のスレッドに直列化され、DB 待ちが重ならない。
+  そこで 1 リクエスト分の DB 処理をまとめて @db_in_thread でスレッドプールに逃がし、
+  同時に来たリクエストの DB 往復を並行させる（benchmarks/public_consent_load.py 参照）。
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views import View
+
+from .. import idempotency
+from ..models import Customer, ConsentEntryToken
+from ..public_consent import get_valid_token, submit_entry, submit_renew
+from .public_consent_views import (
+    PublicConsentSerializer,
+    PublicLookupSerializer,
+    PublicConsentRenewSerializer,
+    client_meta,
+)
+
+
+# -------------------------
+# ヘルパー
+# -------------------------
+def db_in_thread(func):
+    """
+    同期の DB 処理をスレッドプールで実行する awaitable に変換する。
+    プールのスレッドはリクエストをまたいで生き残るので、同期ワーカーの
+    request_started / request_finished と同じく前後で古い接続を閉じる。
+    """
+    @wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+@sync_to_async(thread_sensitive=False)
+def _validate(serializer_class, payload):
+    """
+    入力チェックをスレッドで行う。署名は Pillow でデコードして WebP に詰め直す
+    （eform_api.signatures。1 枚で数十 ms の CPU）ので、イベントループ上では動かさない。
+    (validated_data, None) か (None, errors) を返す
+    """
+    serializer = serializer_class(data=payload)
+    if serializer.is_valid():
+        return serializer.validated_data, None
+    return None, serializer.errors
+
+
+def _json(data, status=200):
+    # DRF の JSONRenderer と同じく日本語はエスケープしない
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={"ensure_ascii": False})
+
+
+def _request_data(request):
+    """JSON / form / multipart のボディを dict で返す（DRF の request.data 相当）"""
+    if request.content_type == "application/json":
+        try:
+            return json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+    # multipart の署名ファイルも signature として渡す
+    return {**request.POST.dict(), **request.FILES.dict()}
+
+
+_claim_key = db_in_thread(idempotency.claim)
+_finish_key = db_in_thread(idempotency.finish)
+_release_key = db_in_thread(idempotency.release)
+
+
+async def _submit_once(scope, request, payload, submit, data, meta):
+    """
+    Idempotency-Key / submission_uuid があれば最初の応答を保存し、再送にはそれを返す
+    （同期版の @idempotent と同じ。入力チェックを通った後に呼ぶ）
+    """
+    try:
+        key = idempotency.request_key(request.headers, payload)
+    except idempotency.IdempotencyKeyError as e:
+        return _json({"detail": str(e)}, status=400)
+    if key is None:
+        body, status = await submit(data, meta)
+        return _json(body, status=status)
+
+    result = await _claim_key(scope, key, idempotency.fingerprint(payload))
+    if result.record is None:
+        response = _json(result.body, status=result.status)
+        for header, value in idempotency.replay_headers(result).items():
+            response[header] = value
+        return response
+    try:
+        body, status = await submit(data, meta)
+    except BaseException:
+        await _release_key(result.record)
+        raise
+    await _finish_key(result.record, status, body)
+    return _json(body, status=status)
+
+
+class AsyncPublicView(View):
+    """ログイン不要の public API 用ベース（APIView と同様に CSRF 対象外）"""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+
+# =========================
+# 1. ご新規同意: Entry(Post)
+# =========================
+
+# トークン確認・顧客の作成/更新・同意履歴・アクセスログは同期版と共通（eform_api.public_consent）
+_submit_entry = db_in_thread(submit_entry)
+
+
+class AsyncPublicConsentEntryView(AsyncPublicView):
+    """
+    /api/consent/public/entry/ の非同期版
+    """
+
+    async def post(self, request, *args, **kwargs):
+        payload = _request_data(request)
+        if payload is None:
+            return _json({"detail": "JSON の形式が不正です"}, status=400)
+
+        data, errors = await _validate(PublicConsentSerializer, payload)
+        if errors is not None:
+            return _json(errors, status=400)
+
+        return await _submit_once(
+            "entry", request, payload, _submit_entry, data, client_meta(request),
+        )
+
+
+# =========================
+# 2. 電話＋生年月日 lookup(GET)
+# =========================
+
+@db_in_thread
+def _lookup_customers(data):
+    token, error = get_valid_token(data["entry_token"], related="artist")
+    if error:
+        return error
+
+    qs = Customer.objects.filter(
+        user_id=token.artist.user_id,
+        phone_number=data["phone"],
+        birth_date=data["birth_date"],
+    ).values_list("uuid", "full_name")
+
+    return [{"uuid": str(uuid), "full_name": full_name} for uuid, full_name in qs], 200
+
+
+class AsyncPublicLookupCustomerByPhoneView(AsyncPublicView):
+    """
+    /api/consent/public/lookup-by-phone/ の非同期版
+    """
+
+    async def get(self, request, *args, **kwargs):
+        serializer = PublicLookupSerializer(data=request.GET)
+        if not serializer.is_valid():
+            return _json(serializer.errors, status=400)
+
+        body, status = await _lookup_customers(serializer.validated_data)
+        return _json(body, status=status)
+
+
+# =========================
+# 3. 再同意: renew(Post)
+# =========================
+
+_submit_renew = db_in_thread(submit_renew)
+
+
+class AsyncPublicConsentRenewView(AsyncPublicView):
+    """
+    /api/consent/public/renew/ の非同期版
+    """
+
+    async def post(self, request, *args, **kwargs):
+        payload = _request_data(request)
+        if payload is None:
+            return _json({"detail": "JSON の形式が不正です"}, status=400)
+
+        data, errors = await _validate(PublicConsentRenewSerializer, payload)
+        if errors is not None:
+            return _json(errors, status=400)
+
+        return await _submit_once(
+            "renew", request, payload, _submit_renew, data, client_meta(request),
+        )
+
+
+# =========================
+# 4. トークン有効性チェック(GET)
+# =========================
+
+@db_in_thread
+def _token_status(token_uuid):
+    try:
+        token = ConsentEntryToken.objects.select_related("artist").get(uuid=token_uuid)
+    except ConsentEntryToken.DoesNotExist:
+        return {"valid": False, "reason": "not_found", "artist": None}
+
+    if not token.is_valid():
+        return {"valid": False, "reason": "inactive_or_expired", "artist": None}
+
+    artist = token.artist
+    return {
+        "valid": True,
+        "reason": None,
+        "artist": {
+            "uuid": str(artist.uuid),
+            "artist_name": artist.artist_name,
+            "studio_name": artist.studio_name,
+        },
+    }
+
+
+class AsyncPublicEntryTokenStatusView(AsyncPublicView):
+    """
+    /api/consent/public/token/<uuid>/ の非同期版
+    """
+
+    async def get(self, request, token_uuid, *args, **kwargs):
+        return _json(await _token_status(token_uuid))
@@ -7,16 +7,17 @@ from rest_framework.response import Response
 from rest_framework import status, serializers
 
 from django_filters.rest_framework import DjangoFilterBackend
-from django.utils import timezone
-from django.db import IntegrityError
 
 from ..models import (
     TattooArtist,
     Customer,
     CustomerConsent,
     ConsentEntryToken,
-    ConsentAccessLog,
 )
+from ..consent_pdfs import queue_consent_pdf
+from ..idempotency import idempotent
+from ..public_consent import submit_entry, submit_renew
+from ..signatures import SignatureField, SignatureStrokesField, resolve_signature
 
 from ..serializers import (
     CustomerConsentReadSerializer,
@@ -34,6 +35,14 @@ def get_client_ip(request):
     return request.META.get("REMOTE_ADDR", "")
 
 
+def client_meta(request):
+    """アクセスログに残すクライアントの情報（eform_api.public_consent に渡す）"""
+    return {
+        "ip_address": get_client_ip(request) or "0.0.0.0",
+        "user_agent": request.META.get("HTTP_USER_AGENT", "")[:1000],
+    }
+
+
 # =========================
 # 0. トークン発行 API（認証必須）
 # =========================
@@ -135,7 +144,12 @@ class PublicConsentSerializer(serializers.Serializer):
 
     consent_version = serializers.CharField(max_length=64)
     privacy_agreement_version = serializers.CharField(max_length=64)
-    signature = serializers.CharField()
+    # データ URL / multipart のファイル / 筆跡ベクトルのどれか（eform_api.signatures）
+    signature = SignatureField(required=False)
+    signature_strokes = SignatureStrokesField(required=False)
+
+    def validate(self, attrs):
+        return resolve_signature(attrs)
 
 
 class PublicConsentEntryView(APIView):
@@ -145,89 +159,15 @@ class PublicConsentEntryView(APIView):
     """
     permission_classes = [AllowAny]
 
+    # Idempotency-Key / submission_uuid 付きの再送には最初の応答を返す
+    @idempotent("entry")
     def post(self, request, *args, **kwargs):
         serializer = PublicConsentSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        data = serializer.validated_data
-
-        # ---- 1. トークン確認 ----
-        try:
-            token = ConsentEntryToken.objects.select_related("artist__user").get(
-                uuid=data["entry_token"]
-            )
-        except ConsentEntryToken.DoesNotExist:
-            return Response({"detail": "entry_token が不正です"}, status=400)
-
-        if not token.is_valid():
-            return Response({"detail": "このQRコードは現在使用できません。"}, status=400)
 
-        artist = token.artist
-        user = artist.user
-
-        # ---- 2. 顧客情報検索または作成 ----
-        customer = Customer.objects.filter(
-            user=user,
-            phone_number=data["phone_number"],
-        ).first()
-
-        birth_str = str(data["birth_date"] or "")
-
-        if customer is None:
-            customer = Customer.objects.create(
-                user=user,
-                full_name=data["full_name"],
-                gender=data["gender"],
-                birth_date=birth_str,
-                prefecture=data["prefecture"],
-                city=data["city"],
-                phone_number=data["phone_number"],
-                tattooist=artist.artist_name,
-            )
-        else:
-            customer.full_name = data["full_name"]
-            customer.gender = data["gender"]
-            customer.birth_date = birth_str
-            customer.prefecture = data["prefecture"]
-            customer.city = data["city"]
-            customer.phone_number = data["phone_number"]
-            customer.tattooist = artist.artist_name
-            customer.save()
-
-        # ---- 3. 同意履歴の作成 ----
-        now = timezone.now()
-        try:
-            consent = CustomerConsent.objects.create(
-                customer=customer,
-                consent_version=data["consent_version"],
-                signed_at=now,
-                signature=data["signature"],
-                privacy_agreement_version=data["privacy_agreement_version"],
-                privacy_agreement_agreed_at=now,
-            )
-        except IntegrityError:
-            consent = CustomerConsent.objects.get(
-                customer=customer,
-                consent_version=data["consent_version"],
-            )
-
-        # ---- 4. アクセスログ ----
-        ConsentAccessLog.objects.create(
-            token=token,
-            ip_address=get_client_ip(request) or "0.0.0.0",
-            user_agent=request.META.get("HTTP_USER_AGENT", "")[:1000],
-            customer_phone=data["phone_number"],
-        )
-
-        token.last_used_at = now
-        token.save(update_fields=["last_used_at"])
-
-        return Response(
-            {
-                "customer_uuid": str(customer.uuid),
-                "consent_uuid": str(consent.uuid),
-            },
-            status=201,
-        )
+        # トークン確認・顧客の作成/更新・同意履歴・アクセスログ（非同期版と共通）
+        body, code = submit_entry(serializer.validated_data, client_meta(request))
+        return Response(body, status=code)
 
 
 # =========================
@@ -285,7 +225,12 @@ class PublicConsentRenewSerializer(serializers.Serializer):
     customer_uuid = serializers.UUIDField()
     consent_version = serializers.CharField(max_length=64)
     privacy_agreement_version = serializers.CharField(max_length=64)
-    signature = serializers.CharField()
+    # データ URL / multipart のファイル / 筆跡ベクトルのどれか（eform_api.signatures）
+    signature = SignatureField(required=False)
+    signature_strokes = SignatureStrokesField(required=False)
+
+    def validate(self, attrs):
+        return resolve_signature(attrs)
 
 
 class PublicConsentRenewView(APIView):
@@ -294,65 +239,15 @@ class PublicConsentRenewView(APIView):
     """
     permission_classes = [AllowAny]
 
+    # Idempotency-Key / submission_uuid 付きの再送には最初の応答を返す（同意を二重に作らない）
+    @idempotent("renew")
     def post(self, request, *args, **kwargs):
         serializer = PublicConsentRenewSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        data = serializer.validated_data
-
-        # 1) トークン確認
-        try:
-            token = ConsentEntryToken.objects.select_related("artist__user").get(
-                uuid=data["entry_token"]
-            )
-        except ConsentEntryToken.DoesNotExist:
-            return Response({"detail": "entry_token が不正です"}, status=400)
-
-        if not token.is_valid():
-            return Response({"detail": "このQRコードは現在使用できません。"}, status=400)
 
-        # 2) 顧客確認
-        try:
-            customer = Customer.objects.select_related("user").get(
-                uuid=data["customer_uuid"]
-            )
-        except Customer.DoesNotExist:
-            return Response({"detail": "customer_uuid が不正です"}, status=400)
-
-        # 3) token の artist と 顧客の user が一致するか
-        if customer.user_id != token.artist.user_id:
-            return Response(
-                {"detail": "このQRコードからはこのお客様の再同意は行えません。"},
-                status=400,
-            )
-
-        # 4) 再同意レコード作成
-        now = timezone.now()
-        consent = CustomerConsent.objects.create(
-            customer=customer,
-            consent_version=data["consent_version"],
-            signed_at=now,
-            signature=data["signature"],
-            privacy_agreement_version=data["privacy_agreement_version"],
-            privacy_agreement_agreed_at=now,
-        )
-
-        # 5) アクセスログ & 最終利用日時更新
-        ConsentAccessLog.objects.create(
-            token=token,
-            ip_address=get_client_ip(request) or "0.0.0.0",
-            user_agent=request.META.get("HTTP_USER_AGENT", "")[:1000],
-            customer_phone=customer.phone_number,
-        )
-        token.last_used_at = now
-        token.save(update_fields=["last_used_at"])
-
-        return Response(
-            {
-                "customer_uuid": str(customer.uuid),
-                "consent_uuid": str(consent.uuid),
-            },
-            status=201,
-        )
+        # トークン・顧客の確認・同意履歴・アクセスログ（非同期版と共通）
+        body, code = submit_renew(serializer.validated_data, client_meta(request))
+        return Response(body, status=code)
 
 
 # =========================
@@ -433,7 +328,7 @@ class CustomerConsentViewSet(viewsets.ModelViewSet):
         customer = serializer.validated_data['customer']
         if customer.user != self.request.user:
             raise PermissionDenied("この顧客に対する同意は許可されていません。")
-        serializer.save()
+        queue_consent_pdf(serializer.save())
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -1,12 +1,14 @@
 # eform_api/views/storage_views.py
 import uuid
 
-import boto3
 from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
+from ..instrumentation import timed
+from ..storage import get_s3_client
+
 
 class GeneratePresignedProfileImageUrlView(APIView):
     """
@@ -46,26 +48,22 @@ class GeneratePresignedProfileImageUrlView(APIView):
         # S3 上での保存パス（prefix 固定）
         object_key = f"uploads/profile_image/{uuid.uuid4()}.{ext}"
 
-        # S3 クライアント
-        s3 = boto3.client(
-            "s3",
-            region_name=settings.AWS_S3_REGION_NAME,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        )
+        # S3 クライアント（boto3 は初回利用時に読み込む）
+        s3 = get_s3_client()
 
         try:
-            upload_url = s3.generate_presigned_url(
-                ClientMethod="put_object",
-                Params={
-                    "Bucket": settings.AWS_S3_BUCKET_NAME,
-                    "Key": object_key,
-                    "ContentType": content_type,
-                    # バケットポリシーで public-read を許可している前提なので ACL は省略
-                    # 必要なら "ACL": "public-read" を追加
-                },
-                ExpiresIn=300,  # 5分
-            )
+            with timed("s3"):
+                upload_url = s3.generate_presigned_url(
+                    ClientMethod="put_object",
+                    Params={
+                        "Bucket": settings.AWS_S3_BUCKET_NAME,
+                        "Key": object_key,
+                        "ContentType": content_type,
+                        # バケットポリシーで public-read を許可している前提なので ACL は省略
+                        # 必要なら "ACL": "public-read" を追加
+                    },
+                    ExpiresIn=300,  # 5分
+                )
         except Exception as e:
             return Response(
                 {"detail": f"presigned URL の生成に失敗しました: {e}"},
@@ -109,21 +107,17 @@ class UploadProfileImageView(APIView):
         # S3 上のパス
         object_key = f"uploads/profile_image/{uuid.uuid4()}.{ext}"
 
-        # S3 クライアント
-        s3 = boto3.client(
-            "s3",
-            region_name=settings.AWS_S3_REGION_NAME,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        )
+        # S3 クライアント（boto3 は初回利用時に読み込む）
+        s3 = get_s3_client()
 
         try:
-            s3.upload_fileobj(
-                Fileobj=file_obj,
-                Bucket=settings.AWS_S3_BUCKET_NAME,
-                Key=object_key,
-                ExtraArgs={"ContentType": content_type},
-            )
+            with timed("s3"):
+                s3.upload_fileobj(
+                    Fileobj=file_obj,
+                    Bucket=settings.AWS_S3_BUCKET_NAME,
+                    Key=object_key,
+                    ExtraArgs={"ContentType": content_type},
+                )
         except Exception as e:
             return Response(
                 {"detail": f"S3 へのアップロードに失敗しました: {e}"},
@@ -1,11 +1,31 @@
 # backend/eform_api/views/token_views.py
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+
+from ..authentication import ArtistRefreshToken
 
 # ------------------------------
 # 1. Djangoの標準ユーザー認証（username + password）
+#    トークンに artist_uuid / has_profile / agreed / terms_version / privacy_version を載せる
 # ------------------------------
 
 
+class ArtistTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ArtistRefreshToken
+
+
 class CustomTokenObtainPairView(TokenObtainPairView):
-    serializer_class = TokenObtainPairSerializer
+    serializer_class = ArtistTokenObtainPairSerializer
+
+
+# ------------------------------
+# 2. トークンのリフレッシュ（クレームも読み直す）
+# ------------------------------
+
+
+class ArtistTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ArtistRefreshToken
+
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = ArtistTokenRefreshSerializer
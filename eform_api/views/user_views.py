@@ -5,6 +5,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from django.conf import settings
+from django.db import transaction
 
 from ..models import  TattooArtist
 from ..serializers import (
@@ -32,7 +33,9 @@ class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
     permission_classes = []
 
+    @transaction.atomic
     def perform_create(self, serializer):
+        # User / TattooArtist / 認証メール（EmailOutbox）をまとめてコミット
         user = serializer.save()
         TattooArtist.objects.create(
             user=user,
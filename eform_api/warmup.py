@@ -0,0 +1,68 @@
+# eform_api/warmup.py
+"""
+ワーカー起動前のウォームアップ
+
+gunicorn の master プロセスで重いライブラリや URLConf を先に import しておくと、
+fork されたワーカーは sys.modules を引き継ぐので最初のリクエストまでが速くなる。
+（gunicorn.conf.py の on_starting から呼ばれる）
+
+- ここでは DB 接続やクライアント（boto3 の S3 クライアント等）は作らない。
+  fork をまたいで共有すると壊れるため、それらは各ワーカーで遅延生成する。
+"""
+import importlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 遅延 import にしている重い依存
+HEAVY_MODULES = (
+    "boto3",
+    "botocore.client",
+    # PDF 生成（pdf_renderer。PDF_RENDER_PROCESSES=0 ならワーカー内で使う）
+    "weasyprint",
+    # 署名画像の検証（signatures）
+    "PIL.Image",
+    "PIL.ImageChops",
+)
+
+
+def preload_heavy_modules(modules=HEAVY_MODULES):
+    """重いモジュールを import して、モジュールごとの所要秒を返す"""
+    timings = {}
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except (ImportError, OSError):
+            # weasyprint は pango 等の共有ライブラリが無いと OSError になる
+            logger.warning("warmup: %s を import できませんでした", name, exc_info=True)
+            continue
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def preload_django():
+    """Django の初期化と URLConf（= 全ビュー・シリアライザ）の読み込み"""
+    import django
+    from django.db import connections
+    from django.urls import get_resolver
+
+    django.setup()
+    get_resolver().url_patterns
+    # master で DB に繋いだままワーカーを fork しないように念のため閉じる
+    connections.close_all()
+
+
+def warm_up(include_django=True):
+    started = time.perf_counter()
+    timings = preload_heavy_modules()
+    if include_django:
+        preload_django()
+    total = time.perf_counter() - started
+    logger.info(
+        "warmup: %.1fms (%s)",
+        total * 1000,
+        ", ".join(f"{name}={sec * 1000:.1f}ms" for name, sec in timings.items()),
+    )
+    return total
@@ -0,0 +1,56 @@
+# gunicorn.conf.py
+# gunicorn はカレントディレクトリのこのファイルを自動で読み込む。
+#   gunicorn config.wsgi
+#   GUNICORN_WARMUP=false gunicorn config.wsgi   # ウォームアップ無効
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+# Prometheus のマルチプロセスモード: ワーカーごとのメトリクスファイルの置き場所
+# （prometheus_client の import より前に設定しておく必要がある）
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "inkbase-prometheus"),
+)
+
+WARMUP = os.getenv("GUNICORN_WARMUP", "True").lower() == "true"
+
+
+def on_starting(server):
+    """master 起動時: 前回のメトリクスファイルを消し、重い import を済ませる"""
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+    if not WARMUP:
+        return
+    from eform_api.warmup import warm_up
+
+    seconds = warm_up()
+    server.log.info("eform_api warmup finished in %.1fms", seconds * 1000)
+
+
+def pre_fork(server, worker):
+    """fork 前: master が持っている DB 接続（ウォームアップ等）をワーカーに持ち越さない"""
+    from django.db import connections
+
+    from eform_api.db.pool import close_all_pools
+
+    connections.close_all()
+    close_all_pools()
+
+
+def worker_exit(server, worker):
+    """ワーカー終了時: PDF 生成の子プロセスを止める"""
+    from eform_api.pdf_renderer import shutdown_pool
+
+    shutdown_pool()
+
+
+def child_exit(server, worker):
+    """終了したワーカーのメトリクス（gauge の live 値）を片付ける"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)